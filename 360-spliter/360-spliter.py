@@ -8,6 +8,13 @@ from pathlib import Path
 import shutil
 import time
 import concurrent.futures
+import sys
+import cv2
+import numpy as np
+
+# 内置分割引擎复用 equi2cube 的球面采样代码
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'equi2cube'))
+import equi2cube_converter
 
 class Split360GUI:
     def __init__(self, root):
@@ -41,7 +48,10 @@ class Split360GUI:
             "clear_output": False,
             "splits": "6",
             "resolution": "1600",
-            "threads": str(min(4, os.cpu_count() or 4))  # 默认线程数
+            "threads": str(min(4, os.cpu_count() or 4)),  # 默认线程数
+            "engine": "native",  # 内置引擎 / 外部工具
+            "fov": "90",
+            "pitches": "0"
         }
         
         try:
@@ -90,6 +100,14 @@ class Split360GUI:
         self.clear_output_var = tk.BooleanVar()
         ttk.Checkbutton(main_frame, text="清空输出目录", variable=self.clear_output_var).grid(row=3, column=0, sticky=tk.W)
         
+        # 处理引擎：内置引擎无需外部工具
+        self.engine_var = tk.StringVar(value="native")
+        engine_frame = ttk.Frame(main_frame)
+        engine_frame.grid(row=3, column=1, columnspan=4, sticky=tk.W)
+        ttk.Label(engine_frame, text="处理引擎:").pack(side=tk.LEFT)
+        ttk.Radiobutton(engine_frame, text="内置", variable=self.engine_var, value="native").pack(side=tk.LEFT, padx=5)
+        ttk.Radiobutton(engine_frame, text="外部工具", variable=self.engine_var, value="external").pack(side=tk.LEFT)
+        
         # 分割数量
         ttk.Label(main_frame, text="分割数量:").grid(row=4, column=0, sticky=tk.W)
         self.splits_entry = ttk.Entry(main_frame, width=10)
@@ -100,6 +118,17 @@ class Split360GUI:
         self.resolution_entry = ttk.Entry(main_frame, width=10)
         self.resolution_entry.grid(row=5, column=1, sticky=tk.W)
         
+        # 视场角和俯仰角（仅内置引擎）
+        view_frame = ttk.Frame(main_frame)
+        view_frame.grid(row=4, column=2, rowspan=2, columnspan=3, sticky=tk.W)
+        ttk.Label(view_frame, text="视场角(度):").grid(row=0, column=0, sticky=tk.W)
+        self.fov_entry = ttk.Entry(view_frame, width=10)
+        self.fov_entry.grid(row=0, column=1, sticky=tk.W, padx=5)
+        ttk.Label(view_frame, text="俯仰角(度):").grid(row=1, column=0, sticky=tk.W)
+        self.pitches_entry = ttk.Entry(view_frame, width=15)
+        self.pitches_entry.grid(row=1, column=1, sticky=tk.W, padx=5)
+        ttk.Label(view_frame, text="(逗号分隔, 如 -30,0,30)").grid(row=1, column=2, sticky=tk.W)
+        
         # 线程数量
         ttk.Label(main_frame, text="线程数量:").grid(row=6, column=0, sticky=tk.W)
         self.threads_entry = ttk.Entry(main_frame, width=10)
@@ -151,6 +180,9 @@ class Split360GUI:
         self.splits_entry.insert(0, self.config.get("splits", "6"))
         self.resolution_entry.insert(0, self.config.get("resolution", "1600"))
         self.threads_entry.insert(0, self.config.get("threads", str(min(4, os.cpu_count() or 4))))
+        self.engine_var.set(self.config.get("engine", "native"))
+        self.fov_entry.insert(0, self.config.get("fov", "90"))
+        self.pitches_entry.insert(0, self.config.get("pitches", "0"))
         
     def select_input_file(self):
         filename = filedialog.askopenfilename(filetypes=[("图像文件", "*.jpg *.jpeg *.png")])
@@ -195,14 +227,15 @@ class Split360GUI:
         if self.is_processing:
             if self.current_process:
                 self.current_process.terminate()
-                self.is_processing = False
-                self.process_button.configure(text="分割图像")
-                self.update_log("处理已停止")
+            self.is_processing = False
+            self.process_button.configure(text="分割图像")
+            self.update_log("处理已停止")
             return
 
-        # 验证工具路径
+        # 验证工具路径（仅外部工具需要）
+        engine = self.engine_var.get()
         tool_path = self.tool_entry.get()
-        if not tool_path or not os.path.exists(tool_path):
+        if engine == "external" and (not tool_path or not os.path.exists(tool_path)):
             messagebox.showerror("错误", "请选择正确的处理工具！")
             return
 
@@ -222,6 +255,26 @@ class Split360GUI:
             messagebox.showerror("错误", f"无效的线程数: {str(e)}")
             return
 
+        # 内置引擎的分割参数
+        split_settings = None
+        if engine == "native":
+            try:
+                split_settings = {
+                    "splits": int(self.splits_entry.get()),
+                    "resolution": int(self.resolution_entry.get()),
+                    "fov": float(self.fov_entry.get() or "90"),
+                    "pitches": [float(p) for p in (self.pitches_entry.get() or "0").split(",") if p.strip()]
+                }
+                if split_settings["splits"] < 1 or split_settings["resolution"] < 1:
+                    raise ValueError("分割数量和分辨率必须大于0")
+                if not 0 < split_settings["fov"] < 180:
+                    raise ValueError("视场角必须在 0 到 180 度之间")
+                if not split_settings["pitches"]:
+                    split_settings["pitches"] = [0.0]
+            except ValueError as e:
+                messagebox.showerror("错误", f"无效的分割参数: {str(e)}")
+                return
+
         # 获取所有需要处理的图片文件
         image_files = []
         if os.path.isfile(input_path):
@@ -258,7 +311,10 @@ class Split360GUI:
             "clear_output": self.clear_output_var.get(),
             "splits": self.splits_entry.get(),
             "resolution": self.resolution_entry.get(),
-            "threads": str(threads)
+            "threads": str(threads),
+            "engine": engine,
+            "fov": self.fov_entry.get(),
+            "pitches": self.pitches_entry.get()
         })
         self.save_config()
 
@@ -271,10 +327,16 @@ class Split360GUI:
         self.update_log(f"创建{max_workers}个处理线程")
         
         # 启动处理线程
-        processing_thread = threading.Thread(
-            target=self.process_multiple_images,
-            args=(image_files, tool_path, output_path, max_workers)
-        )
+        if engine == "native":
+            processing_thread = threading.Thread(
+                target=self.split_multiple_images,
+                args=(image_files, output_path, max_workers, split_settings)
+            )
+        else:
+            processing_thread = threading.Thread(
+                target=self.process_multiple_images,
+                args=(image_files, tool_path, output_path, max_workers)
+            )
         processing_thread.daemon = True
         processing_thread.start()
 
@@ -319,6 +381,47 @@ class Split360GUI:
             self.process_button.configure(text="分割图像")
             self.update_log("所有任务处理完成")
 
+    def split_multiple_images(self, image_files, output_path, max_workers, split_settings):
+        """使用内置引擎分割图像（无需启动外部进程）"""
+        try:
+            self.progress_var.set(0)
+            total_files = len(image_files)
+            start_time = time.time()
+            views = equi2cube_converter.split_views(split_settings["splits"], split_settings["pitches"])
+            self.update_log(f"每张图像输出 {len(views)} 个视图，视场角 {split_settings['fov']}°")
+            
+            with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+                future_to_file = {
+                    executor.submit(split_single_image, img_file, output_path, views, split_settings): img_file
+                    for img_file in image_files
+                }
+                
+                completed = 0
+                for future in concurrent.futures.as_completed(future_to_file):
+                    if not self.is_processing:
+                        # 取消所有未开始的任务
+                        for f in future_to_file:
+                            f.cancel()
+                        break
+                    
+                    img_file = future_to_file[future]
+                    completed += 1
+                    try:
+                        future.result()
+                        status = "成功"
+                    except Exception as e:
+                        status = f"失败: {str(e)}"
+                    self.progress_var.set((completed / total_files) * 100)
+                    self.update_log(f"处理进度: [{completed}/{total_files}] {os.path.basename(img_file)} - {status}")
+            
+            self.update_log(f"耗时: {time.time() - start_time:.1f}秒")
+        except Exception as e:
+            self.update_log(f"多线程处理发生错误: {str(e)}")
+        finally:
+            self.is_processing = False
+            self.process_button.configure(text="分割图像")
+            self.update_log("所有任务处理完成")
+
     def run_single_process(self, cmd, img_file):
         try:
             self.update_log(f"开始处理: {os.path.basename(img_file)}")
@@ -343,6 +446,21 @@ class Split360GUI:
             self.update_log(f"处理出错 {os.path.basename(img_file)}: {str(e)}")
             return False
 
+def split_single_image(img_file, output_path, views, split_settings):
+    """把一张全景图分割为多个透视视图并保存为 <文件名>_<序号>.<格式>"""
+    # 使用 imdecode/imencode 以支持中文路径
+    equi_array = cv2.imdecode(np.fromfile(img_file, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if equi_array is None:
+        raise ValueError("无法读取图像")
+    
+    stem, ext = os.path.splitext(os.path.basename(img_file))
+    for index, (_, view) in enumerate(equi2cube_converter.iter_perspective_views(
+            equi_array, views, split_settings["resolution"], split_settings["fov"], backend='opencv')):
+        success, encoded = cv2.imencode(ext, view)
+        if not success:
+            raise ValueError(f"无法编码视图 {index}")
+        encoded.tofile(os.path.join(output_path, f"{stem}_{index:02d}{ext}"))
+
 def main():
     root = tk.Tk()
     app = Split360GUI(root)
@@ -0,0 +1,68 @@
+import queue
+
+# 界面刷新进度和日志的间隔（毫秒）
+PROGRESS_INTERVAL_MS = 100
+
+
+class ProgressChannel:
+    """工作线程向 Tk 界面报告进度和日志的通道
+
+    Tk 控件只能在主线程中操作。工作线程调用 progress() / log() / call() 时只写入变量或
+    线程安全的队列，不做任何界面操作；主线程用 after() 每 interval_ms 毫秒取一次，
+    只刷新最新的进度值，并把期间积累的日志一次插入。每帧调用 progress() 的开销只是一次赋值，
+    界面刷新频率与处理速度无关。on_progress(value, maximum) 和 on_log(text) 在主线程中调用，
+    maximum 为 None 表示不变。
+    """
+    
+    def __init__(self, widget, on_progress, on_log, interval_ms=PROGRESS_INTERVAL_MS):
+        self.widget = widget
+        self.interval_ms = interval_ms
+        self._on_progress = on_progress
+        self._on_log = on_log
+        self._progress = None
+        self._queue = queue.SimpleQueue()
+        self.widget.after(self.interval_ms, self._poll)
+    
+    def progress(self, value, maximum=None):
+        """记录最新进度（可在任意线程调用），maximum 在下次刷新时一并更新"""
+        if maximum is not None:
+            self._queue.put(('maximum', maximum))
+        self._progress = value
+    
+    def log(self, text):
+        """追加一条日志（可在任意线程调用）"""
+        self._queue.put(('log', text))
+    
+    def call(self, func):
+        """在主线程中按顺序执行 func（可在任意线程调用）"""
+        self._queue.put(('call', func))
+    
+    def flush(self):
+        """在主线程中处理排队的日志和调用，并刷新进度"""
+        lines = []
+        while True:
+            try:
+                kind, item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if kind == 'log':
+                lines.append(item)
+                continue
+            if lines:
+                self._on_log(''.join(lines))
+                lines = []
+            if kind == 'maximum':
+                self._on_progress(None, item)
+            else:
+                item()
+        if lines:
+            self._on_log(''.join(lines))
+        value, self._progress = self._progress, None
+        if value is not None:
+            self._on_progress(value, None)
+    
+    def _poll(self):
+        try:
+            self.flush()
+        finally:
+            self.widget.after(self.interval_ms, self._poll)
@@ -6,8 +6,10 @@ from PIL import Image
 import numpy as np
 from pathlib import Path
 import time
-from threading import Thread
-import queue
+from threading import Thread, Lock, BoundedSemaphore
+import io
+import contextlib
+import hashlib
 import equi2cube_converter
 from PIL import ImageTk
 import tkinter.ttk as ttk
@@ -15,6 +17,18 @@ import cv2
 import argparse
 import sys
 import concurrent.futures
+import multiprocessing
+import re
+
+# 进度通道与其他工具共用
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'common'))
+from progress_channel import ProgressChannel
+
+# 支持的执行模式：线程池 / 进程池 / 自动选择
+EXECUTION_MODES = ('auto', 'thread', 'process')
+
+# 流水线各阶段及其显示名称（用于统计耗时）
+PIPELINE_STAGES = {'decode': '解码', 'project': '投影', 'encode': '编码', 'write': '写入'}
 
 class Equi2CubeConverter:
     def __init__(self):
@@ -35,7 +49,6 @@ class Equi2CubeConverter:
         self.output_dir = tk.StringVar()
         self.is_converting = False
         self.conversion_thread = None
-        self.message_queue = queue.Queue()
         
         # 添加面选择配置
         self.face_config = {
@@ -58,15 +71,43 @@ class Equi2CubeConverter:
         
         # 添加清空文件夹选项的变量
         self.clear_output_dir = tk.BooleanVar(value=False)
+        self.incremental = tk.BooleanVar(value=False)
+        
+        # 采样后端和插值方式
+        self.backend = tk.StringVar(value='numpy')
+        self.interpolation = tk.StringVar(value='bilinear')
+        
+        # 执行模式（线程/进程/自动）
+        self.execution_mode = tk.StringVar(value='auto')
+        
+        # 转换方向：全景图→立方体 / 立方体→全景图
+        self.direction = tk.StringVar(value='equi2cube')
+        
+        # 附加输出：透视分割视图和预览图
+        self.split_enabled = tk.BooleanVar(value=False)
+        self.split_count = tk.StringVar(value="8")
+        self.split_resolution = tk.StringVar(value="1024")
+        self.split_fov = tk.StringVar(value="90")
+        self.split_pitches = tk.StringVar(value="0")
+        self.preview_enabled = tk.BooleanVar(value=False)
+        self.preview_width = tk.StringVar(value="1024")
+        
+        # 分块处理（超大全景图）及其临时内存预算
+        self.tiled_mode = tk.BooleanVar(value=False)
+        self.memory_budget = tk.StringVar(value="256")
+        
+        # 输出面尺寸（留空为输入高度的一半）及抗锯齿缩小
+        self.face_size = tk.StringVar(value="")
+        self.antialias = tk.BooleanVar(value=False)
         
         # 获取当前脚本所在目录
         self.script_dir = Path(__file__).parent
         
+        # 工作线程通过进度通道更新界面
+        self.channel = ProgressChannel(self.root, self.show_progress, self.append_log)
+        
         self.create_gui()
         self.load_config()
-        
-        # 定期检查消息队列
-        self.root.after(100, self.check_message_queue)
 
     def create_gui(self):
         # 主容器使用网格布局
@@ -89,6 +130,25 @@ class Equi2CubeConverter:
         ttk.Button(output_frame, text="打开文件夹", command=self.open_output_dir).pack(side='right')
         ttk.Button(output_frame, text="选择文件夹", command=self.select_output_dir).pack(side='right', padx=5)
 
+        # 转换方向
+        direction_frame = ttk.Frame(main_container)
+        direction_frame.pack(fill='x', pady=(0, 5))
+        ttk.Label(direction_frame, text="转换方向:").pack(side='left')
+        ttk.Radiobutton(
+            direction_frame,
+            text="全景图 → 立方体",
+            variable=self.direction,
+            value='equi2cube',
+            command=self.save_config
+        ).pack(side='left', padx=5)
+        ttk.Radiobutton(
+            direction_frame,
+            text="立方体 → 全景图",
+            variable=self.direction,
+            value='cube2equi',
+            command=self.save_config
+        ).pack(side='left', padx=5)
+
         # 修改输出文件夹选择后的布局
         settings_frame = ttk.Frame(main_container)
         settings_frame.pack(fill='x', pady=(0, 5))
@@ -101,6 +161,13 @@ class Equi2CubeConverter:
             command=self.save_config
         ).pack(side='left')
         
+        ttk.Checkbutton(
+            settings_frame,
+            text="增量转换(跳过未变化的文件)",
+            variable=self.incremental,
+            command=self.save_config
+        ).pack(side='left', padx=(10, 0))
+        
         # 线程数设置右对齐
         right_settings = ttk.Frame(settings_frame)
         right_settings.pack(side='right')
@@ -109,6 +176,60 @@ class Equi2CubeConverter:
         self.thread_count = tk.StringVar(value="1")
         thread_entry = ttk.Entry(right_settings, textvariable=self.thread_count, width=5)
         thread_entry.pack(side='left', padx=5)
+        
+        ttk.Label(right_settings, text="执行模式:").pack(side='left', padx=(10, 0))
+        mode_combo = ttk.Combobox(
+            right_settings,
+            textvariable=self.execution_mode,
+            values=list(EXECUTION_MODES),
+            state='readonly',
+            width=8
+        )
+        mode_combo.pack(side='left', padx=5)
+        mode_combo.bind('<<ComboboxSelected>>', lambda e: self.save_config())
+
+        # 采样设置
+        sampling_frame = ttk.Frame(main_container)
+        sampling_frame.pack(fill='x', pady=(0, 5))
+        
+        ttk.Label(sampling_frame, text="采样后端:").pack(side='left')
+        backend_combo = ttk.Combobox(
+            sampling_frame,
+            textvariable=self.backend,
+            values=list(equi2cube_converter.BACKENDS),
+            state='readonly',
+            width=8
+        )
+        backend_combo.pack(side='left', padx=5)
+        backend_combo.bind('<<ComboboxSelected>>', self.on_backend_changed)
+        
+        ttk.Label(sampling_frame, text="插值方式:").pack(side='left', padx=(10, 0))
+        self.interpolation_combo = ttk.Combobox(
+            sampling_frame,
+            textvariable=self.interpolation,
+            state='readonly',
+            width=8
+        )
+        self.interpolation_combo.pack(side='left', padx=5)
+        self.interpolation_combo.bind('<<ComboboxSelected>>', lambda e: self.save_config())
+        
+        ttk.Checkbutton(
+            sampling_frame,
+            text="分块处理",
+            variable=self.tiled_mode,
+            command=self.save_config
+        ).pack(side='left', padx=(10, 0))
+        ttk.Label(sampling_frame, text="内存预算(MB):").pack(side='left', padx=(5, 0))
+        ttk.Entry(sampling_frame, textvariable=self.memory_budget, width=6).pack(side='left', padx=5)
+        
+        ttk.Label(sampling_frame, text="面尺寸:").pack(side='left', padx=(10, 0))
+        ttk.Entry(sampling_frame, textvariable=self.face_size, width=6).pack(side='left', padx=5)
+        ttk.Checkbutton(
+            sampling_frame,
+            text="抗锯齿",
+            variable=self.antialias,
+            command=self.save_config
+        ).pack(side='left')
 
         # 面选择框架放在下一行
         face_select_frame = ttk.LabelFrame(main_container, text="输出面选择")
@@ -130,6 +251,38 @@ class Equi2CubeConverter:
             )
             cb.pack(side='left', padx=5)
 
+        # 附加输出：与立方体面共用一次解码
+        extra_frame = ttk.LabelFrame(main_container, text="附加输出")
+        extra_frame.pack(fill='x', pady=(0, 5))
+        
+        split_frame = ttk.Frame(extra_frame)
+        split_frame.pack(fill='x', padx=5, pady=2)
+        ttk.Checkbutton(
+            split_frame,
+            text="透视分割",
+            variable=self.split_enabled,
+            command=self.save_config
+        ).pack(side='left')
+        for label_text, variable, width in [
+            ("数量:", self.split_count, 4),
+            ("分辨率:", self.split_resolution, 6),
+            ("视场角:", self.split_fov, 4),
+            ("俯仰角:", self.split_pitches, 10)
+        ]:
+            ttk.Label(split_frame, text=label_text).pack(side='left', padx=(10, 0))
+            ttk.Entry(split_frame, textvariable=variable, width=width).pack(side='left', padx=2)
+        
+        preview_output_frame = ttk.Frame(extra_frame)
+        preview_output_frame.pack(fill='x', padx=5, pady=2)
+        ttk.Checkbutton(
+            preview_output_frame,
+            text="缩小预览图",
+            variable=self.preview_enabled,
+            command=self.save_config
+        ).pack(side='left')
+        ttk.Label(preview_output_frame, text="宽度:").pack(side='left', padx=(10, 0))
+        ttk.Entry(preview_output_frame, textvariable=self.preview_width, width=6).pack(side='left', padx=2)
+
         # 预览框架 (row 3)
         preview_frame = ttk.LabelFrame(main_container, text="预览")
         preview_frame.pack(fill='both', pady=(0, 5))
@@ -217,15 +370,33 @@ class Equi2CubeConverter:
                     self.input_dir.set(config.get('input_dir', ''))
                     self.output_dir.set(config.get('output_dir', ''))
                     self.clear_output_dir.set(config.get('clear_output_dir', False))
+                    self.incremental.set(config.get('incremental', False))
                     self.thread_count.set(config.get('thread_count', '1'))  # 加载线程数配置
+                    self.backend.set(config.get('backend', 'numpy'))
+                    self.interpolation.set(config.get('interpolation', 'bilinear'))
+                    self.execution_mode.set(config.get('execution_mode', 'auto'))
+                    self.direction.set(config.get('direction', 'equi2cube'))
+                    self.tiled_mode.set(config.get('tiled_mode', False))
+                    self.face_size.set(config.get('face_size', ''))
+                    self.antialias.set(config.get('antialias', False))
+                    self.split_enabled.set(config.get('split_enabled', False))
+                    self.split_count.set(config.get('split_count', '8'))
+                    self.split_resolution.set(config.get('split_resolution', '1024'))
+                    self.split_fov.set(config.get('split_fov', '90'))
+                    self.split_pitches.set(config.get('split_pitches', '0'))
+                    self.preview_enabled.set(config.get('preview_enabled', False))
+                    self.preview_width.set(config.get('preview_width', '1024'))
+                    self.memory_budget.set(config.get('memory_budget', '256'))
                     
                     # 加载面选择配置
                     if 'face_config' in config:
                         for face_id, enabled in config['face_config'].items():
                             if face_id in self.face_config:
                                 self.face_config[face_id]['enabled'] = enabled
+                                self.face_vars[face_id].set(enabled)
             except Exception as e:
                 print(f"加载配置文件时出错: {str(e)}")
+        self.update_interpolation_options()
 
     def save_config(self):
         """保存设置到配置文件"""
@@ -234,11 +405,27 @@ class Equi2CubeConverter:
             'input_dir': self.input_dir.get(),
             'output_dir': self.output_dir.get(),
             'clear_output_dir': self.clear_output_dir.get(),
+            'incremental': self.incremental.get(),
             'face_config': {
                 face_id: var.get()
                 for face_id, var in self.face_vars.items()
             },
-            'thread_count': self.thread_count.get()  # 添加线程数配置
+            'thread_count': self.thread_count.get(),  # 添加线程数配置
+            'backend': self.backend.get(),
+            'interpolation': self.interpolation.get(),
+            'execution_mode': self.execution_mode.get(),
+            'direction': self.direction.get(),
+            'tiled_mode': self.tiled_mode.get(),
+            'face_size': self.face_size.get(),
+            'antialias': self.antialias.get(),
+            'split_enabled': self.split_enabled.get(),
+            'split_count': self.split_count.get(),
+            'split_resolution': self.split_resolution.get(),
+            'split_fov': self.split_fov.get(),
+            'split_pitches': self.split_pitches.get(),
+            'preview_enabled': self.preview_enabled.get(),
+            'preview_width': self.preview_width.get(),
+            'memory_budget': self.memory_budget.get()
         }
         try:
             with open(config_path, 'w', encoding='utf-8') as f:
@@ -246,15 +433,33 @@ class Equi2CubeConverter:
         except Exception as e:
             print(f"保存配置文件时出错: {str(e)}")
 
+    def update_interpolation_options(self):
+        """根据采样后端更新可选的插值方式（NumPy 后端仅支持双线性）"""
+        if self.backend.get() == 'opencv':
+            options = list(equi2cube_converter.INTERPOLATIONS)
+        else:
+            options = ['bilinear']
+        self.interpolation_combo.configure(values=options)
+        if self.interpolation.get() not in options:
+            self.interpolation.set('bilinear')
+
+    def on_backend_changed(self, event=None):
+        self.update_interpolation_options()
+        self.save_config()
+
     def log_message(self, message):
-        self.message_queue.put(message)
+        self.channel.log(message + '\n')
+
+    def append_log(self, text):
+        self.log_text.insert(tk.END, text)
+        self.log_text.see(tk.END)
 
-    def check_message_queue(self):
-        while not self.message_queue.empty():
-            message = self.message_queue.get()
-            self.log_text.insert(tk.END, message + '\n')
-            self.log_text.see(tk.END)
-        self.root.after(100, self.check_message_queue)
+    def show_progress(self, value, maximum):
+        if maximum is not None:
+            self.progress_bar.configure(maximum=maximum)
+        if value is not None:
+            self.progress_var.set(value)
+            self.progress_label.configure(text=f"{value}/{int(self.progress_bar.cget('maximum'))}")
 
     def toggle_conversion(self):
         if not self.is_converting:
@@ -272,8 +477,8 @@ class Equi2CubeConverter:
 
     def update_preview(self, faces):
         """更新预览图像"""
-        for face_id, face in zip(['posy', 'negx', 'posz', 'posx', 'negz', 'negy'], faces):
-            if face_id in self.preview_labels:
+        for face_id, face in zip(equi2cube_converter.FACE_ORDER, faces):
+            if face is not None and face_id in self.preview_labels:
                 # 调整图像大小用于预览
                 preview_image = face.copy()
                 preview_image.thumbnail((self.preview_size, self.preview_size))
@@ -294,10 +499,47 @@ class Equi2CubeConverter:
                 thread_count = max(1, min(32, int(self.thread_count.get())))
             except ValueError:
                 thread_count = 1
-                self.thread_count.set("1")
+                self.channel.call(lambda: self.thread_count.set("1"))
 
             input_path = Path(self.input_dir.get())
             output_path = Path(self.output_dir.get())
+            options = {
+                'backend': self.backend.get(),
+                'interpolation': self.interpolation.get(),
+                'faces': [face_id for face_id, var in self.face_vars.items() if var.get()],
+                'antialias': self.antialias.get()
+            }
+            
+            # 输出面尺寸，留空使用默认值
+            if self.face_size.get().strip():
+                try:
+                    options['face_size'] = max(1, int(self.face_size.get()))
+                except ValueError:
+                    self.log_message("面尺寸必须是整数")
+                    return
+            
+            # 分块处理的内存预算
+            if self.tiled_mode.get():
+                try:
+                    options['memory_budget_mb'] = max(1, int(self.memory_budget.get()))
+                except ValueError:
+                    self.log_message("内存预算必须是整数(MB)")
+                    return
+            
+            # 附加输出
+            try:
+                if self.split_enabled.get():
+                    options['splits'] = parse_split_settings(
+                        self.split_count.get(),
+                        self.split_resolution.get(),
+                        self.split_fov.get(),
+                        self.split_pitches.get()
+                    )
+                if self.preview_enabled.get():
+                    options['preview_width'] = max(1, int(self.preview_width.get()))
+            except ValueError as e:
+                self.log_message(f"附加输出设置无效: {str(e)}")
+                return
             
             # 确保输出目录存在
             output_path.mkdir(parents=True, exist_ok=True)
@@ -314,8 +556,19 @@ class Equi2CubeConverter:
                     self.log_message(f"清空输出文件夹时出错: {str(e)}")
                     return
             
+            reverse = self.direction.get() == 'cube2equi'
+            if reverse:
+                # 立方体→全景图：按文件名把同一全景图的各个面分组
+                if input_path.is_file():
+                    cube_sets = [
+                        cube_set for cube_set in find_cubemap_sets(input_path.parent)
+                        if input_path in cube_set[1].values()
+                    ]
+                else:
+                    cube_sets = find_cubemap_sets(input_path)
+                image_files = [stem for stem, _, _ in cube_sets]
             # 根据输入是文件还是目录来确定要处理的文件列表
-            if input_path.is_file():
+            elif input_path.is_file():
                 # 如果是单个文件，直接将其作为待处理文件
                 if input_path.suffix.lower() in {'.jpg', '.jpeg', '.png'}:
                     image_files = [input_path]
@@ -331,41 +584,103 @@ class Equi2CubeConverter:
                 self.log_message("没有找到可处理的图像文件")
                 return
             
-            self.log_message(f"开始处理 {total_files} 个图像文件")
+            if not reverse and not output_suffixes(options):
+                self.log_message("请至少选择一个输出面或附加输出")
+                return
+            
+            # 增量模式：按输出目录中的清单跳过未变化的全景图
+            manifest = None
+            if self.incremental.get() and not reverse:
+                manifest = ConversionManifest(output_path, options)
+                image_files = [
+                    image_file for image_file in image_files
+                    if not manifest.is_current(
+                        image_file.name, image_file, output_files_for(image_file, output_path, options))
+                ]
+                if total_files > len(image_files):
+                    self.log_message(f"增量模式: 跳过 {total_files - len(image_files)} 个未变化的文件")
+                total_files = len(image_files)
+                if total_files == 0:
+                    manifest.save()
+                    self.log_message("没有新增或变化的文件")
+                    return
+            
+            self.log_message(f"开始处理 {total_files} 个{'立方体贴图' if reverse else '图像文件'}")
+            self.channel.progress(0, total_files)
             processed_count = 0
             
-            # 修改这里：更新文件名后缀
-            suffixes = ['pz', 'nz', 'nx', 'px', 'py', 'ny']
+            # 确定执行模式：自动模式下多线程且多文件时使用进程池
+            execution_mode = self.execution_mode.get()
+            if execution_mode == 'auto':
+                execution_mode = 'process' if thread_count > 1 and total_files > 1 else 'thread'
+            
+            if execution_mode == 'process' and not reverse:
+                executor = create_process_pool(image_files[0], thread_count, options)
+            elif execution_mode == 'process':
+                executor = concurrent.futures.ProcessPoolExecutor(max_workers=thread_count)
+            else:
+                executor = concurrent.futures.ThreadPoolExecutor(max_workers=thread_count)
             
-            with concurrent.futures.ThreadPoolExecutor(max_workers=thread_count) as executor:
+            # 线程模式下投影线程把输出交给有界写入池，编码写入与后续投影并行
+            timings = StageTimings()
+            writer = FaceWriter(thread_count, timings=timings) if execution_mode == 'thread' and not reverse else None
+            
+            with executor:
                 # 创建任务列表
-                futures = []
+                future_to_file = {}
                 for i, image_file in enumerate(image_files):
                     if not self.is_converting:
                         break
                     
-                    future = executor.submit(self.process_single_image, image_file, output_path)
-                    futures.append(future)
+                    if reverse:
+                        stem, face_files, _ = cube_sets[i]
+                        future = executor.submit(convert_cubemap_set, stem, face_files, output_path, options)
+                        image_file = Path(stem)
+                    elif execution_mode == 'process':
+                        # 子进程只接收文件路径，结果和各阶段耗时在完成后回传
+                        future = executor.submit(convert_file_with_timings, image_file, output_path, options)
+                    else:
+                        future = executor.submit(self.process_single_image, image_file, output_path, options, writer)
+                    future_to_file[future] = image_file
 
                 # 处理完成的任务
-                for i, future in enumerate(concurrent.futures.as_completed(futures)):
+                for i, future in enumerate(concurrent.futures.as_completed(future_to_file)):
                     if not self.is_converting:
                         # 取消所有未完成的任务
-                        for f in futures:
+                        for f in future_to_file:
                             f.cancel()
                         break
 
+                    image_file = future_to_file[future]
                     try:
                         result = future.result()
+                        if isinstance(result, tuple):
+                            result, stage_seconds = result
+                            timings.merge(stage_seconds)
+                        if result and writer is not None:
+                            # 线程模式下等这张全景图的输出写完，写入失败的不算完成，也不记入清单
+                            for output_file, error in writer.wait(output_files_for(image_file, output_path, options)):
+                                self.log_message(f"写入 {output_file.name} 时出错: {str(error)}")
+                                result = False
                         if result:
                             processed_count += 1
+                            if manifest is not None:
+                                manifest.record(image_file.name, image_file)
+                            if execution_mode == 'process' or reverse:
+                                self.log_message(f"完成: {image_file.name}")
                     except Exception as e:
-                        self.log_message(f"处理任务时出错: {str(e)}")
+                        self.log_message(f"处理 {image_file.name} 时出错: {str(e)}")
 
                     # 更新进度
-                    progress = ((i + 1) / total_files) * 100
-                    self.progress_var.set(progress)
-                    self.progress_label.configure(text=f"{i+1}/{total_files}")
+                    self.channel.progress(i + 1)
+
+            # 等待写入池写完剩余的输出
+            write_errors = writer.close() if writer is not None else []
+            for output_file, error in write_errors:
+                self.log_message(f"写入 {output_file.name} 时出错: {str(error)}")
+            
+            if manifest is not None:
+                manifest.save()
 
             # 计算处理时间
             end_time = time.time()
@@ -374,36 +689,27 @@ class Equi2CubeConverter:
             # 输出汇总信息
             self.log_message(f"\n转换完成！")
             self.log_message(f"成功处理: {processed_count}/{total_files} 个文件")
-            self.log_message(f"处理线程: {thread_count} 个")
+            self.log_message(f"处理{'进程' if execution_mode == 'process' else '线程'}: {thread_count} 个")
+            self.log_message(f"采样后端: {options['backend']} ({options['interpolation']})")
             self.log_message(f"耗时: {int(duration//60)}分 {duration%60:.1f}秒")
+            if not reverse:
+                self.log_message(f"各阶段累计耗时: {timings.summary()}")
 
         except Exception as e:
             self.log_message(f"发生错误: {str(e)}")
         finally:
             self.is_converting = False
-            self.convert_button.configure(text="转换")
+            self.channel.call(lambda: self.convert_button.configure(text="转换"))
 
-    def process_single_image(self, image_file, output_path):
+    def process_single_image(self, image_file, output_path, options, writer=None):
         try:
             self.log_message(f"处理: {image_file.name}")
             
-            # 读取图像
-            img = Image.open(image_file)
-            
-            # 转换图像
-            faces = equi2cube_converter.equirectangular_to_cubemap(img)
+            faces = convert_file(image_file, output_path, options, keep_faces=True, writer=writer)
             
             # 只在单线程模式下更新预览
             if int(self.thread_count.get()) == 1:
-                self.root.after(0, lambda: self.update_preview(faces))
-            
-            # 保存需要的面
-            stem = image_file.stem
-            ext = image_file.suffix
-            for face, face_id in zip(faces, ['posy', 'negx', 'posz', 'posx', 'negz', 'negy']):
-                if self.face_vars[face_id].get():  # 只保存选中的面
-                    output_file = output_path / f"{stem}_{face_id}{ext}"
-                    face.save(output_file)
+                self.channel.call(lambda: self.update_preview(faces))
             
             return True
             
@@ -428,52 +734,679 @@ class Equi2CubeConverter:
         else:
             self.log_message("输出文件夹不存在")
 
-def process_single_file(input_path, output_dir):
-    """处理单个文件"""
-    # 原有的文件处理逻辑...
-    try:
-        img = cv2.imread(str(input_path))
-        if img is None:
-            print(f"无法读取文件: {input_path}")
-            return
-        # 处理图片的其他代码...
-        output_path = Path(output_dir) / input_path.name
-        cv2.imwrite(str(output_path), result)
-        print(f"已处理: {input_path.name}")
-    except Exception as e:
-        print(f"处理文件 {input_path} 时出错: {str(e)}")
-
-def process_directory(input_dir, output_dir):
-    """处理���个文件夹"""
-    input_path = Path(input_dir)
-    supported_extensions = {'.jpg', '.jpeg', '.png'}
-    
-    for file_path in input_path.glob('*'):
-        if file_path.suffix.lower() in supported_extensions:
-            process_single_file(file_path, output_dir)
+# 支持的输入图像格式
+SUPPORTED_EXTENSIONS = {'.jpg', '.jpeg', '.png'}
+
+def face_output_file(image_file, output_path, suffix, options):
+    """返回某个输出（立方体面、透视视图或预览图）的文件路径: <文件名>_<后缀>.<格式>"""
+    ext = f".{options['format']}" if options.get('format') else image_file.suffix
+    return Path(output_path) / f"{image_file.stem}_{suffix}{ext}"
+
+class StageTimings:
+    """线程安全的流水线各阶段累计耗时（秒）"""
+    
+    def __init__(self):
+        self.seconds = dict.fromkeys(PIPELINE_STAGES, 0.0)
+        self._lock = Lock()
+    
+    def add(self, stage, seconds):
+        with self._lock:
+            self.seconds[stage] += seconds
+    
+    def merge(self, seconds):
+        """合并子进程传回的耗时"""
+        for stage, value in seconds.items():
+            self.add(stage, value)
+    
+    @contextlib.contextmanager
+    def measure(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start)
+    
+    def measure_iter(self, stage, iterable):
+        """逐项迭代，生成每一项所用的时间计入指定阶段"""
+        iterator = iter(iterable)
+        while True:
+            with self.measure(stage):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+    
+    def summary(self):
+        return ", ".join(f"{name} {self.seconds[stage]:.2f}秒" for stage, name in PIPELINE_STAGES.items())
+
+def encode_image(image, output_file):
+    """按输出文件的扩展名把 PIL 图像编码为字节串"""
+    buffer = io.BytesIO()
+    image.save(buffer, format=Image.registered_extensions()[Path(output_file).suffix.lower()])
+    return buffer.getvalue()
+
+def save_image(image, output_file, timings):
+    """编码并写入一个输出文件，分别统计编码和写入耗时"""
+    with timings.measure('encode'):
+        data = encode_image(image, output_file)
+    with timings.measure('write'):
+        Path(output_file).write_bytes(data)
+
+class FaceWriter:
+    """有界的异步编码/写入线程池
+
+    投影线程把生成的图像交给写入池后即可继续处理下一张全景图；
+    排队待写的图像达到 max_pending 时 submit 会阻塞（背压），以限制内存占用。
+    PIL 编码时会释放 GIL，编码与投影可以真正并行。
+    """
+    
+    def __init__(self, max_workers, max_pending=None, timings=None):
+        self.timings = timings if timings is not None else StageTimings()
+        self.errors = []
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+        self._slots = BoundedSemaphore(max_pending or max_workers * 2)
+        self._lock = Lock()
+        self._futures = {}      # 尚未被 wait 取走的 输出文件 -> future
+        self._waited = set()    # 已由 wait 报告过结果的输出文件
+    
+    def submit(self, image, output_file):
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(save_image, image, output_file, self.timings)
+        except Exception:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._futures[Path(output_file)] = future
+        future.add_done_callback(lambda f: self._on_done(f, output_file))
+    
+    def wait(self, output_files):
+        """等待指定的输出写完，返回其中写入失败的 (文件, 异常) 列表；这些错误不再由 close 返回"""
+        output_files = [Path(output_file) for output_file in output_files]
+        with self._lock:
+            futures = [(output_file, self._futures.pop(output_file)) for output_file in output_files
+                       if output_file in self._futures]
+            self._waited.update(output_files)
+        errors = []
+        for output_file, future in futures:
+            if not future.cancelled() and future.exception() is not None:
+                errors.append((output_file, future.exception()))
+        return errors
+    
+    def _on_done(self, future, output_file):
+        self._slots.release()
+        if not future.cancelled() and future.exception() is not None:
+            self.errors.append((Path(output_file), future.exception()))
+    
+    def close(self):
+        """等待所有排队的图像写完，返回写入失败且未由 wait 报告过的 (文件, 异常) 列表"""
+        self._executor.shutdown(wait=True)
+        return [error for error in self.errors if error[0] not in self._waited]
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+
+def save_output(image, output_file, writer=None, timings=None):
+    """保存一个输出：有写入池时交给写入池异步完成，否则同步编码写入"""
+    if writer is not None:
+        writer.submit(image, output_file)
+    else:
+        save_image(image, output_file, timings if timings is not None else StageTimings())
+
+def parse_split_settings(count, resolution, fov, pitches):
+    """解析透视分割设置，参数无效时抛出 ValueError"""
+    splits = {
+        'count': int(count),
+        'resolution': int(resolution),
+        'fov': float(fov),
+        'pitches': [float(pitch) for pitch in str(pitches).split(',') if pitch.strip()] or [0.0]
+    }
+    if splits['count'] < 1 or splits['resolution'] < 1:
+        raise ValueError("分割数量和分辨率必须大于0")
+    if not 0 < splits['fov'] < 180:
+        raise ValueError("视场角必须在 0 到 180 度之间")
+    return splits
+
+def split_view_list(options):
+    """返回附加透视分割的视图方向列表，未启用时为空"""
+    splits = options.get('splits')
+    if not splits:
+        return []
+    return equi2cube_converter.split_views(splits['count'], splits['pitches'])
+
+def output_suffixes(options):
+    """返回一张全景图的全部输出后缀（立方体面、透视视图、预览图）"""
+    suffixes = list(options['faces'])
+    suffixes += [f"view{index:02d}" for index in range(len(split_view_list(options)))]
+    if options.get('preview_width'):
+        suffixes.append('preview')
+    return suffixes
+
+def convert_file(image_file, output_path, options, keep_faces=False, writer=None, timings=None):
+    """转换单个全景图并保存选中的面
+
+    图像只解码一次，同一个数组依次生成立方体面、附加的透视分割视图
+    (options['splits']) 和缩小的预览图 (options['preview_width'])，之后才释放。
+    该函数位于模块顶层，可直接提交到进程池中执行（只需传入文件路径）。
+    keep_faces 为 True 时返回转换得到的六个面（用于预览），否则返回输入图像的
+    像素数，避免进程池把整幅图像传回主进程。
+    设置了 memory_budget_mb 时使用分块模式，每个面生成后立即同步保存并释放，不返回预览。
+    传入 writer (FaceWriter) 时其余输出交给写入池异步编码写入，本函数投影完成即返回；
+    各阶段耗时累计到 timings（默认为 writer.timings）。
+    """
+    if timings is None:
+        timings = writer.timings if writer is not None else StageTimings()
+    
+    # 读取图像，转换为数组后立即释放 PIL 图像
+    with timings.measure('decode'):
+        with Image.open(image_file) as img:
+            equi_array = np.asarray(img)
+    height, width = equi_array.shape[:2]
+    
+    memory_budget_mb = options.get('memory_budget_mb')
+    if not options['faces']:
+        faces = (None,) * len(equi2cube_converter.FACE_ORDER)
+    elif memory_budget_mb:
+        # 分块模式：逐个面生成并立即保存，内存中最多只保留一个输出面。
+        # 不交给写入池，否则排队待写的面会超出内存预算
+        for face_id, face_pixels in timings.measure_iter('project', equi2cube_converter.iter_cubemap_faces(
+                equi_array,
+                face_size=options.get('face_size'),
+                backend=options['backend'],
+                interpolation=options['interpolation'],
+                faces=options['faces'],
+                memory_budget_mb=memory_budget_mb,
+                antialias=options.get('antialias', False))):
+            save_output(Image.fromarray(face_pixels),
+                        face_output_file(image_file, output_path, face_id, options), timings=timings)
+            del face_pixels
+        faces = (None,) * len(equi2cube_converter.FACE_ORDER)
+    else:
+        # 转换图像（只计算选中的面）
+        with timings.measure('project'):
+            faces = equi2cube_converter.equirectangular_to_cubemap(
+                equi_array,
+                face_size=options.get('face_size'),
+                backend=options['backend'],
+                interpolation=options['interpolation'],
+                faces=options['faces'],
+                antialias=options.get('antialias', False)
+            )
+        
+        # 保存选中的面
+        for face, face_id in zip(faces, equi2cube_converter.FACE_ORDER):
+            if face is not None:
+                save_output(face, face_output_file(image_file, output_path, face_id, options), writer, timings)
+    
+    # 透视分割：复用同一个解码后的数组
+    splits = options.get('splits')
+    if splits:
+        for index, (_, view_pixels) in enumerate(timings.measure_iter('project', equi2cube_converter.iter_perspective_views(
+                equi_array,
+                split_view_list(options),
+                splits['resolution'],
+                splits['fov'],
+                backend=options['backend'],
+                interpolation=options['interpolation'],
+                antialias=options.get('antialias', False)))):
+            save_output(Image.fromarray(view_pixels),
+                        face_output_file(image_file, output_path, f"view{index:02d}", options), writer, timings)
+    
+    # 缩小的预览图
+    preview_width = options.get('preview_width')
+    if preview_width:
+        preview_height = max(1, round(height * preview_width / width))
+        with timings.measure('project'):
+            preview = cv2.resize(equi_array, (preview_width, preview_height), interpolation=cv2.INTER_AREA)
+        save_output(Image.fromarray(preview), face_output_file(image_file, output_path, 'preview', options), writer, timings)
+    
+    return faces if keep_faces else width * height
+
+def convert_file_with_timings(image_file, output_path, options):
+    """在子进程中转换单个全景图，返回 (像素数, 各阶段耗时)
+
+    每次调用使用一个小的写入池，前一个面的编码与后续面的投影重叠进行；
+    返回前等待全部写完，写入失败时抛出异常。
+    """
+    with FaceWriter(max_workers=2) as writer:
+        pixels = convert_file(image_file, output_path, options, writer=writer)
+    if writer.errors:
+        output_file, error = writer.errors[0]
+        raise OSError(f"写入 {output_file.name} 失败: {error}")
+    return pixels, writer.timings.seconds
+
+# 立方体面文件名: <全景图名称>_<面>.<扩展名>
+CUBE_FACE_PATTERN = re.compile(
+    r'^(?P<stem>.+)_(?P<face>' + '|'.join(equi2cube_converter.FACE_ORDER) + r')$')
+
+def find_cubemap_sets(input_path, recursive=False):
+    """查找立方体面文件并按全景图名称分组
+
+    返回 (全景图名称, {面: 文件}, 相对于输入目录的子目录) 列表。
+    """
+    cube_sets = {}
+    for image_file, relative_dir in find_input_files(input_path, recursive):
+        match = CUBE_FACE_PATTERN.match(image_file.stem)
+        if match:
+            key = (relative_dir, match.group('stem'))
+            cube_sets.setdefault(key, {})[match.group('face')] = image_file
+    return [
+        (stem, face_files, relative_dir)
+        for (relative_dir, stem), face_files in sorted(cube_sets.items())
+    ]
+
+def equirect_output_file(stem, face_files, output_path, options):
+    """返回立方体贴图合成后全景图的输出文件路径"""
+    sample_file = next(iter(face_files.values()))
+    ext = f".{options['format']}" if options.get('format') else sample_file.suffix
+    return Path(output_path) / f"{stem}{ext}"
+
+def convert_cubemap_set(stem, face_files, output_path, options):
+    """把同一全景图的一组立方体面合成为全景图并保存（可在子进程中执行）
+
+    缺失的面以黑色填充，返回输出全景图的像素数。
+    """
+    faces = {}
+    for face_id, face_file in face_files.items():
+        with Image.open(face_file) as img:
+            faces[face_id] = np.asarray(img)
+    
+    equi_img = equi2cube_converter.cubemap_to_equirectangular(
+        faces,
+        width=options.get('equi_width'),
+        backend=options['backend'],
+        interpolation=options['interpolation']
+    )
+    equi_img.save(equirect_output_file(stem, face_files, output_path, options))
+    return equi_img.width * equi_img.height
+
+def _init_worker(image_size, face_size, backend, faces, antialias=False):
+    """工作进程初始化：为本批次的分辨率预先生成采样表"""
+    equi2cube_converter.prepare_sampling_map(
+        *image_size, face_size=face_size, backend=backend, faces=faces, antialias=antialias)
+
+def create_process_pool(sample_file, max_workers, options):
+    """创建转换用的进程池
+
+    采样表在父进程中先生成一次：使用 fork 启动的子进程以写时复制方式只读共享它；
+    使用 spawn 启动的子进程（Windows）则在初始化时各自生成一次，之后整批复用。
+    """
+    if options.get('memory_budget_mb'):
+        # 分块模式不使用缓存的采样表
+        return concurrent.futures.ProcessPoolExecutor(max_workers=max_workers)
+    
+    with Image.open(sample_file) as img:
+        image_size = img.size
+    face_size = options.get('face_size')
+    antialias = options.get('antialias', False)
+    equi2cube_converter.prepare_sampling_map(
+        *image_size, face_size=face_size, backend=options['backend'], faces=options['faces'], antialias=antialias)
+    splits = options.get('splits')
+    if splits:
+        view_size = image_size
+        if antialias:
+            view_size = equi2cube_converter.antialias_size(
+                *image_size, equi2cube_converter.perspective_antialias_width(splits['resolution'], splits['fov']))
+        for yaw, pitch in split_view_list(options):
+            equi2cube_converter.get_perspective_map(
+                *view_size, splits['resolution'], yaw, pitch, splits['fov'])
+    return concurrent.futures.ProcessPoolExecutor(
+        max_workers=max_workers,
+        initializer=_init_worker,
+        initargs=(image_size, face_size, options['backend'], options['faces'], antialias)
+    )
+
+def find_input_files(input_path, recursive=False):
+    """查找待处理的全景图，返回 (图像文件, 相对于输入目录的子目录) 列表"""
+    input_path = Path(input_path)
+    if input_path.is_file():
+        return [(input_path, Path())]
+    
+    pattern = '**/*' if recursive else '*'
+    return [
+        (file_path, file_path.parent.relative_to(input_path))
+        for file_path in sorted(input_path.glob(pattern))
+        if file_path.is_file() and file_path.suffix.lower() in SUPPORTED_EXTENSIONS
+    ]
+
+def outputs_up_to_date(source_files, output_files):
+    """所有输出文件都已存在且不早于任一输入文件时返回 True"""
+    source_mtime = max(source_file.stat().st_mtime for source_file in source_files)
+    for output_file in output_files:
+        if not output_file.exists() or output_file.stat().st_mtime < source_mtime:
+            return False
+    return True
+
+def output_files_for(image_file, output_path, options):
+    """返回一张全景图的全部输出文件"""
+    return [face_output_file(image_file, output_path, suffix, options) for suffix in output_suffixes(options)]
+
+def is_up_to_date(image_file, output_path, options):
+    """所有输出都已存在且不早于输入文件时返回 True"""
+    return outputs_up_to_date([image_file], output_files_for(image_file, output_path, options))
+
+# 增量模式的清单文件（保存在输出目录中）及其格式版本
+MANIFEST_NAME = '.equi2cube_manifest.json'
+MANIFEST_VERSION = 1
+
+# 影响输出内容的转换设置（分块处理等只影响内存占用的设置不在其中）
+MANIFEST_SETTINGS = ('faces', 'face_size', 'backend', 'interpolation', 'format', 'splits', 'preview_width', 'antialias')
+
+# 每记录多少个文件保存一次清单，中途中断时已完成的部分不必重做
+MANIFEST_SAVE_INTERVAL = 50
+
+def settings_fingerprint(options):
+    """返回影响输出内容的转换设置的摘要"""
+    settings = {key: options.get(key) for key in MANIFEST_SETTINGS}
+    return hashlib.sha1(json.dumps(settings, sort_keys=True).encode('utf-8')).hexdigest()
+
+def file_digest(path):
+    """分块读取并计算文件内容的 SHA-1 摘要"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class ConversionManifest:
+    """增量转换清单：记录每个输入文件的大小、修改时间、内容摘要和转换设置
+
+    输入文件大小和修改时间都未变、设置相同且输出仍然存在时直接跳过；只有修改时间
+    变化时再比较内容摘要，内容相同（例如复制或 touch 过的文件）则只更新记录。
+    判断只需 stat 调用，重新运行的耗时取决于新增和变化的文件数量。
+    """
+    
+    def __init__(self, output_dir, options):
+        self.path = Path(output_dir) / MANIFEST_NAME
+        self.settings = settings_fingerprint(options)
+        self.entries = {}
+        self._unsaved = 0
+        self._lock = Lock()
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            if manifest.get('version') == MANIFEST_VERSION:
+                self.entries = manifest.get('entries', {})
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, AttributeError):
+            # 清单损坏时全部重新转换
+            self.entries = {}
+    
+    def is_current(self, key, image_file, output_files):
+        """输入和设置均未变化且所有输出都存在时返回 True"""
+        entry = self.entries.get(key)
+        if entry is None or entry.get('settings') != self.settings:
+            return False
+        stat = image_file.stat()
+        if stat.st_size != entry['size']:
+            return False
+        if not all(output_file.exists() for output_file in output_files):
+            return False
+        if stat.st_mtime_ns != entry['mtime_ns']:
+            if file_digest(image_file) != entry['sha1']:
+                return False
+            self._store(key, dict(entry, mtime_ns=stat.st_mtime_ns))
+        return True
+    
+    def record(self, key, image_file):
+        """记录一个已成功转换的输入文件"""
+        stat = image_file.stat()
+        self._store(key, {
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sha1': file_digest(image_file),
+            'settings': self.settings
+        })
+    
+    def _store(self, key, entry):
+        with self._lock:
+            self.entries[key] = entry
+            self._unsaved += 1
+            save_now = self._unsaved >= MANIFEST_SAVE_INTERVAL
+        if save_now:
+            self.save()
+    
+    def save(self):
+        """写入清单（先写临时文件再替换，避免中断时损坏）"""
+        with self._lock:
+            manifest = {'version': MANIFEST_VERSION, 'entries': dict(self.entries)}
+            self._unsaved = 0
+            # 没有需要转换的文件时输出目录可能还不存在
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = self.path.with_name(self.path.name + '.tmp')
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, ensure_ascii=False)
+            os.replace(temp_path, self.path)
+
+def process_command_line(args):
+    """命令行批量转换"""
+    input_path = Path(args.input)
+    output_dir = Path(args.output)
+    if not input_path.exists():
+        print(f"错误: 输入源 '{input_path}' 不存在或无效")
+        return 1
+    
+    options = {
+        'backend': args.backend,
+        'interpolation': args.interpolation,
+        'faces': args.faces,
+        'face_size': args.face_size,
+        'format': args.format,
+        'memory_budget_mb': args.tile_memory,
+        'equi_width': args.equi_width,
+        'preview_width': args.preview_width,
+        'antialias': args.antialias
+    }
+    if args.splits:
+        try:
+            options['splits'] = parse_split_settings(
+                args.splits, args.split_resolution, args.split_fov, args.split_pitches)
+        except ValueError as e:
+            print(f"错误: 透视分割设置无效: {str(e)}")
+            return 1
+    
+    # 增量模式：按输出目录中的清单跳过未变化的全景图
+    manifest = None
+    if args.incremental and args.reverse:
+        print("提示: 增量模式仅用于全景图转立方体贴图, 已忽略")
+    elif args.incremental:
+        manifest = ConversionManifest(output_dir, options)
+    
+    # 查找输入文件，并跳过输出已是最新的文件
+    # 每个任务为 (显示名称, 输出目录, 转换函数, 参数)；显示名称为相对于输入目录的路径
+    tasks = []
+    skipped_count = 0
+    if args.reverse:
+        # 立方体→全景图：按文件名把同一全景图的各个面分组
+        search_path = input_path.parent if input_path.is_file() else input_path
+        for stem, face_files, relative_dir in find_cubemap_sets(search_path, args.recursive):
+            if input_path.is_file() and input_path not in face_files.values():
+                continue
+            file_output_dir = output_dir / relative_dir
+            output_file = equirect_output_file(stem, face_files, file_output_dir, options)
+            if args.skip_existing and outputs_up_to_date(face_files.values(), [output_file]):
+                skipped_count += 1
+                continue
+            tasks.append((stem, file_output_dir, convert_cubemap_set, (stem, face_files, file_output_dir, options)))
+    else:
+        for image_file, relative_dir in find_input_files(input_path, args.recursive):
+            file_output_dir = output_dir / relative_dir
+            name = (relative_dir / image_file.name).as_posix()
+            if args.skip_existing and is_up_to_date(image_file, file_output_dir, options):
+                skipped_count += 1
+                continue
+            if manifest is not None and manifest.is_current(
+                    name, image_file, output_files_for(image_file, file_output_dir, options)):
+                skipped_count += 1
+                continue
+            tasks.append((name, file_output_dir, convert_file, (image_file, file_output_dir, options)))
+    
+    print(f"找到 {len(tasks) + skipped_count} 个{'立方体贴图' if args.reverse else '图像文件'}，"
+          f"跳过 {skipped_count} 个{'未变化' if manifest is not None else '已是最新'}的文件")
+    if not tasks:
+        if manifest is not None:
+            manifest.save()
+        return 0
+    
+    for file_output_dir in {task[1] for task in tasks}:
+        file_output_dir.mkdir(parents=True, exist_ok=True)
+    
+    # 自动模式下多进程且多文件时使用进程池
+    workers = max(1, args.workers)
+    execution_mode = args.mode
+    if execution_mode == 'auto':
+        execution_mode = 'process' if workers > 1 and len(tasks) > 1 else 'thread'
+    
+    if not args.reverse:
+        print(f"输出面: {', '.join(options['faces']) or '无'}")
+        if args.splits:
+            print(f"透视分割: {len(split_view_list(options))} 个视图, "
+                  f"{options['splits']['resolution']}px, 视场角 {options['splits']['fov']}°")
+        if args.preview_width:
+            print(f"预览图宽度: {args.preview_width}px")
+    print(f"采样后端: {options['backend']} ({options['interpolation']})")
+    if options['memory_budget_mb']:
+        print(f"分块处理: 临时内存预算 {options['memory_budget_mb']} MB")
+    if args.antialias and not args.reverse:
+        print("抗锯齿: 缩小输出前先对全景图做面积平均预滤波")
+    print(f"处理{'进程' if execution_mode == 'process' else '线程'}: {workers} 个")
+    
+    start_time = time.time()
+    if execution_mode == 'process' and not args.reverse:
+        executor = create_process_pool(tasks[0][3][0], workers, options)
+    elif execution_mode == 'process':
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+    else:
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+    
+    # 线程模式下投影线程把输出交给有界写入池；进程模式下各子进程回传各阶段耗时
+    timings = StageTimings()
+    writer = FaceWriter(workers, timings=timings) if execution_mode == 'thread' and not args.reverse else None
+    
+    processed_count = 0
+    total_pixels = 0
+    with executor:
+        future_to_task = {}
+        for task in tasks:
+            name, _, function, function_args = task
+            if writer is not None:
+                future = executor.submit(function, *function_args, writer=writer)
+            elif execution_mode == 'process' and not args.reverse:
+                future = executor.submit(convert_file_with_timings, *function_args)
+            else:
+                future = executor.submit(function, *function_args)
+            future_to_task[future] = task
+        for i, future in enumerate(concurrent.futures.as_completed(future_to_task)):
+            name, file_output_dir, _, function_args = future_to_task[future]
+            try:
+                result = future.result()
+                if isinstance(result, tuple):
+                    result, stage_seconds = result
+                    timings.merge(stage_seconds)
+                if writer is not None:
+                    # 线程模式下等这张全景图的输出写完，写入失败的不算完成，也不记入清单
+                    file_errors = writer.wait(output_files_for(function_args[0], file_output_dir, options))
+                    if file_errors:
+                        output_file, error = file_errors[0]
+                        raise OSError(f"写入 {output_file.name} 失败: {error}")
+                total_pixels += result
+                processed_count += 1
+                print(f"[{i + 1}/{len(tasks)}] 已处理: {name}")
+                if manifest is not None:
+                    manifest.record(name, function_args[0])
+            except Exception as e:
+                print(f"[{i + 1}/{len(tasks)}] 处理 {name} 时出错: {str(e)}")
+    
+    # 等待写入池写完剩余的输出
+    write_errors = writer.close() if writer is not None else []
+    for output_file, error in write_errors:
+        print(f"写入 {output_file.name} 时出错: {str(error)}")
+    
+    if manifest is not None:
+        manifest.save()
+    
+    # 输出吞吐量统计
+    duration = max(time.time() - start_time, 1e-6)
+    print(f"\n转换完成！成功处理: {processed_count}/{len(tasks)} 个文件")
+    print(f"耗时: {int(duration//60)}分 {duration%60:.1f}秒")
+    print(f"吞吐量: {processed_count / duration:.2f} 张/秒, {total_pixels / 1e6 / duration:.1f} MP/秒")
+    if not args.reverse:
+        print(f"各阶段累计耗时: {timings.summary()}")
+    
+    return 0 if processed_count == len(tasks) and not write_errors else 1
+
+def parse_faces(value):
+    """解析逗号分隔的面列表，none 表示不输出立方体面（只输出附加内容）"""
+    if value.strip().lower() == 'none':
+        return []
+    faces = [face.strip() for face in value.split(',') if face.strip()]
+    for face in faces:
+        if face not in equi2cube_converter.FACE_ORDER:
+            raise argparse.ArgumentTypeError(
+                f"未知的面: {face} (可选: {', '.join(equi2cube_converter.FACE_ORDER)})")
+    if not faces:
+        raise argparse.ArgumentTypeError("至少需要选择一个面")
+    return faces
 
 def main():
+    # 打包为可执行文件时支持进程池
+    multiprocessing.freeze_support()
+    
     # Check if any command line arguments were provided
     if len(sys.argv) > 1:
         # Command-line mode
         parser = argparse.ArgumentParser(description='全景图转立方体贴图工具')
         parser.add_argument('input', help='输入源 (可以是单个文件或文件夹)')
         parser.add_argument('output', help='输出文件夹')
+        parser.add_argument('--faces', type=parse_faces, default=list(equi2cube_converter.FACE_ORDER),
+                            help='输出的面, 逗号分隔 (默认全部: posy,negx,posz,posx,negz,negy; none 表示不输出)')
+        parser.add_argument('--face-size', type=int, help='每个面的边长 (默认输入高度的一半)')
+        parser.add_argument('--antialias', action='store_true',
+                            help='输出小于输入分辨率时先对全景图做面积平均预滤波, 直接生成无混叠的缩略图')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='并行处理数 (默认CPU核心数)')
+        parser.add_argument('--mode', choices=EXECUTION_MODES, default='auto',
+                            help='执行模式 (默认auto)')
+        parser.add_argument('--format', choices=['jpg', 'png'],
+                            help='输出格式 (默认与输入相同)')
+        parser.add_argument('-r', '--recursive', action='store_true',
+                            help='递归查找子文件夹中的图像，并在输出目录中保持目录结构')
+        parser.add_argument('--skip-existing', action='store_true',
+                            help='跳过输出面均已存在且不早于输入文件的图像')
+        parser.add_argument('--incremental', action='store_true',
+                            help=f'增量模式: 按输出目录中的清单 ({MANIFEST_NAME}) 只转换新增或变化的全景图, '
+                                 '转换设置改变时全部重新转换')
+        parser.add_argument('--backend', choices=equi2cube_converter.BACKENDS, default='numpy',
+                            help='采样后端 (默认numpy)')
+        parser.add_argument('--interpolation', choices=list(equi2cube_converter.INTERPOLATIONS),
+                            default='bilinear', help='插值方式 (opencv后端可选, 默认bilinear)')
+        parser.add_argument('--tile-memory', type=int, metavar='MB',
+                            help='启用分块处理超大全景图，并指定每个进程的临时内存预算(MB)')
+        parser.add_argument('--splits', type=int,
+                            help='同时输出水平等分的透视分割视图数量 (与立方体面共用一次解码)')
+        parser.add_argument('--split-resolution', type=int, default=1024, help='透视视图分辨率 (默认1024)')
+        parser.add_argument('--split-fov', type=float, default=90.0, help='透视视图视场角 (默认90度)')
+        parser.add_argument('--split-pitches', default='0', help='透视视图俯仰角, 逗号分隔 (默认0)')
+        parser.add_argument('--preview-width', type=int, help='同时输出指定宽度的缩小预览图')
+        parser.add_argument('--reverse', action='store_true',
+                            help='反向转换: 把 <名称>_<面>.<格式> 立方体面合成为全景图 <名称>.<格式>')
+        parser.add_argument('--equi-width', type=int,
+                            help='反向转换输出全景图的宽度 (高度为宽度一半, 默认面边长的4倍)')
         args = parser.parse_args()
 
-        input_path = Path(args.input)
-        output_dir = Path(args.output)
-
-        # 确保输出目录存在
-        output_dir.mkdir(parents=True, exist_ok=True)
+        if args.backend == 'numpy' and args.interpolation != 'bilinear':
+            parser.error('numpy 后端仅支持 bilinear 插值')
+        for option, value in (('--face-size', args.face_size), ('--workers', args.workers),
+                              ('--split-resolution', args.split_resolution)):
+            if value is not None and value < 1:
+                parser.error(f'{option} 必须大于等于 1')
 
-        if input_path.is_file():
-            process_single_file(input_path, output_dir)
-        elif input_path.is_dir():
-            process_directory(input_path, output_dir)
-        else:
-            print(f"错误: 输入源 '{input_path}' 不存在或无效")
-            return 1
+        return process_command_line(args)
     else:
         # GUI mode
         converter = Equi2CubeConverter()
@@ -1,95 +1,646 @@
+import functools
+import math
+import threading
 import numpy as np
+import cv2
 from PIL import Image
 
-def create_cubemap_matrices(width):
-    """创建立方体贴图的采样矩阵"""
+# 立方体各面的输出顺序（上、左、前、右、后、下）
+FACE_ORDER = ('posy', 'negx', 'posz', 'posx', 'negz', 'negy')
+
+# 采样后端
+BACKENDS = ('numpy', 'opencv')
+
+# OpenCV 后端支持的插值方式
+INTERPOLATIONS = {
+    'nearest': cv2.INTER_NEAREST,
+    'bilinear': cv2.INTER_LINEAR,
+    'bicubic': cv2.INTER_CUBIC,
+    'lanczos': cv2.INTER_LANCZOS4
+}
+
+# 水平环绕填充的像素数（Lanczos 插值核半径为 4）
+WRAP_PADDING = 4
+
+# 分块模式下每个输出像素大约需要的临时内存（坐标、索引、权重和插值中间结果）
+TILE_BYTES_PER_PIXEL = 128
+
+# 分块模式的内存预算中留给条带坐标的比例，其余留给 OpenCV 后端复制的源图像行
+TILE_COORDINATE_SHARE = 0.5
+
+def face_xyz(face_name, x, y):
+    """返回指定面在网格 (x, y) 上的三维方向向量"""
+    one = np.ones_like(x)
+    if face_name == 'posy':
+        return -x, -one, y          # 上
+    if face_name == 'negy':
+        return -x, one, -y          # 下
+    if face_name == 'negx':
+        return one, y, x            # 左
+    if face_name == 'posz':
+        return -x, y, one           # 前
+    if face_name == 'posx':
+        return -one, y, -x          # 右
+    if face_name == 'negz':
+        return x, y, -one           # 后
+    raise ValueError(f"未知的立方体面: {face_name}")
+
+def create_face_matrix(face_name, width):
+    """创建一个立方体面的采样矩阵（每个像素的三维方向向量）"""
     x = np.linspace(-1, 1, width)
     y = np.linspace(-1, 1, width)
     x, y = np.meshgrid(x, y)
 
-    matrices = {
-        'negz': (-x, y, -np.ones_like(x)),          # 后
-        'posy': (-x, -np.ones_like(y), y),         # 上
-        'negy': (-x, np.ones_like(y), -y),         # 下
-        'negx': (np.ones_like(x), y, x),           # 左
-        'posz': (-x, y, np.ones_like(x)),          # 前
-        'posx': (-np.ones_like(x), y, -x),         # 右
-        'negz': (x, y, -np.ones_like(x))           # 后
-    }
-    
-    return matrices
+    return face_xyz(face_name, x, y)
 
 def convert_xyz_to_equirect(x, y, z, height, width):
     """将3D坐标转换为等距柱状投影坐标"""
     # 计算球面坐标
     theta = np.arctan2(z, x)  # 经度 [-pi, pi]
     phi = np.arctan2(y, np.sqrt(x**2 + z**2))  # 纬度 [-pi/2, pi/2]
-    
+
     # 转换到图像坐标 [0, width-1] x [0, height-1]
     u = (theta + np.pi) * width / (2 * np.pi)
     v = (phi + np.pi/2) * height / np.pi
-    
+
     return u, v
 
-def equirectangular_to_cubemap(equi_img, face_size=None):
-    """将等距柱状投影图像转换为立方体贴图"""
+def face_coordinates(face_name, face_size, width, height, row_start=0, row_end=None):
+    """计算某个面第 row_start 到 row_end 行的采样坐标 (float32)"""
+    grid = np.linspace(-1, 1, face_size, dtype=np.float32)
+    x, y = np.meshgrid(grid, grid[row_start:row_end])
+    x, y, z = face_xyz(face_name, x, y)
+
+    # 标准化向量
+    norm = np.sqrt(x * x + y * y + z * z)
+    return convert_xyz_to_equirect(x / norm, y / norm, z / norm, height, width)
+
+class FaceSamplingMap:
+    """一个立方体面的预计算采样表
+
+    同一分辨率的全景图共享完全相同的几何关系，因此采样坐标只需计算一次，
+    之后每张图像只需按表取样。表在首次使用时生成，只生成所用后端需要的一种：
+    NumPy 后端为双线性插值表（约 24 字节/像素），OpenCV 后端为 cv2.remap 的
+    float32 坐标（8 字节/像素）。
+    """
+
+    def __init__(self, width, height, face_size, face_name):
+        self.width = width
+        self.height = height
+        self.face_size = face_size
+        self.face_name = face_name
+        self._bilinear_table = None
+        self._remap_table = None
+        self._lock = threading.Lock()
+
+    def coordinates(self):
+        """计算整个面的浮点采样坐标 (u, v)"""
+        x, y, z = create_face_matrix(self.face_name, self.face_size)
+
+        # 标准化向量
+        norm = np.sqrt(x**2 + y**2 + z**2)
+        u, v = convert_xyz_to_equirect(x / norm, y / norm, z / norm, self.height, self.width)
+        return u.astype(np.float32), v.astype(np.float32)
+
+    def bilinear_table(self):
+        """返回双线性插值表 (四个邻点的扁平索引, 小数部分)"""
+        with self._lock:
+            if self._bilinear_table is None:
+                u, v = self.coordinates()
+                self._bilinear_table = build_bilinear_table(u, v, self.width, self.height)
+            return self._bilinear_table
+
+    def remap_table(self):
+        """返回用于 cv2.remap 的 (map_x, map_y)，坐标对应水平环绕填充后的图像"""
+        with self._lock:
+            if self._remap_table is None:
+                u, v = self.coordinates()
+                u += np.float32(WRAP_PADDING)
+                np.clip(v, 0, self.height - 1, out=v)
+                self._remap_table = (u, v)
+            return self._remap_table
+
+class CubemapSamplingMap:
+    """一组立方体面的采样表，各面的表分别缓存（见 get_face_map），不同的面组合共享同一个面的表"""
+
+    def __init__(self, width, height, face_size, faces=FACE_ORDER):
+        self.width = width
+        self.height = height
+        self.face_size = face_size
+        self.faces = tuple(faces)
+        self.face_maps = {face_name: get_face_map(width, height, face_size, face_name) for face_name in self.faces}
+
+    def bilinear_table(self, face_name):
+        return self.face_maps[face_name].bilinear_table()
+
+    def remap_table(self, face_name):
+        return self.face_maps[face_name].remap_table()
+
+    def sample(self, equi_array, face_name):
+        """按采样表从全景图数组中取出一个面"""
+        return bilinear_sample(equi_array, self.bilinear_table(face_name))
+
+    def remap(self, padded_array, face_name, interpolation='bilinear'):
+        """使用 cv2.remap 从水平环绕填充后的全景图中取出一个面"""
+        map_x, map_y = self.remap_table(face_name)
+        return cv2.remap(
+            padded_array, map_x, map_y,
+            INTERPOLATIONS[interpolation],
+            borderMode=cv2.BORDER_REPLICATE
+        )
+
+def build_bilinear_table(u, v, width, height, wrap=True):
+    """根据采样坐标生成双线性插值表 (四个邻点的扁平索引, 水平和垂直方向的小数部分)
+
+    四个权重由小数部分在取样时算出，不必保存，表的大小约为 24 字节/像素。
+    wrap 为 True 时水平方向环绕（全景图左右边界相接），接缝处在最后一列和第一列之间插值；
+    否则水平方向钳制在边界内。
+    """
+    u = np.mod(u, width) if wrap else np.clip(u, 0, width - 1)
+    v = np.clip(v, 0, height - 1)
+
+    # 整数部分和小数部分
+    u_floor, v_floor = np.floor(u), np.floor(v)
+    u0, v0 = u_floor.astype(np.int32), v_floor.astype(np.int32)
+    if wrap:
+        u0 %= width
+        u1 = (u0 + 1) % width
+    else:
+        u1 = np.minimum(u0 + 1, width - 1)
+    v1 = np.minimum(v0 + 1, height - 1)
+
+    # 计算权重
+    wu = (u - u_floor)[..., np.newaxis]
+    wv = (v - v_floor)[..., np.newaxis]
+
+    indices = (
+        v0 * width + u0,
+        v0 * width + u1,
+        v1 * width + u0,
+        v1 * width + u1
+    )
+    return indices, (wu, wv)
+
+def bilinear_sample(equi_array, table):
+    """按双线性插值表从全景图数组中取样"""
+    indices, (wu, wv) = table
+    weights = (
+        (1 - wu) * (1 - wv),
+        wu * (1 - wv),
+        (1 - wu) * wv,
+        wu * wv
+    )
+    height, width = equi_array.shape[:2]
+    flat = equi_array.reshape(height * width, -1)
+
+    pixels = weights[0] * flat[indices[0]]
+    for index, weight in zip(indices[1:], weights[1:]):
+        pixels += weight * flat[index]
+
+    if equi_array.ndim == 2:
+        pixels = pixels[..., 0]
+    return pixels.astype(np.uint8)
+
+def wrap_pad(equi_array):
+    """在左右两侧按环绕方式填充，使 ±180° 接缝处的插值连续"""
+    return cv2.copyMakeBorder(equi_array, 0, 0, WRAP_PADDING, WRAP_PADDING, cv2.BORDER_WRAP)
+
+_sampling_map_lock = threading.Lock()
+
+# 缓存的立方体面采样表数量：正好是一种分辨率的六个面。8K 全景图（2048 像素的面）
+# 每个面的表约 100 MB (NumPy) / 32 MB (OpenCV)，缓存最多约 600 MB / 200 MB
+FACE_MAP_CACHE_SIZE = len(FACE_ORDER)
+
+@functools.lru_cache(maxsize=FACE_MAP_CACHE_SIZE)
+def _cached_face_map(width, height, face_size, face_name):
+    return FaceSamplingMap(width, height, face_size, face_name)
+
+def get_face_map(width, height, face_size, face_name):
+    """获取缓存的单个面的采样表，同一批相同分辨率的图像只计算一次"""
+    # 加锁避免多个线程同时为同一个面创建采样表
+    with _sampling_map_lock:
+        return _cached_face_map(width, height, face_size, face_name)
+
+def get_sampling_map(width, height, face_size, faces=FACE_ORDER):
+    """获取指定面的采样表，各面的表分别缓存"""
+    return CubemapSamplingMap(width, height, face_size, faces)
+
+def select_faces(faces=None):
+    """按标准顺序整理要计算的面，None 表示全部六个面"""
+    if faces is None:
+        return FACE_ORDER
+    for face_name in faces:
+        if face_name not in FACE_ORDER:
+            raise ValueError(f"未知的立方体面: {face_name}")
+    return tuple(face_name for face_name in FACE_ORDER if face_name in faces)
+
+def antialias_size(width, height, target_width):
+    """返回抗锯齿模式下实际采样的全景图尺寸（只缩小不放大，保持宽高比）"""
+    if width <= target_width:
+        return width, height
+    return target_width, max(1, round(height * target_width / width))
+
+def antialias_downsample(equi_array, target_width):
+    """抗锯齿预滤波：用面积平均 (INTER_AREA) 把全景图缩小到目标宽度
+
+    每个输出像素取其覆盖范围内源像素的平均值，范围不会越过左右边界，接缝两侧不会互相混入。
+    源图不大于目标宽度时原样返回。
+    """
+    height, width = equi_array.shape[:2]
+    size = antialias_size(width, height, target_width)
+    if size == (width, height):
+        return equi_array
+    return cv2.resize(equi_array, size, interpolation=cv2.INTER_AREA)
+
+def cubemap_antialias_width(face_size):
+    """立方体面每个像素约对应全景图上的一个像素时的全景图宽度（每个面覆盖 90°）"""
+    return 4 * face_size
+
+def perspective_antialias_width(size, fov):
+    """透视视图中心每个像素约对应全景图上的一个像素时的全景图宽度"""
+    return math.ceil(size * 360.0 / fov)
+
+def prepare_sampling_map(width, height, face_size=None, backend='numpy', faces=None, antialias=False):
+    """预先生成指定分辨率的采样表（用于在创建工作进程前预热缓存）"""
+    if face_size is None:
+        face_size = height // 2
+    if antialias:
+        width, height = antialias_size(width, height, cubemap_antialias_width(face_size))
+    sampling_map = get_sampling_map(width, height, face_size, select_faces(faces))
+    for face_name in sampling_map.faces:
+        if backend == 'opencv':
+            sampling_map.remap_table(face_name)
+        else:
+            sampling_map.bilinear_table(face_name)
+    return sampling_map
+
+def remap_strip(equi_array, u, v, interpolation='bilinear', max_band_bytes=None):
+    """使用 cv2.remap 采样一个条带，只对条带覆盖的源图像行做水平环绕填充
+
+    上下两个面的条带经过极点附近，覆盖的源图像行可能占全景图的很大一部分。
+    max_band_bytes 限制填充后源图像行的大小，超过时把条带沿较长的一边对半拆分后分别采样。
+    """
+    height, width = equi_array.shape[:2]
+    v = np.clip(v, 0, height - 1)
+
+    # 只取条带实际用到的源图像行
+    top = max(int(v.min()) - WRAP_PADDING, 0)
+    bottom = min(int(np.ceil(v.max())) + WRAP_PADDING + 1, height)
+    band_bytes = (bottom - top) * (width + 2 * WRAP_PADDING) * equi_array[0, 0].nbytes
+    if max_band_bytes is not None and band_bytes > max_band_bytes and v.size > 1:
+        axis = 0 if v.shape[0] >= v.shape[1] else 1
+        half = v.shape[axis] // 2
+        parts = (np.s_[:half], np.s_[half:]) if axis == 0 else (np.s_[:, :half], np.s_[:, half:])
+        pixels = np.empty(v.shape + equi_array.shape[2:], dtype=equi_array.dtype)
+        for part in parts:
+            pixels[part] = remap_strip(equi_array, u[part], v[part], interpolation, max_band_bytes)
+        return pixels
+    band = wrap_pad(equi_array[top:bottom])
+
+    return cv2.remap(
+        band, u + np.float32(WRAP_PADDING), v - np.float32(top),
+        INTERPOLATIONS[interpolation],
+        borderMode=cv2.BORDER_REPLICATE
+    )
+
+def iter_cubemap_faces(equi_img, face_size=None, backend='numpy', interpolation='bilinear', faces=None,
+                       memory_budget_mb=None, antialias=False):
+    """逐个生成立方体贴图的面 (面名称, 面图像数组)
+
+    默认使用缓存的整面采样表。指定 memory_budget_mb 时改用分块模式：不缓存采样表，
+    每个面按行条带计算 float32 采样坐标并采样，临时内存（条带坐标和 OpenCV 后端复制的
+    源图像行）约为 memory_budget_mb，峰值内存约为输入图像 + 一个输出面 + 临时内存，适合超大全景图。
+    antialias 为 True 时，若 face_size 远小于输入，先把全景图面积平均缩小到约
+    4*face_size 宽再采样，避免缩小时的混叠；采样表按缩小后的尺寸缓存，整批复用。
+    """
+    selected_faces = select_faces(faces)
+    if backend not in BACKENDS:
+        raise ValueError(f"未知的采样后端: {backend}")
+    if interpolation not in INTERPOLATIONS:
+        raise ValueError(f"未知的插值方式: {interpolation}")
+    if backend == 'numpy' and interpolation != 'bilinear':
+        raise ValueError("NumPy 后端仅支持双线性插值")
+
     # 转换为numpy数组
-    equi_array = np.array(equi_img)
+    equi_array = np.asarray(equi_img)
     height, width = equi_array.shape[:2]
-    
+
     # 如果没有指定face_size，设置默认值
     if face_size is None:
         face_size = height // 2
-        
-    # 创建采样矩阵
-    matrices = create_cubemap_matrices(face_size)
-    faces = {}
-    
-    # 对每个面进行转换
-    for face_name, (x, y, z) in matrices.items():
-        # 标准化向量
-        norm = np.sqrt(x**2 + y**2 + z**2)
-        x, y, z = x/norm, y/norm, z/norm
-        
-        # 计算采样坐标
-        u, v = convert_xyz_to_equirect(x, y, z, height, width)
-        
-        # 使用双线性插值进行采样
-        u = np.clip(u, 0, width - 1)
-        v = np.clip(v, 0, height - 1)
-        
-        # 整数部分和小数部分
-        u0, v0 = np.floor(u).astype(int), np.floor(v).astype(int)
-        u1, v1 = np.ceil(u).astype(int), np.ceil(v).astype(int)
-        
-        # 确保索引不越界
-        u1 = np.clip(u1, 0, width - 1)
-        v1 = np.clip(v1, 0, height - 1)
-        
-        # 计算权重
-        wu = u - u0
-        wv = v - v0
-        
-        # 调整权重维度
-        wu = wu[..., np.newaxis]
-        wv = wv[..., np.newaxis]
-        
-        # 双线性插值
-        face_pixels = (
-            (1 - wu) * (1 - wv) * equi_array[v0, u0] +
-            wu * (1 - wv) * equi_array[v0, u1] +
-            (1 - wu) * wv * equi_array[v1, u0] +
-            wu * wv * equi_array[v1, u1]
-        ).astype(np.uint8)
-        
-        faces[face_name] = Image.fromarray(face_pixels)
-    
-    # 返回六个面的图像
+
+    if antialias:
+        equi_array = antialias_downsample(equi_array, cubemap_antialias_width(face_size))
+        height, width = equi_array.shape[:2]
+
+    if memory_budget_mb is None:
+        # 获取（缓存的）采样表
+        sampling_map = get_sampling_map(width, height, face_size, selected_faces)
+        padded_array = wrap_pad(equi_array) if backend == 'opencv' else None
+        for face_name in selected_faces:
+            if backend == 'opencv':
+                yield face_name, sampling_map.remap(padded_array, face_name, interpolation)
+            else:
+                yield face_name, sampling_map.sample(equi_array, face_name)
+        return
+
+    # 分块模式：根据内存预算确定每个条带的行数，其余预算用于 OpenCV 后端复制的源图像行
+    budget_bytes = memory_budget_mb * 1024 * 1024
+    strip_rows = int(budget_bytes * TILE_COORDINATE_SHARE // (face_size * TILE_BYTES_PER_PIXEL))
+    strip_rows = max(1, min(face_size, strip_rows))
+    max_band_bytes = budget_bytes * (1 - TILE_COORDINATE_SHARE)
+    for face_name in selected_faces:
+        face_pixels = np.empty((face_size, face_size) + equi_array.shape[2:], dtype=np.uint8)
+        for row_start in range(0, face_size, strip_rows):
+            row_end = min(row_start + strip_rows, face_size)
+            u, v = face_coordinates(face_name, face_size, width, height, row_start, row_end)
+            if backend == 'opencv':
+                face_pixels[row_start:row_end] = remap_strip(equi_array, u, v, interpolation, max_band_bytes)
+            else:
+                table = build_bilinear_table(u, v, width, height)
+                face_pixels[row_start:row_end] = bilinear_sample(equi_array, table)
+        yield face_name, face_pixels
+        del face_pixels
+
+def equirectangular_to_cubemap(equi_img, face_size=None, backend='numpy', interpolation='bilinear', faces=None,
+                               memory_budget_mb=None, antialias=False):
+    """将等距柱状投影图像转换为立方体贴图
+
+    backend 为 'numpy' 时使用双线性插值；为 'opencv' 时使用 cv2.remap，
+    interpolation 可选 nearest/bilinear/bicubic/lanczos。
+    faces 指定要计算的面（默认全部），未选择的面不做任何采样，在返回值中为 None。
+    memory_budget_mb 启用分块模式，antialias 启用抗锯齿缩小，见 iter_cubemap_faces。
+    """
+    faces = {
+        face_name: Image.fromarray(face_pixels)
+        for face_name, face_pixels in iter_cubemap_faces(
+            equi_img, face_size, backend, interpolation, faces, memory_budget_mb, antialias)
+    }
+
+    # 返回六个面的图像（未选择的面为 None）
     return (
-        faces['posy'],   # 上面
-        faces['negx'],   # 左面
-        faces['posz'],   # 前面
-        faces['posx'],   # 右面
-        faces['negz'],   # 后面
-        faces['negy']    # 下面
-    ) 
\ No newline at end of file
+        faces.get('posy'),   # 上面
+        faces.get('negx'),   # 左面
+        faces.get('posz'),   # 前面
+        faces.get('posx'),   # 右面
+        faces.get('negz'),   # 后面
+        faces.get('negy')    # 下面
+    )
+
+def equirect_to_face_coordinates(width, height, face_size):
+    """计算全景图每个像素对应的立方体面序号及面内坐标（equirectangular_to_cubemap 的逆映射）"""
+    # 与 convert_xyz_to_equirect 相同的经纬度约定
+    theta = np.arange(width) * (2 * np.pi / width) - np.pi
+    phi = np.arange(height) * (np.pi / height) - np.pi / 2
+    theta, phi = np.meshgrid(theta, phi)
+    x = np.cos(phi) * np.cos(theta)
+    y = np.sin(phi)
+    z = np.cos(phi) * np.sin(theta)
+
+    # 按绝对值最大的坐标轴确定所在的面
+    ax, ay, az = np.abs(x), np.abs(y), np.abs(z)
+    on_x = (ax >= ay) & (ax >= az)
+    on_y = ~on_x & (ay >= az)
+    on_z = ~on_x & ~on_y
+
+    # 每个面的 (区域, 面内 x, 面内 y)，与 face_xyz 中的方向向量一一对应
+    with np.errstate(divide='ignore', invalid='ignore'):
+        face_regions = {
+            'posy': (on_y & (y < 0), -x / -y, z / -y),
+            'negy': (on_y & (y >= 0), -x / y, -z / y),
+            'negx': (on_x & (x >= 0), z / x, y / x),
+            'posx': (on_x & (x < 0), -z / -x, y / -x),
+            'posz': (on_z & (z >= 0), -x / z, y / z),
+            'negz': (on_z & (z < 0), x / -z, y / -z)
+        }
+
+    face_index = np.zeros((height, width), dtype=np.int32)
+    face_x = np.zeros((height, width))
+    face_y = np.zeros((height, width))
+    for index, face_name in enumerate(FACE_ORDER):
+        mask, fx, fy = face_regions[face_name]
+        face_index[mask] = index
+        face_x[mask] = fx[mask]
+        face_y[mask] = fy[mask]
+
+    # 面内坐标 [-1, 1] 转换为像素坐标 [0, face_size-1]
+    col = np.clip((face_x + 1) / 2 * (face_size - 1), 0, face_size - 1)
+    row = np.clip((face_y + 1) / 2 * (face_size - 1), 0, face_size - 1)
+    return face_index, col.astype(np.float32), row.astype(np.float32)
+
+def face_atlas(face_arrays, face_size, shape_tail):
+    """把各面按 FACE_ORDER 纵向拼接为图集，缺失的面为黑色
+
+    每个面四周用复制边缘的方式填充 WRAP_PADDING 像素。双三次和 Lanczos 插值核会读到
+    面边界外 1-3 个像素，填充保证读到的是本面的边缘而不是图集中相邻的另一个面。
+    """
+    cell = face_size + 2 * WRAP_PADDING
+    atlas = np.zeros((cell * len(FACE_ORDER), cell) + shape_tail, dtype=np.uint8)
+    for index, face_name in enumerate(FACE_ORDER):
+        if face_name in face_arrays:
+            atlas[index * cell:(index + 1) * cell] = cv2.copyMakeBorder(
+                face_arrays[face_name], WRAP_PADDING, WRAP_PADDING, WRAP_PADDING, WRAP_PADDING,
+                cv2.BORDER_REPLICATE)
+    return atlas
+
+class EquirectSamplingMap:
+    """立方体贴图转全景图的预计算采样表
+
+    六个面按 FACE_ORDER 纵向拼接为一张图集 (见 face_atlas)，每个全景图像素的采样坐标
+    指向图集中对应面的位置。面内坐标先限制在本面范围内，各面之间有复制边缘的填充，
+    任何插值方式都不会混入图集中相邻的面。
+    """
+
+    def __init__(self, width, height, face_size):
+        self.width = width
+        self.height = height
+        self.face_size = face_size
+
+        face_index, col, row = equirect_to_face_coordinates(width, height, face_size)
+        cell = face_size + 2 * WRAP_PADDING
+        self.map_x = col + np.float32(WRAP_PADDING)
+        self.map_y = row + (face_index * cell + WRAP_PADDING).astype(np.float32)
+
+        self._bilinear_table = None
+        self._lock = threading.Lock()
+
+    def bilinear_table(self):
+        """返回图集上的双线性插值表"""
+        with self._lock:
+            if self._bilinear_table is None:
+                cell = self.face_size + 2 * WRAP_PADDING
+                self._bilinear_table = build_bilinear_table(
+                    self.map_x, self.map_y, cell, cell * len(FACE_ORDER), wrap=False)
+            return self._bilinear_table
+
+    def sample(self, atlas):
+        return bilinear_sample(atlas, self.bilinear_table())
+
+    def remap(self, atlas, interpolation='bilinear'):
+        return cv2.remap(
+            atlas, self.map_x, self.map_y,
+            INTERPOLATIONS[interpolation],
+            borderMode=cv2.BORDER_REPLICATE
+        )
+
+@functools.lru_cache(maxsize=4)
+def _cached_equirect_map(width, height, face_size):
+    return EquirectSamplingMap(width, height, face_size)
+
+def get_equirect_map(width, height, face_size):
+    """获取缓存的立方体贴图转全景图采样表"""
+    with _sampling_map_lock:
+        return _cached_equirect_map(width, height, face_size)
+
+def cubemap_to_equirectangular(faces, width=None, backend='numpy', interpolation='bilinear'):
+    """将立方体贴图转换回等距柱状投影图像
+
+    faces 可以是按 FACE_ORDER 排列的六个面（与 equirectangular_to_cubemap 的返回值相同），
+    也可以是 {面名称: 图像} 字典；缺失（None）的面以黑色填充。
+    width 为输出全景图宽度（高度为宽度的一半），默认是面边长的 4 倍。
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"未知的采样后端: {backend}")
+    if interpolation not in INTERPOLATIONS:
+        raise ValueError(f"未知的插值方式: {interpolation}")
+    if backend == 'numpy' and interpolation != 'bilinear':
+        raise ValueError("NumPy 后端仅支持双线性插值")
+
+    if not isinstance(faces, dict):
+        faces = dict(zip(FACE_ORDER, faces))
+    face_arrays = {
+        face_name: np.asarray(face)
+        for face_name, face in faces.items()
+        if face is not None
+    }
+    if not face_arrays:
+        raise ValueError("至少需要一个立方体面")
+
+    # 所有面必须是相同大小的正方形
+    sample_face = next(iter(face_arrays.values()))
+    face_size = sample_face.shape[0]
+    for face_name, face_array in face_arrays.items():
+        if face_array.shape != sample_face.shape or face_array.shape[1] != face_size:
+            raise ValueError(f"立方体面 {face_name} 的尺寸不一致: {face_array.shape[:2]}")
+
+    if width is None:
+        width = face_size * 4
+    height = width // 2
+
+    atlas = face_atlas(face_arrays, face_size, sample_face.shape[2:])
+    sampling_map = get_equirect_map(width, height, face_size)
+    if backend == 'opencv':
+        equi_pixels = sampling_map.remap(atlas, interpolation)
+    else:
+        equi_pixels = sampling_map.sample(atlas)
+    return Image.fromarray(equi_pixels)
+
+def perspective_coordinates(width, height, size, yaw=0.0, pitch=0.0, fov=90.0):
+    """计算透视视图每个像素在全景图上的采样坐标 (float32)
+
+    yaw 为水平旋转角（向右为正），pitch 为俯仰角（向上为正），fov 为水平视场角，单位均为度。
+    yaw=0、pitch=0、fov=90 的视图与立方体的前面 (posz) 相同。
+    """
+    if not 0 < fov < 180:
+        raise ValueError(f"视场角必须在 0 到 180 度之间: {fov}")
+
+    # 与 face_xyz 中前面 (posz) 相同的相机坐标系
+    extent = np.tan(np.radians(fov) / 2)
+    grid = np.linspace(-extent, extent, size)
+    x, y = np.meshgrid(grid, grid)
+    x, y, z = face_xyz('posz', x, y)
+
+    # 先绕 X 轴俯仰，再绕 Y 轴水平旋转
+    pitch, yaw = np.radians(pitch), np.radians(yaw)
+    y, z = y * np.cos(pitch) - z * np.sin(pitch), y * np.sin(pitch) + z * np.cos(pitch)
+    x, z = x * np.cos(yaw) - z * np.sin(yaw), x * np.sin(yaw) + z * np.cos(yaw)
+
+    # 标准化向量
+    norm = np.sqrt(x**2 + y**2 + z**2)
+    u, v = convert_xyz_to_equirect(x / norm, y / norm, z / norm, height, width)
+    return u.astype(np.float32), v.astype(np.float32)
+
+class PerspectiveSamplingMap:
+    """单个透视视图的预计算采样表"""
+
+    def __init__(self, width, height, size, yaw, pitch, fov):
+        self.width = width
+        self.height = height
+        self.map_x, self.map_y = perspective_coordinates(width, height, size, yaw, pitch, fov)
+
+        self._bilinear_table = None
+        self._remap_table = None
+        self._lock = threading.Lock()
+
+    def sample(self, equi_array):
+        with self._lock:
+            if self._bilinear_table is None:
+                self._bilinear_table = build_bilinear_table(self.map_x, self.map_y, self.width, self.height)
+        return bilinear_sample(equi_array, self._bilinear_table)
+
+    def remap(self, padded_array, interpolation='bilinear'):
+        """使用 cv2.remap 从水平环绕填充后的全景图中取出视图"""
+        with self._lock:
+            if self._remap_table is None:
+                self._remap_table = (
+                    self.map_x + np.float32(WRAP_PADDING),
+                    np.clip(self.map_y, 0, self.height - 1)
+                )
+        map_x, map_y = self._remap_table
+        return cv2.remap(
+            padded_array, map_x, map_y,
+            INTERPOLATIONS[interpolation],
+            borderMode=cv2.BORDER_REPLICATE
+        )
+
+@functools.lru_cache(maxsize=64)
+def _cached_perspective_map(width, height, size, yaw, pitch, fov):
+    return PerspectiveSamplingMap(width, height, size, yaw, pitch, fov)
+
+def get_perspective_map(width, height, size, yaw=0.0, pitch=0.0, fov=90.0):
+    """获取缓存的透视视图采样表"""
+    with _sampling_map_lock:
+        return _cached_perspective_map(width, height, size, float(yaw), float(pitch), float(fov))
+
+def split_views(n_splits, pitches=(0.0,), yaw_offset=0.0):
+    """生成水平等分的视图方向列表 [(yaw, pitch), ...]，每个俯仰角一圈"""
+    if n_splits < 1:
+        raise ValueError(f"分割数量必须大于0: {n_splits}")
+    return [
+        (yaw_offset + index * 360.0 / n_splits, float(pitch))
+        for pitch in pitches
+        for index in range(n_splits)
+    ]
+
+def iter_perspective_views(equi_img, views, size, fov=90.0, backend='numpy', interpolation='bilinear',
+                           antialias=False):
+    """从全景图中逐个提取透视视图，生成 ((yaw, pitch), 视图图像数组)
+
+    antialias 为 True 时先按视图分辨率对全景图做面积平均缩小（见 iter_cubemap_faces）。
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"未知的采样后端: {backend}")
+    if interpolation not in INTERPOLATIONS:
+        raise ValueError(f"未知的插值方式: {interpolation}")
+    if backend == 'numpy' and interpolation != 'bilinear':
+        raise ValueError("NumPy 后端仅支持双线性插值")
+
+    equi_array = np.asarray(equi_img)
+    if antialias:
+        equi_array = antialias_downsample(equi_array, perspective_antialias_width(size, fov))
+    height, width = equi_array.shape[:2]
+    padded_array = wrap_pad(equi_array) if backend == 'opencv' else None
+
+    for yaw, pitch in views:
+        sampling_map = get_perspective_map(width, height, size, yaw, pitch, fov)
+        if backend == 'opencv':
+            yield (yaw, pitch), sampling_map.remap(padded_array, interpolation)
+        else:
+            yield (yaw, pitch), sampling_map.sample(equi_array)
+
+def equirectangular_to_perspective(equi_img, yaw=0.0, pitch=0.0, fov=90.0, size=1024,
+                                   backend='numpy', interpolation='bilinear', antialias=False):
+    """从全景图中提取一个透视视图"""
+    (_, view_pixels), = iter_perspective_views(
+        equi_img, [(yaw, pitch)], size, fov, backend, interpolation, antialias)
+    return Image.fromarray(view_pixels)
@@ -4,6 +4,7 @@ from tkinter import ttk
 import threading
 import os
 import cv2
+import numpy as np
 import time
 import json
 import argparse
@@ -11,9 +12,39 @@ import sys
 from pathlib import Path
 import re
 import glob
+import fnmatch
+import itertools
+import collections
+import concurrent.futures
+import multiprocessing
+import shutil
+import subprocess
+import tempfile
+
+# 进度通道与其他工具共用
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'common'))
+from progress_channel import ProgressChannel
+
+# 默认的图像解码线程数
+DEFAULT_WORKERS = min(8, os.cpu_count() or 1)
+
+# 自然排序时拆分数字的正则（只编译一次）
+NATURAL_SPLIT = re.compile(r'(\d+)')
+
+# 可以边扫描边编码的排序方式（文件系统按名称顺序返回目录列表时）
+STREAM_SORTS = ('natural', 'alphabetical')
+
+# 编码后端：auto 有 ffmpeg 时用 ffmpeg，否则用 OpenCV / ffmpeg / opencv
+BACKENDS = ('auto', 'ffmpeg', 'opencv')
+
+# ffmpeg 后端的编码器及默认编码参数
+FFMPEG_CODECS = {'h264': 'libx264', 'h265': 'libx265'}
+FFMPEG_PRESETS = ('ultrafast', 'superfast', 'veryfast', 'faster', 'fast', 'medium', 'slow', 'slower', 'veryslow')
+FFMPEG_PIX_FMTS = ('yuv420p', 'yuv422p', 'yuv444p')
+DEFAULT_ENCODER = {'codec': 'h264', 'crf': 23, 'preset': 'medium', 'pix_fmt': 'yuv420p', 'threads': 0}
 
 def show_help():
-    help_text = """
+    help_text = f"""
 图像序列帧转视频工具使用说明:
 
 GUI模式:
@@ -28,14 +59,376 @@ GUI模式:
     -o, --output      输出视频文件路径
     -f, --fps         帧率 (默认30)
     -t, --type        输出格式 (mp4/avi, 默认mp4)
+    -w, --workers     图像解码线程数 (默认{DEFAULT_WORKERS})
+    --stream          边扫描边编码: 不等整个目录列完就开始编码, 适用于按补零序号命名的文件
+                      (目录列表不是按顺序返回时自动改为完整排序后重新编码)
+    -b, --backend     编码后端 (auto/ffmpeg/opencv, 默认auto: 找到 ffmpeg 时用 ffmpeg 编码, 否则用 OpenCV)
+    --codec           ffmpeg 编码器 (h264/h265, 默认h264)
+    --crf             ffmpeg 质量参数 CRF (越小质量越高, 默认{DEFAULT_ENCODER['crf']})
+    --preset          ffmpeg 编码速度预设 (ultrafast ... veryslow, 默认{DEFAULT_ENCODER['preset']})
+    --pix-fmt         ffmpeg 输出像素格式 ({'/'.join(FFMPEG_PIX_FMTS)}, 默认{DEFAULT_ENCODER['pix_fmt']})
+    --threads         ffmpeg 编码线程数 (默认0: 自动)
+    -p, --processes   分段并行编码的进程数 (默认1; 大于1时把图像序列分为连续的片段, 在多个进程中
+                      分别用 ffmpeg 编码, 再无损拼接为一个视频; 需要 ffmpeg)
     -?, --help        显示帮助信息
 
 示例:
     image2video.exe -i images_folder -o output.mp4 -f 30 -t mp4
+    image2video.exe -i images_folder -o output.mp4 -b ffmpeg --codec h265 --crf 26 --preset slow
     """
     print(help_text)
     return help_text
 
+def read_frame(image_file, size):
+    """读取一张图像并缩放到视频分辨率 size (宽, 高)，读取失败返回 None"""
+    img = cv2.imread(image_file)
+    if img is not None and (img.shape[1], img.shape[0]) != tuple(size):
+        img = cv2.resize(img, tuple(size))
+    return img
+
+def iter_decoded_frames(image_files, size, workers=DEFAULT_WORKERS, prefetch=None):
+    """按顺序生成 (序号, 文件, 图像)，读取失败的图像为 None
+
+    线程池提前解码并缩放后面最多 prefetch 帧（默认 workers * 2），结果按提交顺序放在
+    有界的队列中，调用方写入当前帧时后面的帧已在并行解码；cv2.imread 和 cv2.resize
+    都会释放 GIL。队列满时不再提交新的解码任务，内存中最多缓存 prefetch 帧。
+    image_files 可以是边扫描边生成文件名的迭代器。提前结束迭代时取消尚未开始的解码任务。
+    """
+    prefetch = max(1, prefetch or workers * 2)
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+    files = enumerate(image_files)
+    pending = collections.deque()
+    try:
+        while True:
+            # 补满预读队列
+            while len(pending) < prefetch:
+                index, image_file = next(files, (None, None))
+                if image_file is None:
+                    break
+                pending.append((index, image_file, executor.submit(read_frame, image_file, size)))
+            if not pending:
+                break
+            index, image_file, future = pending.popleft()
+            yield index, image_file, future.result()
+    finally:
+        for _, _, future in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
+
+class ListingOrderError(Exception):
+    """边扫描边编码时，目录列表的顺序与所选排序方式不一致"""
+
+def natural_key(name):
+    """自然排序键：数字部分按数值比较"""
+    return [int(part) if part.isdigit() else part for part in NATURAL_SPLIT.split(name)]
+
+# 各排序方式的排序键，参数为 os.DirEntry
+SORT_KEYS = {
+    'natural': lambda entry: natural_key(entry.name),
+    'alphabetical': lambda entry: entry.name,
+    'timestamp': lambda entry: entry.stat().st_mtime
+}
+
+class PathEntry:
+    """glob 匹配到的文件，提供排序和边扫描边编码用到的 os.DirEntry 属性 (name, path, stat)
+
+    name 为相对于输入目录的路径，按名称排序时子目录在前，与按完整路径排序的顺序相同。
+    """
+    
+    def __init__(self, path, name):
+        self.path = path
+        self.name = name
+    
+    def stat(self):
+        return os.stat(self.path)
+
+def iter_image_entries(input_dir, pattern):
+    """用 os.scandir 遍历目录，生成文件名匹配 pattern 的文件 (os.DirEntry)
+
+    与 glob 相同，通配符不匹配以 . 开头的隐藏文件。scandir 在遍历时就得到了文件类型，
+    Windows 上还包括修改时间，按时间排序时不需要再对每个文件调用 stat，在网络共享
+    目录中尤其明显。pattern 带有目录部分（如 sub/*.png）时改用 glob 匹配，生成 PathEntry。
+    """
+    if any(sep and sep in pattern for sep in (os.sep, os.altsep)):
+        for path in glob.iglob(os.path.join(input_dir, pattern)):
+            if os.path.isfile(path):
+                yield PathEntry(path, os.path.relpath(path, input_dir))
+        return
+    match_hidden = pattern.startswith('.')
+    with os.scandir(input_dir) as entries:
+        for entry in entries:
+            if ((match_hidden or not entry.name.startswith('.'))
+                    and fnmatch.fnmatch(entry.name, pattern) and entry.is_file()):
+                yield entry
+
+def scan_images(input_dir, pattern, sort_method='natural'):
+    """扫描目录并按 sort_method 排序，返回文件路径列表"""
+    entries = list(iter_image_entries(input_dir, pattern))
+    key = SORT_KEYS.get(sort_method)
+    if key is not None:
+        entries.sort(key=key)
+    return [entry.path for entry in entries]
+
+def iter_listed_images(input_dir, pattern, sort_method='natural'):
+    """边扫描边按目录列表顺序生成文件路径，不需要等整个目录列完就可以开始编码
+
+    适用于文件系统按名称顺序返回目录列表（如 NTFS）且文件名为补零序号的情况。
+    每个文件都检查是否与 sort_method 的顺序一致，不一致时抛出 ListingOrderError，
+    调用方应改用 scan_images 完整排序后重新编码。
+    """
+    key = SORT_KEYS[sort_method]
+    previous = None
+    for entry in iter_image_entries(input_dir, pattern):
+        current = key(entry)
+        if previous is not None and current < previous:
+            raise ListingOrderError(f"目录列表不是按顺序返回的: {entry.name}")
+        previous = current
+        yield entry.path
+
+def find_ffmpeg():
+    """查找 ffmpeg：优先使用程序所在目录中的 ffmpeg，其次为 PATH 中的，找不到返回 None"""
+    if getattr(sys, 'frozen', False):
+        app_dir = os.path.dirname(sys.executable)
+    else:
+        app_dir = os.path.dirname(os.path.abspath(__file__))
+    return shutil.which('ffmpeg', path=app_dir) or shutil.which('ffmpeg')
+
+class FFmpegPipeWriter:
+    """通过管道把原始 BGR 帧交给 ffmpeg 编码，用法与 cv2.VideoWriter 相同 (write / release / isOpened)
+
+    cv2.VideoWriter 常常静默退回 mp4v，且无法控制码率和编码参数。ffmpeg 的 libx264/libx265
+    自带多线程编码，同等画质下文件小得多。encoder 为编码参数 (codec, crf, preset, pix_fmt,
+    threads)，见 DEFAULT_ENCODER。yuv420p 等色度抽样格式要求宽高为偶数，奇数时补一行/列黑边。
+    ffmpeg 出错时 error 为其错误输出。
+    """
+    
+    def __init__(self, output_file, fps, size, encoder=None, ffmpeg=None, segment=False):
+        self.size = tuple(size)
+        self.error = None
+        self.command = ffmpeg_encode_command(output_file, fps, size, encoder, ffmpeg, segment)
+        
+        self._stderr = tempfile.TemporaryFile()
+        try:
+            self.process = subprocess.Popen(
+                self.command, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=self._stderr,
+                creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0))
+        except OSError as e:
+            self.process = None
+            self.error = str(e)
+    
+    def isOpened(self):
+        return self.process is not None and self.process.poll() is None and self.error is None
+    
+    def write(self, frame):
+        if not self.isOpened():
+            return
+        if (frame.shape[1], frame.shape[0]) != self.size:
+            frame = cv2.resize(frame, self.size)
+        try:
+            self.process.stdin.write(np.ascontiguousarray(frame).data)
+        except (BrokenPipeError, OSError):
+            # ffmpeg 已退出，错误信息在 release 时读取
+            self.error = self.error or "ffmpeg 意外退出"
+    
+    def release(self):
+        """结束输入并等待 ffmpeg 完成编码，返回是否成功"""
+        if self.process is None:
+            return False
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+        returncode = self.process.wait()
+        if returncode != 0:
+            self._stderr.seek(0)
+            message = self._stderr.read().decode('utf-8', errors='replace').strip()
+            self.error = message or self.error or f"ffmpeg 退出码 {returncode}"
+        self._stderr.close()
+        return returncode == 0
+
+def ffmpeg_encode_command(output_file, fps, size, encoder=None, ffmpeg=None, segment=False):
+    """生成从管道读取原始 BGR 帧并编码的 ffmpeg 命令；output_file 为 None 时只编码不输出
+
+    segment 为 True 时生成供 concat_segments 拼接的片段：使用封闭 GOP，时间戳从 0 开始
+    (B 帧使第一帧的解码时间戳为负，MP4 会为此写入编辑列表，拼接后片段交界处可能出现
+    时间戳空隙)，也不需要 faststart。
+    """
+    encoder = dict(DEFAULT_ENCODER, **(encoder or {}))
+    width, height = size
+    command = [
+        ffmpeg or find_ffmpeg() or 'ffmpeg', '-y', '-hide_banner', '-loglevel', 'error',
+        '-f', 'rawvideo', '-pix_fmt', 'bgr24', '-s', f"{width}x{height}", '-r', str(fps), '-i', '-',
+        '-an', '-c:v', FFMPEG_CODECS.get(encoder['codec'], encoder['codec']),
+        '-crf', str(encoder['crf']), '-preset', encoder['preset'],
+        '-pix_fmt', encoder['pix_fmt'], '-threads', str(encoder['threads'])
+    ]
+    if encoder['pix_fmt'] != 'yuv444p' and (width % 2 or height % 2):
+        command += ['-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2']
+    if output_file is None:
+        return command + ['-f', 'null', '-']
+    if segment:
+        command += ['-flags', '+cgop', '-avoid_negative_ts', 'make_zero']
+    elif output_file.lower().endswith('.mp4'):
+        command += ['-movflags', '+faststart']
+    if output_file.lower().endswith('.mp4') and encoder['codec'] == 'h265':
+        # 苹果播放器要求 hvc1 标签
+        command += ['-tag:v', 'hvc1']
+    return command + [output_file]
+
+def probe_ffmpeg_encoder(fps, size, encoder=None, ffmpeg=None):
+    """用一帧黑色图像试运行编码器，返回错误信息，可以正常编码时返回 None
+
+    编码器在收到第一帧后才初始化，缺少 libx265、像素格式不受支持等错误要等到写完所有帧、
+    release 时才能发现，因此在创建输出文件之前先试编码一帧。
+    """
+    width, height = size
+    try:
+        result = subprocess.run(
+            ffmpeg_encode_command(None, fps, size, encoder, ffmpeg),
+            input=np.zeros((height, width, 3), np.uint8).tobytes(),
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, timeout=60,
+            creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0))
+    except (OSError, subprocess.SubprocessError) as e:
+        return str(e)
+    if result.returncode != 0:
+        return result.stderr.decode('utf-8', errors='replace').strip() or f"ffmpeg 退出码 {result.returncode}"
+    return None
+
+def create_ffmpeg_writer(output_file, fps, size, backend='auto', encoder=None):
+    """按编码后端设置创建 FFmpegPipeWriter
+
+    backend 为 opencv 时返回 None，调用方改用 cv2.VideoWriter；backend 为 auto 时，找不到
+    ffmpeg、ffmpeg 无法启动或试编码失败同样返回 None；backend 为 ffmpeg 时这些情况抛出 RuntimeError。
+    """
+    if backend == 'opencv':
+        return None
+    ffmpeg = find_ffmpeg()
+    if ffmpeg is None:
+        if backend == 'ffmpeg':
+            raise RuntimeError("未找到 ffmpeg，请安装 ffmpeg 或将其放在程序所在目录")
+        return None
+    error = probe_ffmpeg_encoder(fps, size, encoder, ffmpeg)
+    if error is None:
+        writer = FFmpegPipeWriter(output_file, fps, size, encoder, ffmpeg)
+        if writer.isOpened():
+            return writer
+        writer.release()
+        error = writer.error
+    if backend == 'ffmpeg':
+        raise RuntimeError(f"无法启动 ffmpeg: {error}")
+    return None
+
+def plan_chunks(count, chunk_count):
+    """把 count 帧均分为 chunk_count 个连续片段，返回 (起始序号, 结束序号) 列表"""
+    chunk_count = max(1, min(chunk_count, count))
+    base, extra = divmod(count, chunk_count)
+    chunks = []
+    start = 0
+    for i in range(chunk_count):
+        end = start + base + (1 if i < extra else 0)
+        chunks.append((start, end))
+        start = end
+    return chunks
+
+def encode_segment(image_files, segment_file, fps, size, encoder, workers):
+    """在子进程中把一段图像编码为独立的视频片段，返回 (写入帧数, 无法读取的文件列表, ffmpeg 错误信息)
+
+    每个片段由单独的 ffmpeg 编码，第一帧总是关键帧 (IDR)，使用封闭 GOP 且时间戳从 0 开始，
+    因此片段可以不重新编码直接拼接，拼接处播放连续。
+    """
+    writer = FFmpegPipeWriter(segment_file, fps, size, encoder, segment=True)
+    processed_count = 0
+    unreadable = []
+    for _, img_file, img in iter_decoded_frames(image_files, size, workers):
+        if not writer.isOpened():
+            break
+        if img is None:
+            unreadable.append(img_file)
+            continue
+        writer.write(img)
+        processed_count += 1
+    writer.release()
+    return processed_count, unreadable, writer.error
+
+def concat_segments(segment_files, output_file, ffmpeg=None):
+    """用 ffmpeg 的 concat 分离器按顺序无损拼接视频片段 (-c copy)，失败时抛出 RuntimeError"""
+    list_file = os.path.join(os.path.dirname(segment_files[0]), 'segments.txt')
+    with open(list_file, 'w', encoding='utf-8') as f:
+        for segment_file in segment_files:
+            escaped = os.path.abspath(segment_file).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+    command = [ffmpeg or find_ffmpeg() or 'ffmpeg', '-y', '-hide_banner', '-loglevel', 'error',
+               '-f', 'concat', '-safe', '0', '-i', list_file, '-c', 'copy']
+    if output_file.lower().endswith('.mp4'):
+        command += ['-movflags', '+faststart']
+    command.append(output_file)
+    result = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                            creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0))
+    if result.returncode != 0:
+        raise RuntimeError(f"拼接视频片段失败: {result.stderr.decode('utf-8', errors='replace').strip()}")
+
+def encode_segments_parallel(image_files, output_file, fps, size, encoder, processes, workers=DEFAULT_WORKERS,
+                             should_continue=None, on_segment_done=None):
+    """把图像序列分为 processes 个连续片段，在多个进程中并行编码后无损拼接为 output_file
+
+    单个编码器的吞吐量有上限，长序列分段后每个进程各自解码并运行一个 ffmpeg。片段写在输出
+    目录下的临时目录中，拼接完成后删除。各进程的解码线程数为 workers // processes，未指定
+    ffmpeg 编码线程数时同样平分 CPU。should_continue 返回 False 时取消尚未开始的片段且不拼接；
+    有片段编码失败时也不拼接。on_segment_done(帧数) 在每个片段完成后调用。
+    返回 (写入帧数, 错误信息列表)。
+    """
+    chunks = plan_chunks(len(image_files), processes)
+    encoder = dict(DEFAULT_ENCODER, **(encoder or {}))
+    if not encoder['threads']:
+        encoder['threads'] = max(1, (os.cpu_count() or 1) // len(chunks))
+    extension = os.path.splitext(output_file)[1] or '.mp4'
+    temp_dir = tempfile.mkdtemp(prefix='.segments_', dir=os.path.dirname(os.path.abspath(output_file)))
+    segment_files = [os.path.join(temp_dir, f"segment_{i:03d}{extension}") for i in range(len(chunks))]
+    
+    processed_count = 0
+    errors = []
+    complete = True
+    try:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=len(chunks)) as executor:
+            futures = {}
+            for (start, end), segment_file in zip(chunks, segment_files):
+                future = executor.submit(encode_segment, image_files[start:end], segment_file, fps, size,
+                                         encoder, max(1, workers // len(chunks)))
+                futures[future] = (start, end)
+            
+            for future in concurrent.futures.as_completed(futures):
+                if should_continue is not None and not should_continue():
+                    for pending in futures:
+                        pending.cancel()
+                    complete = False
+                    break
+                start, end = futures[future]
+                try:
+                    segment_count, unreadable, error = future.result()
+                except Exception as e:
+                    segment_count, unreadable, error = 0, [], str(e)
+                processed_count += segment_count
+                errors.extend(f"无法读取图像: {img_file}" for img_file in unreadable)
+                if error:
+                    errors.append(f"片段 {start + 1}-{end} 帧编码失败: {error}")
+                    complete = False
+                if on_segment_done is not None:
+                    on_segment_done(end - start)
+        
+        if complete:
+            concat_segments(segment_files, output_file)
+        elif errors:
+            errors.append("存在编码失败的片段，未生成输出文件")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    return processed_count, errors
+
+def encoder_description(encoder):
+    """ffmpeg 编码参数的说明文字"""
+    encoder = dict(DEFAULT_ENCODER, **(encoder or {}))
+    return (f"ffmpeg {FFMPEG_CODECS.get(encoder['codec'], encoder['codec'])}, CRF {encoder['crf']}, "
+            f"{encoder['preset']}, {encoder['pix_fmt']}, 编码线程 {encoder['threads'] or '自动'}")
+
 class ImageToVideoConverter:
     def __init__(self, master=None, args=None):
         # 初始化转换状态
@@ -90,6 +483,8 @@ class ImageToVideoConverter:
         sort_options = ttk.Combobox(sort_frame, textvariable=self.sort_var, state="readonly", 
                                   values=["natural", "alphabetical", "timestamp"])
         sort_options.pack(side=tk.LEFT, padx=5)
+        self.stream_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(sort_frame, text="边扫描边编码 (文件名为补零序号时)", variable=self.stream_var).pack(side=tk.LEFT, padx=10)
         
         # 输出文件设置
         output_frame = ttk.Frame(main_frame)
@@ -116,6 +511,12 @@ class ImageToVideoConverter:
         ttk.Radiobutton(video_settings_frame, text='MP4', variable=self.format_var, value='mp4').pack(side=tk.LEFT, padx=(5, 5))
         ttk.Radiobutton(video_settings_frame, text='AVI', variable=self.format_var, value='avi').pack(side=tk.LEFT)
         
+        # 解码线程数
+        ttk.Label(video_settings_frame, text="解码线程:").pack(side=tk.LEFT, padx=(15, 0))
+        self.workers_var = tk.StringVar(value=str(DEFAULT_WORKERS))
+        self.workers_entry = ttk.Entry(video_settings_frame, width=6, textvariable=self.workers_var)
+        self.workers_entry.pack(side=tk.LEFT, padx=5)
+        
         # 编解码器选择
         codec_frame = ttk.Frame(main_frame)
         codec_frame.pack(fill=tk.X, pady=3)
@@ -124,6 +525,36 @@ class ImageToVideoConverter:
         codec_options = ttk.Combobox(codec_frame, textvariable=self.codec_var, state="readonly", 
                                    values=["AUTO", "H264", "XVID", "MJPG", "DIVX", "MP4V"])
         codec_options.pack(side=tk.LEFT, padx=5)
+        ttk.Label(codec_frame, text="(OpenCV 后端)").pack(side=tk.LEFT)
+        
+        # 编码后端和 ffmpeg 编码参数
+        ffmpeg_frame = ttk.Frame(main_frame)
+        ffmpeg_frame.pack(fill=tk.X, pady=3)
+        ttk.Label(ffmpeg_frame, text="编码后端:").pack(side=tk.LEFT)
+        self.backend_var = tk.StringVar(value="auto")
+        ttk.Combobox(ffmpeg_frame, textvariable=self.backend_var, state="readonly", width=7,
+                     values=list(BACKENDS)).pack(side=tk.LEFT, padx=(5, 15))
+        ttk.Label(ffmpeg_frame, text="ffmpeg 编码器:").pack(side=tk.LEFT)
+        self.ffmpeg_codec_var = tk.StringVar(value=DEFAULT_ENCODER['codec'])
+        ttk.Combobox(ffmpeg_frame, textvariable=self.ffmpeg_codec_var, state="readonly", width=6,
+                     values=list(FFMPEG_CODECS)).pack(side=tk.LEFT, padx=(5, 15))
+        ttk.Label(ffmpeg_frame, text="CRF:").pack(side=tk.LEFT)
+        self.crf_var = tk.StringVar(value=str(DEFAULT_ENCODER['crf']))
+        ttk.Entry(ffmpeg_frame, width=4, textvariable=self.crf_var).pack(side=tk.LEFT, padx=(5, 15))
+        ttk.Label(ffmpeg_frame, text="预设:").pack(side=tk.LEFT)
+        self.preset_var = tk.StringVar(value=DEFAULT_ENCODER['preset'])
+        ttk.Combobox(ffmpeg_frame, textvariable=self.preset_var, state="readonly", width=9,
+                     values=list(FFMPEG_PRESETS)).pack(side=tk.LEFT, padx=(5, 15))
+        ttk.Label(ffmpeg_frame, text="像素格式:").pack(side=tk.LEFT)
+        self.pix_fmt_var = tk.StringVar(value=DEFAULT_ENCODER['pix_fmt'])
+        ttk.Combobox(ffmpeg_frame, textvariable=self.pix_fmt_var, state="readonly", width=8,
+                     values=list(FFMPEG_PIX_FMTS)).pack(side=tk.LEFT, padx=(5, 15))
+        ttk.Label(ffmpeg_frame, text="编码线程:").pack(side=tk.LEFT)
+        self.threads_var = tk.StringVar(value="0")
+        ttk.Entry(ffmpeg_frame, width=4, textvariable=self.threads_var).pack(side=tk.LEFT, padx=(5, 15))
+        ttk.Label(ffmpeg_frame, text="分段进程:").pack(side=tk.LEFT)
+        self.processes_var = tk.StringVar(value="1")
+        ttk.Entry(ffmpeg_frame, width=4, textvariable=self.processes_var).pack(side=tk.LEFT, padx=5)
         
         # 分辨率设置
         resolution_frame = ttk.Frame(main_frame)
@@ -161,9 +592,31 @@ class ImageToVideoConverter:
         self.start_button = ttk.Button(button_frame, text="开始转换", command=self.toggle_conversion)
         self.start_button.pack(side=tk.RIGHT)
         
+        # 工作线程通过进度通道更新界面
+        self.channel = ProgressChannel(self.master, self.show_progress, self.append_log)
+        
         # 加载配置
         self.load_config()
         
+    def show_progress(self, value, maximum):
+        if maximum is not None:
+            self.progress['maximum'] = maximum
+        if value is not None:
+            self.progress['value'] = value
+    
+    def set_progress_busy(self, busy):
+        """总帧数未知时让进度条显示忙碌动画"""
+        if busy:
+            self.progress.config(mode="indeterminate")
+            self.progress.start(50)
+        else:
+            self.progress.stop()
+            self.progress.config(mode="determinate")
+    
+    def append_log(self, text):
+        self.log_text.insert(tk.END, text)
+        self.log_text.see(tk.END)
+        
     def browse_input_directory(self):
         directory = filedialog.askdirectory(title="选择图像序列文件夹")
         if directory:
@@ -255,8 +708,7 @@ class ImageToVideoConverter:
         for codec_name, codec_fourcc in codec_options:
             writer = cv2.VideoWriter(output_file, codec_fourcc, fps, size)
             if writer.isOpened():
-                self.log_text.insert(tk.END, f"使用备选编解码器: {codec_name}\n")
-                self.log_text.see(tk.END)
+                self.channel.log(f"使用备选编解码器: {codec_name}\n")
                 return writer, codec_fourcc
         
         return None, None
@@ -282,39 +734,50 @@ class ImageToVideoConverter:
             fourcc_code = codec_map.get(codec_name, "mp4v")
             return cv2.VideoWriter_fourcc(*fourcc_code)
     
-    def convert_images_to_video(self):
+    def convert_images_to_video(self, stream=True):
+        retry = False
         try:
             input_dir = self.image_dir
             output_file = self.output_file.get()
             pattern = self.filter_var.get()
             fps = int(self.fps_var.get() or "30")
+            workers = max(1, int(self.workers_var.get() or DEFAULT_WORKERS))
             sort_method = self.sort_var.get()
             selected_codec = self.codec_var.get()
             output_format = self.format_var.get()
+            backend = self.backend_var.get()
+            encoder = {
+                'codec': self.ffmpeg_codec_var.get(),
+                'crf': int(self.crf_var.get() or DEFAULT_ENCODER['crf']),
+                'preset': self.preset_var.get(),
+                'pix_fmt': self.pix_fmt_var.get(),
+                'threads': int(self.threads_var.get() or 0)
+            }
+            processes = max(1, int(self.processes_var.get() or 1))
             
-            # 获取所有匹配的图像文件
-            image_files = glob.glob(os.path.join(input_dir, pattern))
+            # 获取所有匹配的图像文件（os.scandir 一次遍历），按选择的排序方法排序；
+            # 边扫描边编码时按目录列表顺序逐个取文件，不等整个目录列完
+            stream = stream and self.stream_var.get()
+            if stream and (sort_method not in STREAM_SORTS or processes > 1):
+                self.channel.log("按修改时间排序或分段并行编码需要完整的文件列表，不使用边扫描边编码\n")
+                stream = False
+            if stream:
+                image_files = iter_listed_images(input_dir, pattern, sort_method)
+                first_file = next(image_files, None)
+                image_files = itertools.chain([first_file], image_files)
+            else:
+                image_files = scan_images(input_dir, pattern, sort_method)
+                first_file = image_files[0] if image_files else None
             
-            if not image_files:
-                self.log_text.insert(tk.END, f"未找到匹配的图像文件: {pattern}\n")
-                self.log_text.see(tk.END)
+            if first_file is None:
+                self.channel.log(f"未找到匹配的图像文件: {pattern}\n")
                 self.is_converting = False
-                self.start_button.config(text="开始转换")
                 return
                 
-            # 根据选择的排序方法排序文件
-            if sort_method == "natural":
-                # 自然排序（考虑数字序列）
-                image_files.sort(key=lambda x: [int(c) if c.isdigit() else c for c in re.split(r'(\d+)', x)])
-            elif sort_method == "alphabetical":
-                # 字母顺序排序
-                image_files.sort()
-            elif sort_method == "timestamp":
-                # 按文件修改时间排序
-                image_files.sort(key=os.path.getmtime)
-                
-            self.log_text.insert(tk.END, f"找到 {len(image_files)} 个图像文件\n")
-            self.log_text.see(tk.END)
+            if stream:
+                self.channel.log("边扫描边编码: 按目录列表顺序读取图像文件\n")
+            else:
+                self.channel.log(f"找到 {len(image_files)} 个图像文件\n")
             
             # 获取编解码器fourcc代码
             fourcc = self.get_codec_fourcc(selected_codec, output_format)
@@ -330,78 +793,112 @@ class ImageToVideoConverter:
             
             # 如果未指定分辨率，使用第一张图片的分辨率
             if not (width and height):
-                first_img = cv2.imread(image_files[0])
+                first_img = cv2.imread(first_file)
                 if first_img is None:
-                    self.log_text.insert(tk.END, f"无法读取图像: {image_files[0]}\n")
+                    self.channel.log(f"无法读取图像: {first_file}\n")
                     self.is_converting = False
-                    self.start_button.config(text="开始转换")
                     return
                     
                 h, w = first_img.shape[:2]
-                self.log_text.insert(tk.END, f"使用图像分辨率: {w}x{h}\n")
+                self.channel.log(f"使用图像分辨率: {w}x{h}\n")
             else:
                 try:
                     w = int(width)
                     h = int(height)
-                    self.log_text.insert(tk.END, f"使用自定义分辨率: {w}x{h}\n")
+                    self.channel.log(f"使用自定义分辨率: {w}x{h}\n")
                 except ValueError:
-                    self.log_text.insert(tk.END, "分辨率格式无效，必须是整数\n")
+                    self.channel.log("分辨率格式无效，必须是整数\n")
                     self.is_converting = False
-                    self.start_button.config(text="开始转换")
                     return
                     
-            # 创建 VideoWriter 对象
-            self.log_text.insert(tk.END, f"创建视频文件: {output_file}\n")
-            self.log_text.insert(tk.END, f"使用编解码器: {selected_codec}\n")
+            if processes > 1 and (backend == 'opencv' or find_ffmpeg() is None or (
+                    backend == 'auto' and probe_ffmpeg_encoder(fps, (w, h), encoder) is not None)):
+                self.channel.log("分段并行编码需要可用的 ffmpeg，改为单进程编码\n")
+                processes = 1
             
-            # 尝试创建VideoWriter，如果失败则尝试备选方案
-            video_writer, used_fourcc = self.try_create_video_writer(output_file, fourcc, fps, (w, h))
-            
-            if video_writer is None or not video_writer.isOpened():
-                self.log_text.insert(tk.END, f"无法创建输出视频文件: {output_file}\n")
-                self.log_text.insert(tk.END, f"请尝试其他编解码器或确保相关编解码器已安装\n")
-                self.log_text.insert(tk.END, f"如果使用H264编解码器，可能需要下载OpenH264库: https://github.com/cisco/openh264/releases\n")
+            if processes > 1:
+                # 分段并行：每个进程把一段连续的图像编码为独立片段，再无损拼接
+                selected_codec = encoder_description(encoder)
+                self.channel.log(f"创建视频文件: {output_file}\n")
+                self.channel.log(f"使用编码器: {selected_codec}\n")
+                self.channel.log(f"分段并行编码: {processes} 个进程\n")
+                self.channel.progress(0, len(image_files))
                 
-                self.is_converting = False
-                self.start_button.config(text="开始转换")
-                return
-            
-            # 设置进度条
-            self.progress['maximum'] = len(image_files)
-            
-            start_time = time.time()
-            processed_count = 0
-            
-            # 开始处理图像
-            for i, img_file in enumerate(image_files):
-                if self.should_stop:
-                    break
+                start_time = time.time()
+                done_count = 0
+                
+                def on_segment_done(segment_count):
+                    nonlocal done_count
+                    done_count += segment_count
+                    self.channel.progress(done_count)
+                
+                processed_count, errors = encode_segments_parallel(
+                    image_files, output_file, fps, (w, h), encoder, processes, workers,
+                    should_continue=lambda: not self.should_stop, on_segment_done=on_segment_done)
+                for error in errors:
+                    self.channel.log(f"{error}\n")
+            else:
+                # 创建视频写入器：按编码后端设置优先使用 ffmpeg，否则使用 OpenCV 的 VideoWriter
+                self.channel.log(f"创建视频文件: {output_file}\n")
+                try:
+                    video_writer = create_ffmpeg_writer(output_file, fps, (w, h), backend, encoder)
+                except RuntimeError as e:
+                    self.channel.log(f"{str(e)}\n")
+                    self.is_converting = False
+                    return
+                if video_writer is not None:
+                    selected_codec = encoder_description(encoder)
+                    self.channel.log(f"使用编码器: {selected_codec}\n")
+                else:
+                    self.channel.log(f"使用编解码器: {selected_codec}\n")
                     
-                img = cv2.imread(img_file)
-                if img is None:
-                    self.log_text.insert(tk.END, f"无法读取图像: {img_file}\n")
-                    self.log_text.see(tk.END)
-                    continue
+                    # 尝试创建VideoWriter，如果失败则尝试备选方案
+                    video_writer, used_fourcc = self.try_create_video_writer(output_file, fourcc, fps, (w, h))
                 
-                # 调整图像大小以匹配视频分辨率
-                if img.shape[1] != w or img.shape[0] != h:
-                    img = cv2.resize(img, (w, h))
+                if video_writer is None or not video_writer.isOpened():
+                    self.channel.log(f"无法创建输出视频文件: {output_file}\n")
+                    self.channel.log(f"请尝试其他编解码器或确保相关编解码器已安装\n")
+                    self.channel.log(f"如果使用H264编解码器，可能需要下载OpenH264库: https://github.com/cisco/openh264/releases\n")
+                    
+                    self.is_converting = False
+                    return
                 
-                # 写入帧
-                video_writer.write(img)
-                processed_count += 1
+                # 设置进度条（边扫描边编码时总帧数未知，只显示忙碌状态）
+                if stream:
+                    self.channel.call(lambda: self.set_progress_busy(True))
+                else:
+                    self.channel.progress(0, len(image_files))
                 
-                # 更新进度
-                self.progress['value'] = i + 1
-                if (i + 1) % 10 == 0 or (i + 1) == len(image_files):
-                    self.log_text.insert(tk.END, f"处理中: {i+1}/{len(image_files)} 帧\n")
-                    self.log_text.see(tk.END)
+                start_time = time.time()
+                processed_count = 0
                 
-                # 更新UI
-                self.master.update_idletasks()
-            
-            # 释放资源
-            video_writer.release()
+                # 开始处理图像：后台线程按顺序提前解码并缩放后面的帧，当前线程只负责写入
+                try:
+                    for i, img_file, img in iter_decoded_frames(image_files, (w, h), workers):
+                        if self.should_stop or not video_writer.isOpened():
+                            break
+                        
+                        if img is None:
+                            self.channel.log(f"无法读取图像: {img_file}\n")
+                            continue
+                        
+                        # 写入帧
+                        video_writer.write(img)
+                        processed_count += 1
+                        
+                        # 更新进度（只记录数值，界面由主线程定时刷新）
+                        self.channel.progress(i + 1)
+                except ListingOrderError:
+                    video_writer.release()
+                    raise
+                finally:
+                    if stream:
+                        self.channel.call(lambda: self.set_progress_busy(False))
+                
+                # 释放资源（ffmpeg 在此完成剩余帧的编码）
+                video_writer.release()
+                if getattr(video_writer, 'error', None):
+                    self.channel.log(f"ffmpeg 编码失败: {video_writer.error}\n")
             
             # 计算处理时间
             elapsed_time = time.time() - start_time
@@ -409,35 +906,39 @@ class ImageToVideoConverter:
             seconds = elapsed_time % 60
             
             if not self.should_stop:
-                self.log_text.insert(tk.END, f"\n处理完成!\n")
-                self.log_text.insert(tk.END, f"输出文件: {output_file}\n")
-                self.log_text.insert(tk.END, f"处理了 {processed_count} 帧图像\n")
-                self.log_text.insert(tk.END, f"视频帧率: {fps} fps\n")
-                self.log_text.insert(tk.END, f"分辨率: {w}x{h}\n")
-                self.log_text.insert(tk.END, f"编解码器: {selected_codec}\n")
-                self.log_text.insert(tk.END, f"总用时: {minutes}分 {seconds:.1f}秒\n")
+                self.channel.log(f"\n处理完成!\n")
+                self.channel.log(f"输出文件: {output_file}\n")
+                self.channel.log(f"处理了 {processed_count} 帧图像\n")
+                self.channel.log(f"视频帧率: {fps} fps\n")
+                self.channel.log(f"分辨率: {w}x{h}\n")
+                self.channel.log(f"编解码器: {selected_codec}\n")
+                self.channel.log(f"总用时: {minutes}分 {seconds:.1f}秒\n")
                 
                 # 检查文件是否成功创建
                 if os.path.exists(output_file) and os.path.getsize(output_file) > 0:
-                    self.log_text.insert(tk.END, f"视频文件已成功创建\n")
+                    self.channel.log(f"视频文件已成功创建\n")
                 else:
-                    self.log_text.insert(tk.END, f"警告: 输出文件可能未正确创建或为空\n")
+                    self.channel.log(f"警告: 输出文件可能未正确创建或为空\n")
             else:
-                self.log_text.insert(tk.END, f"\n转换已停止\n")
-                self.log_text.insert(tk.END, f"已处理 {processed_count} 帧图像\n")
-            
-            self.log_text.see(tk.END)
+                self.channel.log(f"\n转换已停止\n")
+                self.channel.log(f"已处理 {processed_count} 帧图像\n")
             
+        except ListingOrderError as e:
+            # 已写入的帧顺序可能有误，完整排序后重新编码
+            self.channel.log(f"{str(e)}，改为完整排序后重新编码\n")
+            retry = True
         except Exception as e:
-            self.log_text.insert(tk.END, f"处理失败: {str(e)}\n")
+            self.channel.log(f"处理失败: {str(e)}\n")
             import traceback
-            self.log_text.insert(tk.END, f"错误详情: {traceback.format_exc()}\n")
-            self.log_text.see(tk.END)
+            self.channel.log(f"错误详情: {traceback.format_exc()}\n")
         finally:
-            self.is_converting = False
-            self.should_stop = False
-            self.start_button.config(text="开始转换")
-            self.save_config()
+            if not retry:
+                self.is_converting = False
+                self.should_stop = False
+                self.channel.call(lambda: self.start_button.config(text="开始转换"))
+                self.channel.call(self.save_config)
+        if retry:
+            self.convert_images_to_video(stream=False)
 
     def load_config(self):
         """从配置文件加载设置"""
@@ -455,11 +956,22 @@ class ImageToVideoConverter:
                     self.output_file.set(config.get("output_file", ""))
                     self.filter_var.set(config.get("filter", "*.png"))
                     self.sort_var.set(config.get("sort_method", "natural"))
+                    self.stream_var.set(config.get("stream", False))
                     
                     # 视频设置
                     self.fps_var.set(config.get("fps", "30"))
                     self.format_var.set(config.get("format", "mp4"))
                     self.codec_var.set(config.get("codec", "AUTO"))
+                    self.workers_var.set(config.get("workers", str(DEFAULT_WORKERS)))
+                    
+                    # 编码后端设置
+                    self.backend_var.set(config.get("backend", "auto"))
+                    self.ffmpeg_codec_var.set(config.get("ffmpeg_codec", DEFAULT_ENCODER['codec']))
+                    self.crf_var.set(config.get("crf", str(DEFAULT_ENCODER['crf'])))
+                    self.preset_var.set(config.get("preset", DEFAULT_ENCODER['preset']))
+                    self.pix_fmt_var.set(config.get("pix_fmt", DEFAULT_ENCODER['pix_fmt']))
+                    self.threads_var.set(config.get("threads", "0"))
+                    self.processes_var.set(config.get("processes", "1"))
                     
                     # 分辨率设置
                     self.width_var.set(config.get("width", ""))
@@ -477,11 +989,22 @@ class ImageToVideoConverter:
             "output_file": self.output_file.get(),
             "filter": self.filter_var.get(),
             "sort_method": self.sort_var.get(),
+            "stream": self.stream_var.get(),
             
             # 视频设置
             "fps": self.fps_var.get(),
             "format": self.format_var.get(),
             "codec": self.codec_var.get(),
+            "workers": self.workers_var.get(),
+            
+            # 编码后端设置
+            "backend": self.backend_var.get(),
+            "ffmpeg_codec": self.ffmpeg_codec_var.get(),
+            "crf": self.crf_var.get(),
+            "preset": self.preset_var.get(),
+            "pix_fmt": self.pix_fmt_var.get(),
+            "threads": self.threads_var.get(),
+            "processes": self.processes_var.get(),
             
             # 分辨率设置
             "width": self.width_var.get(),
@@ -511,8 +1034,26 @@ class ImageToVideoConverter:
             self.fps_var.set(str(args.fps))
         if args.type:
             self.format_var.set(args.type.lower())
+        if args.workers:
+            self.workers_var.set(str(args.workers))
+        if args.stream:
+            self.stream_var.set(True)
+        if args.backend:
+            self.backend_var.set(args.backend)
+        if args.codec:
+            self.ffmpeg_codec_var.set(args.codec)
+        if args.crf is not None:
+            self.crf_var.set(str(args.crf))
+        if args.preset:
+            self.preset_var.set(args.preset)
+        if args.pix_fmt:
+            self.pix_fmt_var.set(args.pix_fmt)
+        if args.threads is not None:
+            self.threads_var.set(str(args.threads))
+        if args.processes:
+            self.processes_var.set(str(args.processes))
 
-    def process_command_line(self, args):
+    def process_command_line(self, args, stream=None):
         """处理命令行模式的转换"""
         if not all([args.input, args.output]):
             print("错误: 需要指定输入目录和输出视频文件")
@@ -522,33 +1063,43 @@ class ImageToVideoConverter:
         output_file = args.output
         fps = args.fps or 30
         output_format = args.type.lower() if args.type else 'mp4'
+        workers = max(1, args.workers or DEFAULT_WORKERS)
         
         if not os.path.isdir(input_dir):
             print(f"错误: 输入目录不存在: {input_dir}")
             return
         
-        # 获取所有图像文件
-        image_files = glob.glob(os.path.join(input_dir, "*.png"))
-        if not image_files:
-            image_files = glob.glob(os.path.join(input_dir, "*.jpg"))
+        # 获取所有图像文件（os.scandir 一次遍历，自然排序）；边扫描边编码时按目录列表顺序逐个取文件
+        stream = args.stream if stream is None else stream
+        if stream and (args.processes or 1) > 1:
+            print("提示: 分段并行编码需要完整的文件列表，不使用边扫描边编码")
+            stream = False
+        for pattern in ("*.png", "*.jpg"):
+            if stream:
+                image_files = iter_listed_images(input_dir, pattern)
+                first_file = next(image_files, None)
+                image_files = itertools.chain([first_file], image_files)
+            else:
+                image_files = scan_images(input_dir, pattern)
+                first_file = image_files[0] if image_files else None
+            if first_file is not None:
+                break
         
-        if not image_files:
+        if first_file is None:
             print("错误: 输入目录中未找到图像文件")
             return
             
         print(f"开始转换...")
         print(f"输入目录: {input_dir}")
-        print(f"找到 {len(image_files)} 个图像文件")
+        print("边扫描边编码: 按目录列表顺序读取图像文件" if stream else f"找到 {len(image_files)} 个图像文件")
         print(f"输出文件: {output_file}")
         print(f"帧率: {fps}")
-        
-        # 自然排序文件
-        image_files.sort(key=lambda x: [int(c) if c.isdigit() else c for c in re.split(r'(\d+)', x)])
+        print(f"解码线程: {workers}")
         
         # 获取第一张图片的尺寸
-        first_img = cv2.imread(image_files[0])
+        first_img = cv2.imread(first_file)
         if first_img is None:
-            print(f"错误: 无法读取图像: {image_files[0]}")
+            print(f"错误: 无法读取图像: {first_file}")
             return
             
         h, w = first_img.shape[:2]
@@ -572,40 +1123,83 @@ class ImageToVideoConverter:
         if output_dir and not os.path.exists(output_dir):
             os.makedirs(output_dir)
         
-        # 尝试每个编解码器
-        for codec_name, fourcc in codecs:
-            video_writer = cv2.VideoWriter(output_file, fourcc, fps, (w, h))
-            if video_writer.isOpened():
-                used_codec = codec_name
-                print(f"使用编解码器: {codec_name}")
-                break
+        encoder = {
+            'codec': args.codec or DEFAULT_ENCODER['codec'],
+            'crf': DEFAULT_ENCODER['crf'] if args.crf is None else args.crf,
+            'preset': args.preset or DEFAULT_ENCODER['preset'],
+            'pix_fmt': args.pix_fmt or DEFAULT_ENCODER['pix_fmt'],
+            'threads': args.threads or 0
+        }
+        processes = max(1, args.processes or 1)
+        if processes > 1 and (args.backend == 'opencv' or find_ffmpeg() is None or (
+                (args.backend or 'auto') == 'auto' and probe_ffmpeg_encoder(fps, (w, h), encoder) is not None)):
+            print("提示: 分段并行编码需要可用的 ffmpeg，改为单进程编码")
+            processes = 1
         
-        if not video_writer or not video_writer.isOpened():
-            print(f"错误: 无法创建输出视频文件: {output_file}")
-            print("请尝试其他编解码器或格式")
-            print("如果使用H264编解码器，可能需要下载OpenH264库: https://github.com/cisco/openh264/releases")
-            return
+        if processes > 1:
+            # 分段并行：每个进程把一段连续的图像编码为独立片段，再无损拼接
+            used_codec = encoder_description(encoder)
+            print(f"使用编码器: {used_codec}")
+            print(f"分段并行编码: {processes} 个进程")
+            start_time = time.time()
+            processed_count, errors = encode_segments_parallel(
+                image_files, output_file, fps, (w, h), encoder, processes, workers,
+                on_segment_done=lambda segment_count: print(f"已完成片段: {segment_count} 帧"))
+            for error in errors:
+                print(f"错误: {error}")
+        else:
+            # 按编码后端设置优先使用 ffmpeg，否则尝试每个 OpenCV 编解码器
+            try:
+                video_writer = create_ffmpeg_writer(output_file, fps, (w, h), args.backend or 'auto', encoder)
+            except RuntimeError as e:
+                print(f"错误: {str(e)}")
+                return
+            if video_writer is not None:
+                used_codec = encoder_description(encoder)
+                print(f"使用编码器: {used_codec}")
+            else:
+                for codec_name, fourcc in codecs:
+                    video_writer = cv2.VideoWriter(output_file, fourcc, fps, (w, h))
+                    if video_writer.isOpened():
+                        used_codec = codec_name
+                        print(f"使用编解码器: {codec_name}")
+                        break
+            
+            if not video_writer or not video_writer.isOpened():
+                print(f"错误: 无法创建输出视频文件: {output_file}")
+                print("请尝试其他编解码器或格式")
+                print("如果使用H264编解码器，可能需要下载OpenH264库: https://github.com/cisco/openh264/releases")
+                return
             
-        start_time = time.time()
-        processed_count = 0
-        
-        # 开始处理图像
-        for i, img_file in enumerate(image_files):
-            img = cv2.imread(img_file)
-            if img is None:
-                print(f"无法读取图像: {img_file}")
-                continue
+            start_time = time.time()
+            processed_count = 0
             
-            # 写入帧
-            video_writer.write(img)
-            processed_count += 1
+            # 开始处理图像：后台线程按顺序提前解码后面的帧，当前线程只负责写入
+            try:
+                for i, img_file, img in iter_decoded_frames(image_files, (w, h), workers):
+                    if not video_writer.isOpened():
+                        break
+                    if img is None:
+                        print(f"无法读取图像: {img_file}")
+                        continue
+                    
+                    # 写入帧
+                    video_writer.write(img)
+                    processed_count += 1
+                    
+                    # 定期显示进度
+                    if (i + 1) % 100 == 0:
+                        print(f"已处理: {i+1} 帧" if stream else f"已处理: {i+1}/{len(image_files)} 帧")
+            except ListingOrderError as e:
+                # 已写入的帧顺序可能有误，完整排序后重新编码
+                video_writer.release()
+                print(f"提示: {str(e)}，改为完整排序后重新编码")
+                return self.process_command_line(args, stream=False)
             
-            # 定期显示进度
-            if (i + 1) % 100 == 0:
-                print(f"已处理: {i+1}/{len(image_files)} 帧")
-        
-        # 释放资源
-        video_writer.release()
+            # 释放资源（ffmpeg 在此完成剩余帧的编码）
+            video_writer.release()
+            if getattr(video_writer, 'error', None):
+                print(f"错误: ffmpeg 编码失败: {video_writer.error}")
         
         # 计算处理时间
         elapsed_time = time.time() - start_time
@@ -621,11 +1215,23 @@ class ImageToVideoConverter:
             print(f"警告: 输出文件可能未正确创建或为空")
 
 def main():
+    # 打包为可执行文件时支持进程池
+    multiprocessing.freeze_support()
+    
     parser = argparse.ArgumentParser(description='图像序列帧转视频工具', add_help=False)
     parser.add_argument('-i', '--input', help='输入图像序列文件夹路径')
     parser.add_argument('-o', '--output', help='输出视频文件路径')
     parser.add_argument('-f', '--fps', type=int, help='帧率 (默认30)')
     parser.add_argument('-t', '--type', choices=['mp4', 'avi'], help='输出格式 (mp4/avi)')
+    parser.add_argument('-w', '--workers', type=int, help=f'图像解码线程数 (默认{DEFAULT_WORKERS})')
+    parser.add_argument('--stream', action='store_true', help='边扫描边编码 (适用于补零序号命名的文件)')
+    parser.add_argument('-b', '--backend', choices=BACKENDS, help='编码后端 (默认auto)')
+    parser.add_argument('--codec', choices=list(FFMPEG_CODECS), help='ffmpeg 编码器 (默认h264)')
+    parser.add_argument('--crf', type=int, help=f"ffmpeg 质量参数 CRF (默认{DEFAULT_ENCODER['crf']})")
+    parser.add_argument('--preset', choices=FFMPEG_PRESETS, help=f"ffmpeg 编码速度预设 (默认{DEFAULT_ENCODER['preset']})")
+    parser.add_argument('--pix-fmt', choices=FFMPEG_PIX_FMTS, help=f"ffmpeg 输出像素格式 (默认{DEFAULT_ENCODER['pix_fmt']})")
+    parser.add_argument('--threads', type=int, help='ffmpeg 编码线程数 (默认0: 自动)')
+    parser.add_argument('-p', '--processes', type=int, help='分段并行编码的进程数 (默认1, 需要 ffmpeg)')
     parser.add_argument('-?', '--help', action='store_true', help='显示帮助信息')
 
     args = parser.parse_args()
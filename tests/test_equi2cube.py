@@ -0,0 +1,55 @@
+import json
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'equi2cube'))
+import equi2cube
+import equi2cube_converter
+
+
+def test_incremental_empty_input_creates_manifest(tmp_path, monkeypatch):
+    """增量模式下输入目录为空、输出目录不存在时正常结束，并写入空清单"""
+    input_dir = tmp_path / 'in'
+    input_dir.mkdir()
+    output_dir = tmp_path / 'new' / 'out'
+    monkeypatch.setattr(sys, 'argv', ['equi2cube.py', str(input_dir), str(output_dir), '--incremental'])
+    
+    assert equi2cube.main() == 0
+    with open(output_dir / equi2cube.MANIFEST_NAME, encoding='utf-8') as f:
+        assert json.load(f)['entries'] == {}
+
+
+@pytest.mark.parametrize('backend, interpolation', [
+    ('numpy', 'bilinear'), ('opencv', 'bilinear'), ('opencv', 'bicubic'), ('opencv', 'lanczos')])
+def test_cubemap_to_equirectangular_no_cross_face_bleed(backend, interpolation):
+    """纯色立方体面合成全景图时，每个像素都是所在面的颜色，不混入图集中相邻面的颜色"""
+    colors = [(255, 0, 0), (0, 255, 0), (0, 0, 255), (255, 255, 0), (0, 255, 255), (255, 0, 255)]
+    faces = [np.full((64, 64, 3), color, np.uint8) for color in colors]
+    
+    equi = np.asarray(equi2cube_converter.cubemap_to_equirectangular(faces, 384, backend, interpolation))
+    face_index, _, _ = equi2cube_converter.equirect_to_face_coordinates(384, 192, 64)
+    expected = np.array(colors, np.uint8)[face_index]
+    assert np.abs(equi.astype(int) - expected).max() <= 1
+
+
+def test_tiled_opencv_source_band_fits_budget(monkeypatch):
+    """分块模式下复制的源图像行不超过内存预算，上下两个面拆分条带后结果不变"""
+    equi_array = np.random.default_rng(0).integers(0, 256, (1024, 2048, 3), dtype=np.uint8)
+    u, v = equi2cube_converter.face_coordinates('posy', 256, 2048, 1024, 120, 136)
+    whole = equi2cube_converter.remap_strip(equi_array, u, v, 'lanczos')
+    
+    band_sizes = []
+    wrap_pad = equi2cube_converter.wrap_pad
+    monkeypatch.setattr(equi2cube_converter, 'wrap_pad', lambda band: band_sizes.append(band.nbytes) or wrap_pad(band))
+    max_band_bytes = 256 * 1024
+    split = equi2cube_converter.remap_strip(equi_array, u, v, 'lanczos', max_band_bytes)
+    assert np.array_equal(split, whole)
+    assert max(band_sizes) <= max_band_bytes
+    
+    band_sizes.clear()
+    for _ in equi2cube_converter.iter_cubemap_faces(equi_array, 256, 'opencv', faces=['posy', 'negy'], memory_budget_mb=1):
+        pass
+    assert max(band_sizes) <= 1024 * 1024 * (1 - equi2cube_converter.TILE_COORDINATE_SHARE)
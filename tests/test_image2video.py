@@ -0,0 +1,68 @@
+import os
+import re
+import subprocess
+import sys
+
+import cv2
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'image2video'))
+import image2video
+
+FFMPEG = image2video.find_ffmpeg()
+
+
+@pytest.mark.skipif(FFMPEG is None or image2video.probe_ffmpeg_encoder(30, (64, 48)) is not None,
+                    reason='需要可以使用 libx264 编码的 ffmpeg')
+def test_segments_concat_without_gaps(tmp_path):
+    """两个片段用真实的 ffmpeg 编码后拼接，帧数、时长和帧顺序都正确"""
+    frame_count, fps = 60, 30
+    image_files = []
+    for i in range(frame_count):
+        image_file = str(tmp_path / f'img_{i}.png')
+        cv2.imwrite(image_file, np.full((48, 64, 3), 40 + 3 * i, np.uint8))
+        image_files.append(image_file)
+    output_file = str(tmp_path / 'out.mp4')
+    
+    processed_count, errors = image2video.encode_segments_parallel(
+        image_files, output_file, fps, (64, 48), {'preset': 'ultrafast', 'crf': 0}, processes=2, workers=2)
+    assert errors == []
+    assert processed_count == frame_count
+    
+    # 拼接结果从 0 开始、时长为 帧数 / 帧率，片段交界处没有时间戳空隙
+    result = subprocess.run([FFMPEG, '-hide_banner', '-i', output_file, '-f', 'null', '-'],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    info = result.stderr.decode('utf-8', errors='replace')
+    hours, minutes, seconds = re.search(r'Duration: (\d+):(\d+):([\d.]+)', info).groups()
+    assert int(hours) * 3600 + int(minutes) * 60 + float(seconds) == pytest.approx(frame_count / fps, abs=0.02)
+    assert float(re.search(r'start: ([-\d.]+)', info).group(1)) == pytest.approx(0.0, abs=0.001)
+    
+    cap = cv2.VideoCapture(output_file)
+    levels = []
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        levels.append(float(frame.mean()))
+    cap.release()
+    assert len(levels) == frame_count
+    # 每帧比前一帧亮一级：帧顺序正确，没有重复或丢失的帧
+    steps = np.diff(levels)
+    assert steps.min() > 1.5 and steps.max() < 4.5
+
+
+def test_scan_images_matches_patterns_with_directory_part(tmp_path):
+    """带目录部分的通配符与 glob 的匹配结果相同，并按相对路径自然排序"""
+    for folder in ('a', 'b'):
+        (tmp_path / folder).mkdir()
+        for i in (10, 2, 1):
+            (tmp_path / folder / f'img_{i}.png').write_bytes(b'')
+    (tmp_path / 'img_3.png').write_bytes(b'')
+    (tmp_path / 'a' / 'notes.txt').write_bytes(b'')
+    
+    assert image2video.scan_images(str(tmp_path), '*.png') == [str(tmp_path / 'img_3.png')]
+    assert image2video.scan_images(str(tmp_path), os.path.join('a', '*.png')) == [
+        os.path.join(str(tmp_path), 'a', f'img_{i}.png') for i in (1, 2, 10)]
+    assert image2video.scan_images(str(tmp_path), os.path.join('*', '*.png')) == [
+        os.path.join(str(tmp_path), folder, f'img_{i}.png') for folder in ('a', 'b') for i in (1, 2, 10)]
@@ -0,0 +1,51 @@
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'common'))
+from progress_channel import ProgressChannel
+
+
+class FakeWidget:
+    """只记录 after() 回调的模拟 Tk 控件，由测试代替主循环手动触发"""
+    
+    def __init__(self):
+        self.pending = []
+    
+    def after(self, interval_ms, func):
+        self.pending.append(func)
+    
+    def tick(self):
+        pending, self.pending = self.pending, []
+        for func in pending:
+            func()
+
+
+def test_progress_channel_batches_updates_on_poll():
+    """工作线程的进度和日志只在主线程轮询时送达：进度只取最新值，日志合并，调用按顺序执行"""
+    widget = FakeWidget()
+    progress, logs, events = [], [], []
+    channel = ProgressChannel(widget, lambda value, maximum: progress.append((value, maximum)), logs.append)
+    
+    def work():
+        channel.progress(0, 100)
+        for i in range(100):
+            channel.progress(i + 1)
+            if i % 10 == 0:
+                channel.log(f"{i}\n")
+        channel.call(lambda: events.append(len(logs)))
+        channel.log("done\n")
+    
+    worker = threading.Thread(target=work)
+    worker.start()
+    worker.join()
+    assert progress == [] and logs == []
+    
+    widget.tick()
+    assert progress == [(None, 100), (100, None)]
+    assert logs == [''.join(f"{i}\n" for i in range(0, 100, 10)), "done\n"]
+    assert events == [1]
+    # 没有新进度时不重复刷新，轮询继续
+    widget.tick()
+    assert len(progress) == 2
+    assert len(widget.pending) == 1
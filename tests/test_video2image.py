@@ -0,0 +1,122 @@
+import os
+import sys
+
+import cv2
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'video2image'))
+import video2image
+
+FRAME_COUNT = 300
+VIDEO_FPS = 30000 / 1001    # 29.97 fps
+
+
+@pytest.fixture(scope='module')
+def ntsc_video(tmp_path_factory):
+    """300 帧 29.97 fps 的测试视频，每帧画面不同"""
+    video_file = str(tmp_path_factory.mktemp('video') / 'ntsc.mp4')
+    writer = cv2.VideoWriter(video_file, cv2.VideoWriter_fourcc(*'mp4v'), VIDEO_FPS, (160, 120))
+    if not writer.isOpened():
+        pytest.skip('OpenCV 无法写入 mp4v 视频')
+    for i in range(FRAME_COUNT):
+        frame = np.zeros((120, 160, 3), np.uint8)
+        cv2.putText(frame, str(i), (10, 80), cv2.FONT_HERSHEY_SIMPLEX, 2, (255, 255, 255), 3)
+        writer.write(frame)
+    writer.release()
+    return video_file
+
+
+def extract_options(fps, processes):
+    return {
+        'fps': fps, 'strategy': 'auto', 'selection': 'sharpest', 'adaptive': None,
+        'start_time': 0.0, 'end_time': None, 'workers': 2, 'processes': processes,
+        'naming': ('frame_', 0, 4, 'png'), 'transform': None
+    }
+
+
+@pytest.mark.parametrize('processes', [1, 2])
+@pytest.mark.parametrize('fps', [29.97, 100.0])
+def test_sharpest_keeps_every_frame_at_source_fps(ntsc_video, tmp_path, fps, processes):
+    """输出帧率不低于视频帧率时，sharpest 模式每个输入帧输出一帧，编号连续"""
+    saved_count, errors, _ = video2image.extract_video(
+        ntsc_video, str(tmp_path), extract_options(fps, processes))
+    assert errors == []
+    assert saved_count == FRAME_COUNT
+    assert sorted(os.listdir(tmp_path)) == [f'frame_{i:04d}.png' for i in range(FRAME_COUNT)]
+    
+    cap = cv2.VideoCapture(ntsc_video)
+    for i in range(FRAME_COUNT):
+        ret, frame = cap.read()
+        assert ret
+        assert np.array_equal(cv2.imread(str(tmp_path / f'frame_{i:04d}.png')), frame)
+    cap.release()
+
+
+class GapCapture:
+    """按给定时间戳逐帧返回图像的模拟 VideoCapture，用于构造时间戳空档"""
+    
+    def __init__(self, timestamps, frames, fps):
+        self.timestamps = timestamps
+        self.frames = frames
+        self.fps = fps
+        self.position = 0
+    
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FPS:
+            return self.fps
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return len(self.frames)
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            return self.position
+        if prop == cv2.CAP_PROP_POS_MSEC:
+            return self.timestamps[self.position - 1] if self.position > 0 else 0.0
+        return 0.0
+    
+    def set(self, prop, value):
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            self.position = int(value)
+            return True
+        return False
+    
+    def grab(self):
+        if self.position >= len(self.frames):
+            return False
+        self.position += 1
+        return True
+    
+    def retrieve(self):
+        return True, self.frames[self.position - 1].copy()
+
+
+def test_sharpest_follows_timestamps_across_gap():
+    """时间戳有空档时 sharpest 模式按帧自身的时间戳分区间，空区间序号留空，分段结果与串行一致"""
+    # 10 fps，900 ms 之后直接跳到 2000 ms；输出 2.5 fps，区间 3、4 没有帧
+    timestamps = [i * 100.0 for i in range(10)] + [2000.0 + i * 100.0 for i in range(10)]
+    scores = [(i * 7) % 10 + 1 for i in range(len(timestamps))]
+    frames = []
+    for i, score in enumerate(scores):
+        frame = np.zeros((40, 40, 3), np.uint8)
+        frame[::2, ::2] = score * 20
+        frame[0, 0] = i
+        frames.append(frame)
+    period_ms = 400.0
+    
+    windows = {}
+    for i, timestamp in enumerate(timestamps):
+        windows.setdefault(int((timestamp + 50.0) // period_ms), []).append(i)
+    expected = {window: max(members, key=lambda i: scores[i]) for window, members in windows.items()}
+    assert sorted(expected) == [0, 1, 2, 5, 6, 7]
+    
+    def run(position, first_index, count=None):
+        cap = GapCapture(timestamps, frames, 10.0)
+        cap.set(cv2.CAP_PROP_POS_FRAMES, position)
+        return [(index, int(frame[0, 0, 0])) for index, frame in video2image.iter_selected_frames(
+            cap, period_ms, first_index=first_index, count=count, selection='sharpest')]
+    
+    serial = run(0, 0)
+    assert serial == sorted(expected.items())
+    # 分段：从空档前后开始的片段与串行结果中对应的部分一致
+    assert run(4, 1, 2) == serial[1:3]
+    assert run(10, 3) == serial[3:]
+    assert run(10, 5, 2) == serial[3:5]
@@ -8,11 +8,61 @@ import time
 import json
 import argparse
 import sys
+import glob
+import concurrent.futures
+import multiprocessing
+import math
+import struct
+import numpy as np
 from pathlib import Path
 from datetime import timedelta
 
+# 进度通道与其他工具共用
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'common'))
+from progress_channel import ProgressChannel
+
+# 默认的编码/写入线程数
+DEFAULT_WORKERS = min(8, os.cpu_count() or 1)
+
+# 帧读取策略：auto 自动选择 / read 逐帧完整读取 / grab 跳过的帧只解码不转换 / seek 直接定位到目标帧
+READ_STRATEGIES = ('auto', 'read', 'grab', 'seek')
+
+# 选帧方式：nearest 取最接近目标时间的帧 / sharpest 取每个时间区间内最清晰的帧 /
+# adaptive 只保存与上一张保存的帧差异足够大的帧（场景变化、相机移动）
+SELECTION_MODES = ('nearest', 'sharpest', 'adaptive')
+
+# adaptive 模式的默认参数：差异阈值（缩略图平均灰度差, 0-255）、最小/最大保存间隔（秒）
+DEFAULT_SCENE_THRESHOLD = 10.0
+DEFAULT_MIN_INTERVAL = 0.5
+DEFAULT_MAX_INTERVAL = 5.0
+
+# 计算帧差异所用缩略图的宽度
+SIGNATURE_WIDTH = 64
+
+# 计算清晰度评分前把帧缩小到的宽度
+SHARPNESS_WIDTH = 960
+
+# 帧堆栈输出 (-t npy) 的文件名和 .npy 文件头长度（关闭时按实际帧数重写文件头）
+STACK_NAME = 'frames'
+STACK_HEADER_SIZE = 128
+
+# 输出前缩放所用的插值方式（缩小时 area 效果最好）
+INTERPOLATIONS = {
+    'area': cv2.INTER_AREA,
+    'linear': cv2.INTER_LINEAR,
+    'cubic': cv2.INTER_CUBIC,
+    'lanczos': cv2.INTER_LANCZOS4,
+    'nearest': cv2.INTER_NEAREST
+}
+
+# 输出颜色：color 保持彩色 / gray 转为灰度
+COLOR_MODES = ('color', 'gray')
+
+# 输入为文件夹时识别的视频扩展名
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.m4v', '.wmv', '.flv', '.webm', '.mts', '.m2ts')
+
 def show_help():
-    help_text = """
+    help_text = f"""
 视频转图像序列帧工具使用说明:
 
 GUI模式:
@@ -23,18 +73,773 @@ GUI模式:
     video2image.exe [参数]
 
 参数说明:
-    -i, --input        输入视频文件路径
+    -i, --input        输入视频文件、文件夹或通配符 (如 "clips/*.mp4"); 文件夹或通配符为批量模式,
+                      每个视频输出到输出目录下以视频文件名命名的子目录
     -o, --output       输出目录路径
-    -f, --fps         帧率 (每秒输出几帧, 默认1)
-    -t, --type        输出格式 (jpg/png, 默认jpg)
+    -f, --fps         帧率 (每秒输出几帧, 可为小数, 默认1)
+    -t, --type        输出格式 (jpg/png/npy, 默认jpg; npy 把所有帧写入一个未压缩的帧堆栈 {STACK_NAME}.npy,
+                      并生成帧索引 {STACK_NAME}.json, 可用 load_frame_stack 以内存映射方式读取)
+    -w, --workers     编码/写入线程数 (默认{DEFAULT_WORKERS})
+    -s, --strategy    帧读取策略 (auto/read/grab/seek, 默认auto)
+    -p, --processes   并行提取的进程数 (默认1; 大于1时把视频分段并行处理, 编号与串行一致)
+    -m, --select      选帧方式 (nearest: 最接近目标时间的帧, sharpest: 每个区间内最清晰的帧,
+                      adaptive: 只保存画面变化足够大的帧, 忽略帧率设置)
+    --scene-threshold adaptive 模式的差异阈值 (缩略图平均灰度差 0-255, 默认{DEFAULT_SCENE_THRESHOLD:g})
+    --min-interval    adaptive 模式的最小保存间隔 (秒, 默认{DEFAULT_MIN_INTERVAL:g})
+    --max-interval    adaptive 模式的最大保存间隔 (秒, 必须大于0, 默认{DEFAULT_MAX_INTERVAL:g})
+    --start           开始时间 (秒, 默认0)
+    --end             结束时间 (秒, 默认到视频结束)
+    --prefix          文件名前缀 (默认frame_)
+    --start-num       起始序号 (默认0)
+    --digits          序号位数 (默认4)
+    -j, --jobs        批量模式同时处理的视频数 (默认1; 大于1时每个视频使用 编码线程数/jobs 个线程)
+    --resize          输出尺寸 宽x高 (如 1920x960; 其中一项为0时按比例计算, 如 1920x0)
+    --interp          缩放插值方式 ({'/'.join(INTERPOLATIONS)}, 默认area)
+    --crop            裁剪区域 x,y,宽,高 (原视频像素坐标, 先裁剪再缩放)
+    --color           输出颜色 (color/gray, 默认color)
     -?, --help        显示帮助信息
 
 示例:
     video2image.exe -i video.mp4 -o output_folder -f 2 -t jpg
+    video2image.exe -i "D:/capture/*.mp4" -o output_folder -f 1 -j 4 --start 5 --prefix img_
+    video2image.exe -i video.mp4 -o output_folder --crop 0,0,3840,1920 --resize 2048x0
     """
     print(help_text)
     return help_text
 
+def parse_size(text):
+    """解析输出尺寸 "宽x高"，其中一项为0表示按比例计算；空字符串返回 None"""
+    if not text or not text.strip():
+        return None
+    try:
+        width, height = (int(value) for value in text.lower().replace('*', 'x').split('x'))
+    except ValueError:
+        raise ValueError(f"输出尺寸格式应为 宽x高: {text}")
+    if width < 0 or height < 0 or not (width or height):
+        raise ValueError(f"输出尺寸无效: {text}")
+    return width, height
+
+def parse_crop(text):
+    """解析裁剪区域 "x,y,宽,高"；空字符串返回 None"""
+    if not text or not text.strip():
+        return None
+    try:
+        x, y, width, height = (int(value) for value in text.split(','))
+    except ValueError:
+        raise ValueError(f"裁剪区域格式应为 x,y,宽,高: {text}")
+    if x < 0 or y < 0 or width <= 0 or height <= 0:
+        raise ValueError(f"裁剪区域无效: {text}")
+    return x, y, width, height
+
+def make_transform(size=None, crop=None, interpolation='area', color='color'):
+    """生成输出前的帧处理设置；不需要任何处理时返回 None（帧原样编码）"""
+    if interpolation not in INTERPOLATIONS:
+        raise ValueError(f"不支持的插值方式: {interpolation}")
+    if color not in COLOR_MODES:
+        raise ValueError(f"不支持的输出颜色: {color}")
+    if size is None and crop is None and color == 'color':
+        return None
+    return {'size': size, 'crop': crop, 'interpolation': interpolation, 'color': color}
+
+def check_transform(transform, width, height):
+    """检查裁剪区域是否在视频画面内，返回处理后的输出尺寸 (宽, 高)"""
+    if transform and transform['crop']:
+        x, y, crop_width, crop_height = transform['crop']
+        if x + crop_width > width or y + crop_height > height:
+            raise ValueError(f"裁剪区域超出视频画面 ({width}x{height})")
+        width, height = crop_width, crop_height
+    if transform and transform['size']:
+        width, height = scaled_size(width, height, transform['size'])
+    return width, height
+
+def scaled_size(width, height, size):
+    """按输出尺寸设置计算缩放后的尺寸，宽或高为0时保持宽高比"""
+    target_width, target_height = size
+    if not target_width:
+        target_width = max(1, round(width * target_height / height))
+    elif not target_height:
+        target_height = max(1, round(height * target_width / width))
+    return target_width, target_height
+
+def transform_frame(frame, transform):
+    """在编码线程中裁剪、转换颜色并缩放一帧
+
+    先裁剪再转灰度，缩放只处理需要的像素和通道；cv2 的这些运算都会释放 GIL。
+    """
+    if not transform:
+        return frame
+    if transform['crop']:
+        x, y, width, height = transform['crop']
+        frame = frame[y:y + height, x:x + width]
+    if transform['color'] == 'gray':
+        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    if transform['size']:
+        height, width = frame.shape[:2]
+        size = scaled_size(width, height, transform['size'])
+        if size != (width, height):
+            frame = cv2.resize(frame, size, interpolation=INTERPOLATIONS[transform['interpolation']])
+    return frame
+
+def write_frame(frame, frame_filename, output_format, transform=None):
+    """（按需裁剪、缩放后）编码一帧并写入文件（支持中文路径）"""
+    frame = transform_frame(frame, transform)
+    success, encoded_img = cv2.imencode(f'.{output_format}', frame)
+    if not success:
+        raise ValueError(f"编码失败: {os.path.basename(frame_filename)}")
+    with open(frame_filename, 'wb') as f:
+        encoded_img.tofile(f)
+
+class FrameWriterPool:
+    """有界的帧编码/写入线程池
+
+    解码线程把帧交给线程池后立即读取下一帧；cv2.imencode 会释放 GIL，多帧可以并行编码。
+    排队待写的帧达到 max_pending 时 submit 会阻塞（背压），限制内存中缓存的帧数。
+    文件名在提交时就已确定，因此输出的命名和编号与逐帧保存时完全相同。
+    """
+    
+    def __init__(self, max_workers=DEFAULT_WORKERS, max_pending=None, transform=None):
+        self.errors = []
+        self.transform = transform
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+        self._slots = threading.BoundedSemaphore(max_pending or max_workers * 2)
+    
+    def submit(self, frame, frame_filename, output_format):
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(write_frame, frame, frame_filename, output_format, self.transform)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(self._on_done)
+    
+    def _on_done(self, future):
+        self._slots.release()
+        if not future.cancelled() and future.exception() is not None:
+            self.errors.append(future.exception())
+    
+    def close(self):
+        """等待所有排队的帧写完，返回写入失败的异常列表"""
+        self._executor.shutdown(wait=True)
+        return self.errors
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+
+class FrameStackWriter:
+    """把帧按顺序写入单个未压缩的 .npy 帧堆栈，并生成帧索引
+
+    逐帧写图片时大量小文件的文件系统开销很大，后续工具还要逐个读回并解码。帧堆栈为
+    (N, H, W, 3) 的 uint8 数组（BGR 顺序，与 cv2 一致；灰度输出为 (N, H, W)），用 load_frame_stack 以内存映射
+    方式读取，不需要解码和复制。帧数事先未知，先写入占位文件头，关闭时按实际帧数重写。
+    写入在单独的线程中按提交顺序进行，排队的帧达到 max_pending 时 submit 阻塞（背压）。
+    索引文件记录每帧的输出序号、源视频帧序号和时间戳（毫秒）。
+    """
+    
+    def __init__(self, output_path, max_pending=8, info=None, transform=None):
+        self.stack_file = os.path.join(output_path, f"{STACK_NAME}.npy")
+        self.index_file = os.path.join(output_path, f"{STACK_NAME}.json")
+        self.errors = []
+        self.info = info or {}
+        self.transform = transform
+        self.shape = None
+        self.index = []
+        self._file = open(self.stack_file, 'wb')
+        self._file.write(b'\0' * STACK_HEADER_SIZE)
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self._slots = threading.BoundedSemaphore(max_pending)
+    
+    def submit(self, frame, frame_num, position, timestamp_ms):
+        self._slots.acquire()
+        try:
+            self._executor.submit(self._write, frame, {
+                'frame': frame_num, 'position': position, 'timestamp_ms': round(timestamp_ms, 3)})
+        except Exception:
+            self._slots.release()
+            raise
+    
+    def _write(self, frame, entry):
+        try:
+            if self.errors:
+                return
+            frame = transform_frame(frame, self.transform)
+            if self.shape is None:
+                self.shape = frame.shape
+            elif frame.shape != self.shape:
+                raise ValueError(f"帧尺寸不一致: {frame.shape}, 帧堆栈为 {self.shape}")
+            self._file.write(np.ascontiguousarray(frame).data)
+            self.index.append(entry)
+        except Exception as e:
+            self.errors.append(e)
+        finally:
+            self._slots.release()
+    
+    def close(self):
+        """等待所有帧写完，按实际帧数重写文件头并写出索引，返回写入失败的异常列表"""
+        self._executor.shutdown(wait=True)
+        if self._file.closed:
+            return self.errors
+        shape = (len(self.index),) + (self.shape or (0, 0, 3))
+        header = f"{{'descr': '|u1', 'fortran_order': False, 'shape': {shape!r}, }}"
+        header = header.ljust(STACK_HEADER_SIZE - 11) + '\n'
+        try:
+            # 写入失败时丢弃不完整的帧
+            self._file.truncate(STACK_HEADER_SIZE + int(np.prod(shape)))
+            self._file.seek(0)
+            self._file.write(b'\x93NUMPY\x01\x00' + struct.pack('<H', len(header)) + header.encode('latin1'))
+        finally:
+            self._file.close()
+        with open(self.index_file, 'w', encoding='utf-8') as f:
+            json.dump(dict(self.info, shape=list(shape), frames=self.index), f, ensure_ascii=False, indent=1)
+        return self.errors
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+
+def load_frame_stack(path, mmap=True):
+    """读取 FrameStackWriter 生成的帧堆栈，返回 (帧数组, 帧索引列表)
+
+    path 可以是输出目录或 .npy 文件；默认以只读内存映射方式打开，按需读取且不复制数据。
+    """
+    stack_file = os.path.join(path, f"{STACK_NAME}.npy") if os.path.isdir(path) else path
+    frames = np.load(stack_file, mmap_mode='r' if mmap else None)
+    index_file = os.path.splitext(stack_file)[0] + '.json'
+    index = []
+    if os.path.exists(index_file):
+        with open(index_file, 'r', encoding='utf-8') as f:
+            index = json.load(f).get('frames', [])
+    return frames, index
+
+def open_frame_writer(output_path, output_format, workers, info=None, transform=None):
+    """按输出格式创建帧写入器：npy 为 FrameStackWriter，其余为逐帧写图片的 FrameWriterPool
+
+    transform 为输出前的裁剪/缩放/颜色设置 (make_transform)，在写入线程中处理。
+    """
+    if output_format == 'npy':
+        return FrameStackWriter(output_path, info=info, transform=transform)
+    return FrameWriterPool(workers, transform=transform)
+
+def submit_frame(writer, frame, index, stats, naming, output_path):
+    """把第 index 个输出帧交给写入器；文件编号为 naming 中的起始序号 + index"""
+    prefix, start_num, num_digits, output_format = naming
+    if isinstance(writer, FrameStackWriter):
+        writer.submit(frame, start_num + index, stats.frame_position, stats.frame_time_ms)
+    else:
+        writer.submit(frame, frame_filename(output_path, prefix, start_num + index, num_digits, output_format),
+                      output_format)
+
+class FrameReadStats:
+    """抽帧读取的统计信息，用于报告跳帧带来的加速"""
+    
+    def __init__(self):
+        self.strategy = None
+        self.auto = False       # 策略是否为自动选择
+        self.covered = 0        # 经过的源视频帧数
+        self.reads = 0          # 完整读取（解码并转换颜色）的帧数
+        self.grabs = 0          # 只解码不转换的帧数
+        self.seeks = 0          # 定位次数
+        self.read_seconds = 0.0
+        self.seconds = 0.0
+        self.frame_position = None  # 最近输出的帧的源视频帧序号
+        self.frame_time_ms = None   # 最近输出的帧的时间戳（毫秒）
+    
+    def merge(self, other):
+        """累加另一个片段的统计信息"""
+        if other.strategy and other.strategy != self.strategy:
+            self.strategy = other.strategy if self.strategy is None else 'mixed'
+        self.auto = self.auto or other.auto
+        for name in ('covered', 'reads', 'grabs', 'seeks', 'read_seconds', 'seconds'):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+    
+    def speedup(self):
+        """与逐帧完整读取相比的估计加速比（按完整读取一帧的平均耗时估算）"""
+        if not self.reads or not self.read_seconds or not self.seconds:
+            return None
+        return self.covered * (self.read_seconds / self.reads) / self.seconds
+    
+    def summary(self):
+        text = (f"读取策略: {self.strategy}{' (自动选择)' if self.auto else ''}, 经过 {self.covered} 帧, 完整读取 {self.reads} 帧, "
+                f"跳过 {self.grabs} 帧, 定位 {self.seeks} 次, 读取耗时 {self.seconds:.2f} 秒")
+        speedup = self.speedup()
+        if speedup is not None:
+            text += f", 约为逐帧读取的 {speedup:.1f} 倍速度"
+        return text
+
+def frame_timestamp(cap, frame_position, frame_ms):
+    """返回刚读取的帧的时间戳（毫秒），后端不提供时按帧序号推算"""
+    timestamp = cap.get(cv2.CAP_PROP_POS_MSEC)
+    if timestamp <= 0 and frame_position > 0:
+        timestamp = frame_position * frame_ms
+    return timestamp
+
+def sharpness(frame):
+    """清晰度评分：缩小后灰度图的拉普拉斯方差，越大越清晰"""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    if gray.shape[1] > SHARPNESS_WIDTH:
+        scale = SHARPNESS_WIDTH / gray.shape[1]
+        gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    return float(cv2.Laplacian(gray, cv2.CV_32F).var())
+
+def frame_signature(frame):
+    """帧签名：缩小到 SIGNATURE_WIDTH 宽的灰度缩略图（先缩小再转灰度，开销很小）"""
+    height, width = frame.shape[:2]
+    thumbnail = cv2.resize(
+        frame, (SIGNATURE_WIDTH, max(1, round(height * SIGNATURE_WIDTH / width))), interpolation=cv2.INTER_AREA)
+    return cv2.cvtColor(thumbnail, cv2.COLOR_BGR2GRAY)
+
+def signature_difference(signature, other):
+    """两个帧签名的平均灰度差 (0-255)"""
+    return cv2.mean(cv2.absdiff(signature, other))[0]
+
+def target_count(origin_ms, end_ms, period_ms):
+    """返回 [origin_ms, end_ms) 时间段内的输出帧数"""
+    return max(0, math.ceil((end_ms - origin_ms) / period_ms))
+
+def iter_selected_frames(cap, period_ms, origin_ms=0.0, end_ms=None, first_index=0, count=None,
+                         strategy='auto', selection='nearest', stats=None, adaptive=None):
+    """按时间选取帧，生成 (全局输出序号 k, 帧图像)
+
+    第 k 个输出的目标时间为 origin_ms + k * period_ms（毫秒），从 first_index 开始，
+    最多 count 个，目标时间不超过 end_ms。选取依据帧的实际时间戳 (CAP_PROP_POS_MSEC)，
+    不使用取整后的帧间隔，29.97 fps 等非整数帧率不会累积误差。调用前应把 cap 定位到
+    第一个目标时间之前（最多早一帧以上都可以，之前的帧会被跳过）。
+
+    selection 为 nearest 时取时间戳最接近目标时间的帧，跳过其余帧的方式由 strategy 决定：
+    read 逐帧完整读取；grab 对跳过的帧只调用 cap.grab()（不做颜色转换和拷贝）；
+    seek 通过 CAP_PROP_POS_FRAMES 直接定位到目标附近，后端从前一个关键帧解码到目标帧，
+    间隔大于关键帧间隔 (GOP) 时开销远小于逐帧 grab；后端不支持精确定位时自动退回 grab。
+    auto 在每帧都要输出时逐帧读取，否则先用 grab 跳过一段并计时，再定位一次并计时，
+    此后使用两者中开销更小的策略（关键帧间隔因视频而异，实测比按间隔猜测可靠）。
+
+    selection 为 sharpest 时在每个区间 [目标时间, 目标时间 + period_ms) 内取清晰度评分
+    最高的帧。区间内的帧本来就要解码，只多了颜色转换和一次缩小图上的拉普拉斯运算。
+    selection 为 adaptive 时忽略 period_ms，按画面变化保存帧，adaptive 为参数字典，
+    见 iter_adaptive_frames；输出序号连续，只能串行处理。
+    stats (FrameReadStats) 用于收集统计信息。
+    """
+    video_fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    frame_ms = 1000.0 / video_fps
+    if stats is None:
+        stats = FrameReadStats()
+    stop_index = None if count is None else first_index + count
+    if end_ms is not None:
+        end_index = target_count(origin_ms, end_ms, period_ms)
+        stop_index = end_index if stop_index is None else min(stop_index, end_index)
+    
+    if selection == 'sharpest':
+        yield from iter_sharpest_frames(cap, period_ms, origin_ms, first_index, stop_index, frame_ms, stats)
+        return
+    if selection == 'adaptive':
+        yield from iter_adaptive_frames(cap, origin_ms, end_ms, frame_ms, stats, **(adaptive or {}))
+        return
+    
+    probing = strategy == 'auto' and period_ms > 1.5 * frame_ms
+    if strategy == 'auto':
+        stats.auto = True
+        strategy = 'grab' if probing else 'read'
+    stats.strategy = strategy
+    grab_cost = None    # 探测得到的每帧 grab 耗时
+    
+    start_position = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+    position = start_position   # 下一次读取的帧序号
+    index = first_index
+    while stop_index is None or index < stop_index:
+        step_start = time.perf_counter()
+        target_ms = origin_ms + index * period_ms
+        
+        # 定位到目标帧（按恒定帧率估算帧序号，最终仍按时间戳选取）
+        target_frame = round(target_ms / frame_ms)
+        gap = target_frame - position
+        if gap > 0 and (stats.strategy == 'seek' or (probing and grab_cost is not None)):
+            seek_start = time.perf_counter()
+            if (cap.set(cv2.CAP_PROP_POS_FRAMES, target_frame)
+                    and int(cap.get(cv2.CAP_PROP_POS_FRAMES)) == target_frame):
+                stats.seeks += 1
+                position = target_frame
+                if probing:
+                    seek_cost = time.perf_counter() - seek_start
+                    stats.strategy = 'seek' if seek_cost < gap * grab_cost else 'grab'
+                    probing = False
+            elif 0 < cap.get(cv2.CAP_PROP_FRAME_COUNT) <= target_frame:
+                # 目标已超出视频末尾
+                stats.seconds += time.perf_counter() - step_start
+                return
+            else:
+                # 后端不支持精确定位，退回 grab
+                stats.strategy = 'grab'
+                probing = False
+        
+        # 顺序读取，直到帧时间戳到达目标时间（与目标时间相差不超过半帧，即最接近的帧）
+        skip_start = time.perf_counter()
+        skipped = 0
+        while True:
+            read_start = time.perf_counter()
+            if stats.strategy == 'read':
+                ret, frame = cap.read()
+            else:
+                ret = cap.grab()
+            grab_seconds = time.perf_counter() - read_start
+            if not ret:
+                stats.covered = position - start_position
+                stats.seconds += time.perf_counter() - step_start
+                return
+            timestamp = frame_timestamp(cap, position, frame_ms)
+            position += 1
+            if timestamp >= target_ms - frame_ms / 2:
+                break
+            if stats.strategy == 'read':
+                stats.reads += 1
+                stats.read_seconds += grab_seconds
+            else:
+                stats.grabs += 1
+            skipped += 1
+        if probing and grab_cost is None and skipped > 0:
+            grab_cost = (time.perf_counter() - skip_start) / skipped
+        
+        if stats.strategy != 'read':
+            retrieve_start = time.perf_counter()
+            ret, frame = cap.retrieve()
+            grab_seconds += time.perf_counter() - retrieve_start
+            if not ret:
+                return
+        stats.reads += 1
+        stats.read_seconds += grab_seconds
+        stats.covered = position - start_position
+        stats.frame_position, stats.frame_time_ms = position - 1, timestamp
+        stats.seconds += time.perf_counter() - step_start
+        
+        yield index, frame
+        index += 1
+
+def iter_sharpest_frames(cap, period_ms, origin_ms, first_index, stop_index, frame_ms, stats):
+    """在每个时间区间内选取最清晰的帧，生成 (全局输出序号, 帧图像)，见 iter_selected_frames"""
+    stats.strategy = 'sharpest'
+    start_position = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+    position = start_position
+    index = first_index
+    best_frame, best_score, best_frame_info = None, -1.0, None
+    while True:
+        step_start = time.perf_counter()
+        ret = cap.grab()
+        window = None
+        if ret:
+            timestamp = frame_timestamp(cap, position, frame_ms)
+            position += 1
+            stats.covered = position - start_position
+            # 时间戳允许半帧误差：输出帧率不低于视频帧率时区间长度恰为一帧，
+            # 时间戳的取整误差不能让两帧落入同一区间
+            window = math.floor((timestamp - origin_ms + frame_ms / 2) / period_ms)
+        
+        # 进入下一个区间（或视频结束）时输出上一个区间中最清晰的帧
+        if not ret or window > index:
+            stats.seconds += time.perf_counter() - step_start
+            if best_frame is not None:
+                stats.frame_position, stats.frame_time_ms = best_frame_info
+                yield index, best_frame
+                best_frame, best_score = None, -1.0
+            if not ret or (stop_index is not None and window >= stop_index):
+                return
+            step_start = time.perf_counter()
+            # 输出序号只由当前帧自身的时间戳决定，不按读入次数累加：
+            # 时间戳出现空档（可变帧率、丢帧）时空区间的序号留空，
+            # 之后的选帧不会错位，分段并行与串行的输出一致
+            index = window
+        
+        if window < index:
+            # 第一个区间之前的帧
+            stats.grabs += 1
+        else:
+            ret, frame = cap.retrieve()
+            if ret:
+                stats.reads += 1
+                score = sharpness(frame)
+                if score > best_score:
+                    best_frame, best_score, best_frame_info = frame, score, (position - 1, timestamp)
+        stats.seconds += time.perf_counter() - step_start
+
+def make_adaptive(threshold=None, min_interval=None, max_interval=None):
+    """生成 adaptive 模式的参数，未指定的项使用默认值；参数无效时抛出 ValueError"""
+    adaptive = {
+        'threshold': DEFAULT_SCENE_THRESHOLD if threshold is None else threshold,
+        'min_interval': DEFAULT_MIN_INTERVAL if min_interval is None else min_interval,
+        'max_interval': DEFAULT_MAX_INTERVAL if max_interval is None else max_interval
+    }
+    if adaptive['threshold'] < 0 or adaptive['min_interval'] < 0:
+        raise ValueError("变化阈值和最小间隔不能为负数")
+    if adaptive['max_interval'] <= 0:
+        raise ValueError("最大间隔必须大于0")
+    if adaptive['max_interval'] < adaptive['min_interval']:
+        raise ValueError("最大间隔不能小于最小间隔")
+    return adaptive
+
+def iter_adaptive_frames(cap, origin_ms, end_ms, frame_ms, stats, threshold=DEFAULT_SCENE_THRESHOLD,
+                         min_interval=DEFAULT_MIN_INTERVAL, max_interval=DEFAULT_MAX_INTERVAL):
+    """按画面变化选取帧，生成 (输出序号, 帧图像)
+
+    在解码线程上为每帧计算缩略图签名，与上一张保存的帧比较，平均灰度差超过 threshold
+    时保存；距上一张保存的帧不足 min_interval 秒的帧只 grab 不比较，超过 max_interval 秒
+    时无论差异大小都保存一帧 (max_interval 为 None 时不限制)。相机静止时不再输出大量几乎相同的帧。
+    """
+    stats.strategy = 'adaptive'
+    min_interval_ms = min_interval * 1000.0
+    max_interval_ms = None if max_interval is None else max_interval * 1000.0
+    start_position = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+    position = start_position
+    index = 0
+    last_saved_ms, last_signature = None, None
+    while True:
+        step_start = time.perf_counter()
+        if not cap.grab():
+            break
+        timestamp = frame_timestamp(cap, position, frame_ms)
+        position += 1
+        stats.covered = position - start_position
+        if end_ms is not None and timestamp >= end_ms:
+            break
+        if timestamp < origin_ms - frame_ms / 2 or (
+                last_saved_ms is not None and timestamp - last_saved_ms < min_interval_ms):
+            # 起始时间之前或距上一张保存的帧太近
+            stats.grabs += 1
+            stats.seconds += time.perf_counter() - step_start
+            continue
+        
+        ret, frame = cap.retrieve()
+        if not ret:
+            break
+        stats.reads += 1
+        signature = frame_signature(frame)
+        save = (last_signature is None
+                or (max_interval_ms is not None and timestamp - last_saved_ms >= max_interval_ms)
+                or signature_difference(signature, last_signature) > threshold)
+        stats.seconds += time.perf_counter() - step_start
+        if save:
+            last_saved_ms, last_signature = timestamp, signature
+            stats.frame_position, stats.frame_time_ms = position - 1, timestamp
+            yield index, frame
+            index += 1
+    stats.seconds += time.perf_counter() - step_start
+
+def frame_filename(output_path, prefix, frame_num, num_digits, output_format):
+    """生成输出文件名：前缀_序号.格式"""
+    return os.path.join(output_path, f"{prefix}{frame_num:0{num_digits}d}.{output_format}")
+
+def open_capture_at(video_file, frame_position):
+    """打开视频并定位到指定帧；后端不能精确定位时从头逐帧 grab 到该帧"""
+    cap = cv2.VideoCapture(video_file)
+    if not cap.isOpened():
+        raise IOError(f"无法打开视频文件: {video_file}")
+    if frame_position > 0:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, frame_position)
+        if int(cap.get(cv2.CAP_PROP_POS_FRAMES)) != frame_position:
+            cap.release()
+            cap = cv2.VideoCapture(video_file)
+            for _ in range(frame_position):
+                if not cap.grab():
+                    break
+    return cap
+
+def make_sampling(video_fps, fps, start_time=0.0, end_time=None, selection='nearest', adaptive=None):
+    """生成采样设置 (时间单位为毫秒)；fps 超过视频帧率时按视频帧率，即每帧都输出
+
+    adaptive 为 adaptive 模式的参数 (threshold, min_interval, max_interval)。
+    """
+    fps = min(fps, video_fps)
+    return {
+        'origin_ms': start_time * 1000.0,
+        'period_ms': 1000.0 / fps,
+        'end_ms': None if end_time is None else end_time * 1000.0,
+        'selection': selection,
+        'video_fps': video_fps,
+        'adaptive': adaptive
+    }
+
+def first_frame_position(sampling, index):
+    """返回第 index 个输出之前、读取时应定位到的帧序号"""
+    frame_ms = 1000.0 / sampling['video_fps']
+    target_ms = sampling['origin_ms'] + index * sampling['period_ms']
+    return max(0, math.floor(target_ms / frame_ms) - 1)
+
+def plan_segments(target_count, segment_count):
+    """把 target_count 个输出帧均分为若干片段，返回 (片段第一帧的全局序号, 帧数) 列表"""
+    segment_count = max(1, min(segment_count, target_count))
+    base, extra = divmod(target_count, segment_count)
+    segments = []
+    first_index = 0
+    for i in range(segment_count):
+        count = base + (1 if i < extra else 0)
+        segments.append((first_index, count))
+        first_index += count
+    return segments
+
+def extract_segment(video_file, output_path, sampling, first_index, frame_count, naming,
+                    strategy='auto', workers=DEFAULT_WORKERS, transform=None):
+    """在子进程中提取一个片段，返回 (保存帧数, 错误信息列表, FrameReadStats)
+
+    片段从全局第 first_index 个输出开始，共 frame_count 个（None 表示直到视频结束）。
+    sampling 为采样设置 (origin_ms, period_ms, end_ms, selection, video_fps)，
+    第 k 个输出的文件编号为 naming 中的起始序号 + k，因此与串行提取的编号完全相同。
+    naming 为 (前缀, 起始序号, 序号位数, 输出格式)，transform 为输出前的帧处理设置。
+    """
+    cap = open_capture_at(video_file, first_frame_position(sampling, first_index))
+    stats = FrameReadStats()
+    saved_count = 0
+    try:
+        with FrameWriterPool(workers, transform=transform) as writer:
+            for index, frame in iter_selected_frames(
+                    cap, sampling['period_ms'], sampling['origin_ms'], sampling['end_ms'], first_index, frame_count,
+                    strategy, sampling['selection'], stats, sampling['adaptive']):
+                submit_frame(writer, frame, index, stats, naming, output_path)
+                saved_count += 1
+    finally:
+        cap.release()
+    return saved_count, [str(error) for error in writer.errors], stats
+
+def extract_segments_parallel(video_file, output_path, sampling, total_count, naming, processes,
+                              strategy='auto', workers=DEFAULT_WORKERS, should_continue=None,
+                              on_segment_done=None, transform=None):
+    """把 total_count 个输出分段，在多个进程中并行提取
+
+    每个进程打开自己的 VideoCapture 并定位到片段起点。片段数为进程数的 4 倍，
+    使各进程负载均衡、进度更新更细。sampling['end_ms'] 为 None 时最后一个片段
+    一直读到视频结束（total_count 只是按视频时长的估计）。各进程的编码线程数为
+    workers // processes。返回 (保存帧数, 错误信息列表, 合并后的 FrameReadStats)。
+    """
+    segments = plan_segments(max(1, total_count), processes * 4)
+    
+    saved_count = 0
+    errors = []
+    stats = FrameReadStats()
+    with concurrent.futures.ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = {}
+        for i, (first_index, count) in enumerate(segments):
+            if sampling['end_ms'] is None and i == len(segments) - 1:
+                count = None
+            future = executor.submit(
+                extract_segment, video_file, output_path, sampling, first_index, count,
+                naming, strategy, max(1, workers // processes), transform)
+            futures[future] = (first_index, count)
+        
+        for future in concurrent.futures.as_completed(futures):
+            if should_continue is not None and not should_continue():
+                for pending in futures:
+                    pending.cancel()
+                break
+            first_index, count = futures[future]
+            try:
+                segment_saved, segment_errors, segment_stats = future.result()
+            except Exception as e:
+                errors.append(f"片段 {first_index} 处理失败: {str(e)}")
+                continue
+            saved_count += segment_saved
+            errors.extend(segment_errors)
+            stats.merge(segment_stats)
+            if on_segment_done is not None:
+                on_segment_done(first_index, segment_saved)
+    return saved_count, errors, stats
+
+def find_video_files(input_spec):
+    """把 --input 展开为视频文件列表：单个文件、文件夹中的视频文件或通配符匹配的文件"""
+    if os.path.isdir(input_spec):
+        return sorted(entry.path for entry in os.scandir(input_spec)
+                      if entry.is_file() and os.path.splitext(entry.name)[1].lower() in VIDEO_EXTENSIONS)
+    if any(char in input_spec for char in '*?['):
+        return sorted(path for path in glob.glob(input_spec) if os.path.isfile(path))
+    return [input_spec]
+
+def batch_output_dirs(video_files, output_root):
+    """批量模式下每个视频的输出子目录；文件名相同的视频追加序号区分"""
+    output_dirs = []
+    used_names = set()
+    for video_file in video_files:
+        stem = Path(video_file).stem
+        name = stem
+        n = 2
+        while name.lower() in used_names:
+            name = f"{stem}_{n}"
+            n += 1
+        used_names.add(name.lower())
+        output_dirs.append(os.path.join(output_root, name))
+    return output_dirs
+
+def extract_video(video_file, output_path, options, label=''):
+    """命令行模式下提取一个视频，返回 (保存帧数, 错误信息列表, FrameReadStats)
+
+    options 为提取设置 (fps, strategy, selection, adaptive, start_time, end_time, workers,
+    processes, naming, transform)。进度信息带 label 前缀打印，批量并发处理时可以区分各个视频。
+    """
+    cap = cv2.VideoCapture(video_file)
+    if not cap.isOpened():
+        raise IOError(f"无法打开视频文件: {video_file}")
+    
+    # 按时间采样：第 k 帧的目标时间为 开始时间 + k / fps，未指定结束时间时直到视频结束
+    video_fps = cap.get(cv2.CAP_PROP_FPS)
+    duration_ms = cap.get(cv2.CAP_PROP_FRAME_COUNT) * 1000.0 / video_fps
+    start_time, end_time = options['start_time'], options['end_time']
+    end_ms = duration_ms if end_time is None else min(duration_ms, end_time * 1000.0)
+    if start_time < 0 or start_time * 1000.0 >= end_ms:
+        cap.release()
+        raise ValueError(f"时间设置无效: 视频总长 {duration_ms / 1000.0:.1f}秒, "
+                         f"请确保 0 ≤ 开始时间 < 结束时间")
+    try:
+        check_transform(options['transform'], int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                        int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+    except ValueError:
+        cap.release()
+        raise
+    if options['fps'] > video_fps:
+        print(f"{label}提示: 帧率超过视频帧率 ({video_fps:.2f} fps)，将输出每一帧")
+    sampling = make_sampling(video_fps, options['fps'], start_time, end_time, options['selection'], options['adaptive'])
+    processes = options['processes']
+    if processes > 1 and sampling['selection'] == 'adaptive':
+        print(f"{label}提示: adaptive 选帧需要按顺序比较帧，忽略并行进程设置")
+        processes = 1
+    naming = options['naming']
+    output_format = naming[3]
+    if processes > 1 and output_format == 'npy':
+        print(f"{label}提示: 帧堆栈按顺序写入单个文件，忽略并行进程设置")
+        processes = 1
+    os.makedirs(output_path, exist_ok=True)
+    
+    if processes > 1:
+        # 分段并行：每个进程打开自己的视频并提取一段，编号与串行提取一致
+        cap.release()
+        return extract_segments_parallel(
+            video_file, output_path, sampling, target_count(sampling['origin_ms'], end_ms, sampling['period_ms']),
+            naming, processes, options['strategy'], options['workers'],
+            on_segment_done=lambda first_index, segment_saved: print(
+                f"{label}已完成片段: 第 {first_index} 帧起 {segment_saved} 帧"),
+            transform=options['transform'])
+    
+    start_position = first_frame_position(sampling, 0)
+    if start_position > 0:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start_position)
+    saved_count = 0
+    reported_count = 0
+    read_stats = FrameReadStats()
+    try:
+        # 当前线程只负责读取需要的帧，编码和写入交给线程池并行完成
+        with open_frame_writer(output_path, output_format, options['workers'],
+                               {'video': os.path.basename(video_file), 'video_fps': video_fps},
+                               options['transform']) as writer:
+            for index, frame in iter_selected_frames(
+                    cap, sampling['period_ms'], sampling['origin_ms'], sampling['end_ms'],
+                    strategy=options['strategy'], selection=sampling['selection'], stats=read_stats,
+                    adaptive=sampling['adaptive']):
+                submit_frame(writer, frame, index, read_stats, naming, output_path)
+                saved_count += 1
+                
+                if read_stats.covered // 100 > reported_count:
+                    reported_count = read_stats.covered // 100
+                    print(f"{label}已处理: {read_stats.covered} 帧")
+    finally:
+        cap.release()
+    return saved_count, [str(error) for error in writer.errors], read_stats
+
 class VideoToImageConverter:
     def __init__(self, master=None, args=None):
         # 初始化转换状态
@@ -117,6 +922,59 @@ class VideoToImageConverter:
         self.format_var = tk.StringVar(value='jpg')
         ttk.Radiobutton(format_frame, text='JPG', variable=self.format_var, value='jpg').pack(side=tk.LEFT)
         ttk.Radiobutton(format_frame, text='PNG', variable=self.format_var, value='png').pack(side=tk.LEFT)
+        ttk.Radiobutton(format_frame, text='NPY帧堆栈', variable=self.format_var, value='npy').pack(side=tk.LEFT)
+        
+        # 输出前的裁剪/缩放/颜色处理（在编码线程中完成，省去再处理一遍图片）
+        transform_frame_ui = ttk.Frame(main_frame)
+        transform_frame_ui.pack(fill=tk.X, pady=3)
+        ttk.Label(transform_frame_ui, text="输出尺寸(宽x高):").pack(side=tk.LEFT)
+        self.resize_input = ttk.Entry(transform_frame_ui, width=11)
+        self.resize_input.pack(side=tk.LEFT, padx=(5, 15))
+        ttk.Label(transform_frame_ui, text="插值:").pack(side=tk.LEFT)
+        self.interp_var = tk.StringVar(value='area')
+        ttk.Combobox(transform_frame_ui, textvariable=self.interp_var, values=list(INTERPOLATIONS),
+                     state='readonly', width=8).pack(side=tk.LEFT, padx=(5, 15))
+        ttk.Label(transform_frame_ui, text="裁剪(x,y,宽,高):").pack(side=tk.LEFT)
+        self.crop_input = ttk.Entry(transform_frame_ui, width=18)
+        self.crop_input.pack(side=tk.LEFT, padx=(5, 15))
+        ttk.Label(transform_frame_ui, text="颜色:").pack(side=tk.LEFT)
+        self.color_var = tk.StringVar(value='color')
+        ttk.Combobox(transform_frame_ui, textvariable=self.color_var, values=COLOR_MODES,
+                     state='readonly', width=6).pack(side=tk.LEFT, padx=5)
+        
+        # 编码线程数
+        ttk.Label(format_frame, text="编码线程:").pack(side=tk.LEFT, padx=(15, 0))
+        self.workers_input = ttk.Entry(format_frame, width=6)
+        self.workers_input.pack(side=tk.LEFT, padx=5)
+        self.workers_input.insert(0, str(DEFAULT_WORKERS))
+        
+        # 并行进程数
+        ttk.Label(format_frame, text="并行进程:").pack(side=tk.LEFT, padx=(15, 0))
+        self.processes_input = ttk.Entry(format_frame, width=6)
+        self.processes_input.pack(side=tk.LEFT, padx=5)
+        self.processes_input.insert(0, "1")
+        
+        # 选帧方式
+        ttk.Label(format_frame, text="选帧:").pack(side=tk.LEFT, padx=(15, 0))
+        self.selection_var = tk.StringVar(value='nearest')
+        ttk.Combobox(
+            format_frame,
+            textvariable=self.selection_var,
+            values=SELECTION_MODES,
+            state='readonly',
+            width=8
+        ).pack(side=tk.LEFT, padx=5)
+        
+        # 帧读取策略
+        ttk.Label(format_frame, text="读取策略:").pack(side=tk.LEFT, padx=(15, 0))
+        self.strategy_var = tk.StringVar(value='auto')
+        ttk.Combobox(
+            format_frame,
+            textvariable=self.strategy_var,
+            values=READ_STRATEGIES,
+            state='readonly',
+            width=6
+        ).pack(side=tk.LEFT, padx=5)
         
         # 时间和帧率设置
         time_fps_frame = ttk.Frame(main_frame)
@@ -141,6 +999,23 @@ class VideoToImageConverter:
         self.fps_entry = ttk.Entry(time_fps_frame, width=8)
         self.fps_entry.pack(side=tk.LEFT, padx=5)
         
+        # adaptive 选帧参数
+        adaptive_frame = ttk.Frame(main_frame)
+        adaptive_frame.pack(fill=tk.X, pady=3)
+        ttk.Label(adaptive_frame, text="变化阈值:").pack(side=tk.LEFT)
+        self.scene_threshold_input = ttk.Entry(adaptive_frame, width=6)
+        self.scene_threshold_input.pack(side=tk.LEFT, padx=(5, 15))
+        self.scene_threshold_input.insert(0, f"{DEFAULT_SCENE_THRESHOLD:g}")
+        ttk.Label(adaptive_frame, text="最小间隔(秒):").pack(side=tk.LEFT)
+        self.min_interval_input = ttk.Entry(adaptive_frame, width=6)
+        self.min_interval_input.pack(side=tk.LEFT, padx=(5, 15))
+        self.min_interval_input.insert(0, f"{DEFAULT_MIN_INTERVAL:g}")
+        ttk.Label(adaptive_frame, text="最大间隔(秒):").pack(side=tk.LEFT)
+        self.max_interval_input = ttk.Entry(adaptive_frame, width=6)
+        self.max_interval_input.pack(side=tk.LEFT, padx=5)
+        self.max_interval_input.insert(0, f"{DEFAULT_MAX_INTERVAL:g}")
+        ttk.Label(adaptive_frame, text="(选帧方式为 adaptive 时有效)").pack(side=tk.LEFT, padx=5)
+        
         # 进度条
         progress_frame = ttk.Frame(main_frame)
         progress_frame.pack(fill=tk.X, pady=3)
@@ -163,9 +1038,22 @@ class VideoToImageConverter:
         self.start_button = ttk.Button(button_frame, text="开始转换", command=self.toggle_conversion)
         self.start_button.pack(side=tk.RIGHT)
         
+        # 工作线程通过进度通道更新界面
+        self.channel = ProgressChannel(self.master, self.show_progress, self.append_log)
+        
         # 加载配置
         self.load_config()
         
+    def show_progress(self, value, maximum):
+        if maximum is not None:
+            self.progress['maximum'] = maximum
+        if value is not None:
+            self.progress['value'] = value
+    
+    def append_log(self, text):
+        self.log_text.insert(tk.END, text)
+        self.log_text.see(tk.END)
+        
     def browse_video(self, is_file):
         if is_file:
             file = filedialog.askopenfilename(
@@ -214,8 +1102,7 @@ class VideoToImageConverter:
             # 停止转换
             self.is_converting = False
             self.start_button.config(text="开始转换")
-            self.log_text.insert(tk.END, "转换已停止\n")
-            self.log_text.see(tk.END)
+            self.channel.log("转换已停止\n")
         
     def convert_video(self):
         try:
@@ -225,9 +1112,9 @@ class VideoToImageConverter:
             
             cap = cv2.VideoCapture(self.video_file)
             if not cap.isOpened():
-                self.log_text.insert(tk.END, f"无法打开视频文件: {self.video_file}\n")
+                self.channel.log(f"无法打开视频文件: {self.video_file}\n")
                 self.is_converting = False
-                self.start_button.config(text="开始转换")
+                self.channel.call(lambda: self.start_button.config(text="开始转换"))
                 return
             
             # 获取视频总时长（秒）
@@ -240,43 +1127,81 @@ class VideoToImageConverter:
             
             # 验证时间输入
             if start_time < 0 or end_time > total_seconds or start_time >= end_time:
-                self.log_text.insert(tk.END, 
+                self.channel.log(
                     f"时间设置无效！\n视频总长: {total_seconds:.1f}秒\n"
                     f"请确保: 0 ≤ 开始时间 < 结束时间 ≤ {total_seconds:.1f}\n")
                 cap.release()
                 self.is_converting = False
-                self.start_button.config(text="开始转换")
+                self.channel.call(lambda: self.start_button.config(text="开始转换"))
                 return
             
-            # 设置起始帧位置
-            start_frame = int(start_time * video_fps)
-            cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+            # 按时间采样：第 k 帧的目标时间为 开始时间 + k / fps
+            try:
+                fps = float(self.fps_entry.get())
+            except ValueError:
+                fps = 1.0
+            if fps <= 0:
+                fps = 1.0
+            if fps > video_fps:
+                self.channel.log(f"帧率超过视频帧率 ({video_fps:.2f} fps)，将输出每一帧\n")
+            adaptive = None
+            if self.selection_var.get() == 'adaptive':
+                try:
+                    adaptive = make_adaptive(*[
+                        float(entry.get()) if entry.get().strip() else None
+                        for entry in (self.scene_threshold_input, self.min_interval_input, self.max_interval_input)])
+                except ValueError as e:
+                    self.channel.log(f"adaptive 参数无效: {str(e)}\n")
+                    cap.release()
+                    self.is_converting = False
+                    self.channel.call(lambda: self.start_button.config(text="开始转换"))
+                    return
+            sampling = make_sampling(video_fps, fps, start_time, end_time, self.selection_var.get(), adaptive)
+            total_count = target_count(sampling['origin_ms'], sampling['end_ms'], sampling['period_ms'])
+            if sampling['selection'] == 'adaptive':
+                # 输出帧数事先未知，进度按经过的源视频帧计算
+                progress_maximum = max(1, int((end_time - start_time) * video_fps))
+            else:
+                progress_maximum = total_count
+            self.channel.progress(0, progress_maximum)
             
-            # 计算需要处理的总帧数
-            end_frame = int(end_time * video_fps)
-            self.progress['maximum'] = end_frame - start_frame
+            # 设置起始帧位置
+            cap.set(cv2.CAP_PROP_POS_FRAMES, first_frame_position(sampling, 0))
             
-            fps = int(self.fps_entry.get()) if self.fps_entry.get().isdigit() else 1
-            frame_interval = int(video_fps / fps)
             output_format = self.format_var.get()
             output_path = self.output_dir.get()
             
-            frame_count = 0
+            # 输出前的裁剪/缩放/颜色处理
+            try:
+                transform = make_transform(parse_size(self.resize_input.get()), parse_crop(self.crop_input.get()),
+                                           self.interp_var.get(), self.color_var.get())
+                output_width, output_height = check_transform(
+                    transform, int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+            except ValueError as e:
+                self.channel.log(f"{str(e)}\n")
+                cap.release()
+                self.is_converting = False
+                self.channel.call(lambda: self.start_button.config(text="开始转换"))
+                return
+            if transform:
+                self.channel.log(f"输出尺寸: {output_width}x{output_height}, 颜色: {transform['color']}\n")
+            
             saved_count = 0
             start_process_time = time.time()
             
-            self.log_text.insert(tk.END, 
+            self.channel.log(
                 f"开始时间: {start_time:.1f}秒\n"
                 f"结束时间: {end_time:.1f}秒\n"
-                f"帧率设置: {fps} fps\n"
+                f"帧率设置: {fps:g} fps\n"
+                f"选帧方式: {sampling['selection']}\n"
                 f"输出格式: {output_format}\n"
                 f"输出目录: {output_path}\n")
             
             # 检查并清空输出目录
             if not output_path:
-                self.log_text.insert(tk.END, "请选择输出目录\n")
+                self.channel.log("请选择输出目录\n")
                 self.is_converting = False
-                self.start_button.config(text="开始转换")
+                self.channel.call(lambda: self.start_button.config(text="开始转换"))
                 return
 
             # 确保输出目录存在
@@ -289,11 +1214,11 @@ class VideoToImageConverter:
                         file_path = os.path.join(output_path, file)
                         if os.path.isfile(file_path):
                             os.unlink(file_path)
-                    self.log_text.insert(tk.END, "已清空输出目录\n")
+                    self.channel.log("已清空输出目录\n")
                 except Exception as e:
-                    self.log_text.insert(tk.END, f"清空输出目录时出错: {str(e)}\n")
+                    self.channel.log(f"清空输出目录时出错: {str(e)}\n")
                     self.is_converting = False
-                    self.start_button.config(text="开始转换")
+                    self.channel.call(lambda: self.start_button.config(text="开始转换"))
                     return
 
             # 获取文件命名相关设置
@@ -301,56 +1226,84 @@ class VideoToImageConverter:
             try:
                 start_num = int(self.start_num_input.get() or "1")
                 num_digits = int(self.num_digits_input.get() or "4")
+                workers = max(1, int(self.workers_input.get() or DEFAULT_WORKERS))
+                processes = max(1, int(self.processes_input.get() or "1"))
             except ValueError:
-                self.log_text.insert(tk.END, "起始序号和序号位数必须是整数\n")
+                self.channel.log("起始序号、序号位数、编码线程数和并行进程数必须是整数\n")
                 self.is_converting = False
-                self.start_button.config(text="开始转换")
+                self.channel.call(lambda: self.start_button.config(text="开始转换"))
                 return
 
-            while cap.isOpened() and self.is_converting:
-                ret, frame = cap.read()
-                if not ret or frame_count >= (end_frame - start_frame):
-                    break
-                
-                if frame_count % frame_interval == 0:
-                    # 生成文件名：前缀_序号.格式
-                    frame_num = start_num + saved_count
-                    frame_filename = os.path.join(
-                        output_path, 
-                        f"{prefix}{frame_num:0{num_digits}d}.{output_format}"
-                    )
-                    success, encoded_img = cv2.imencode(f'.{output_format}', frame)
-                    if success:
-                        with open(frame_filename, 'wb') as f:
-                            encoded_img.tofile(f)
-                    saved_count += 1
+            if processes > 1 and sampling['selection'] == 'adaptive':
+                self.channel.log("adaptive 选帧需要按顺序比较帧，忽略并行进程设置\n")
+                processes = 1
+            if processes > 1 and output_format == 'npy':
+                self.channel.log("帧堆栈按顺序写入单个文件，忽略并行进程设置\n")
+                processes = 1
+            
+            if processes > 1:
+                # 分段并行：每个进程打开自己的视频并提取一段，编号与串行提取一致
+                cap.release()
+                self.channel.log(f"并行进程: {processes}\n")
+                segments_saved = 0
                 
-                frame_count += 1
-                self.progress['value'] = frame_count
+                def segment_done(first_index, segment_saved):
+                    nonlocal segments_saved
+                    segments_saved += segment_saved
+                    self.channel.progress(segments_saved)
                 
-            cap.release()
+                saved_count, errors, read_stats = extract_segments_parallel(
+                    self.video_file, output_path, sampling, total_count,
+                    (prefix, start_num, num_digits, output_format), processes, self.strategy_var.get(), workers,
+                    should_continue=lambda: self.is_converting,
+                    on_segment_done=segment_done,
+                    transform=transform)
+            else:
+                # 当前线程只负责读取需要的帧，编码和写入交给线程池并行完成
+                read_stats = FrameReadStats()
+                with open_frame_writer(output_path, output_format, workers,
+                                       {'video': os.path.basename(self.video_file), 'video_fps': video_fps},
+                                       transform) as writer:
+                    for index, frame in iter_selected_frames(
+                            cap, sampling['period_ms'], sampling['origin_ms'], sampling['end_ms'],
+                            strategy=self.strategy_var.get(), selection=sampling['selection'], stats=read_stats,
+                            adaptive=sampling['adaptive']):
+                        if not self.is_converting:
+                            break
+                        
+                        # 生成文件名：前缀_序号.格式（npy 写入帧堆栈）
+                        submit_frame(writer, frame, index, read_stats,
+                                     (prefix, start_num, num_digits, output_format), output_path)
+                        saved_count += 1
+                        self.channel.progress(
+                            read_stats.covered if sampling['selection'] == 'adaptive' else index + 1)
+                    
+                cap.release()
+                errors = writer.errors
+            for error in errors:
+                self.channel.log(f"保存帧时出错: {str(error)}\n")
             
             if self.is_converting:
                 elapsed_time = time.time() - start_process_time
-                self.log_text.insert(tk.END, 
+                self.channel.log(
                     f"处理完成!\n"
                     f"时间段: {start_time:.1f}s - {end_time:.1f}s\n"
                     f"共保存: {saved_count} 帧\n"
+                    f"{read_stats.summary()}\n"
                     f"耗时: {elapsed_time:.2f} 秒\n")
-                self.progress['value'] = self.progress['maximum']
+                self.channel.progress(progress_maximum)
             
             self.is_converting = False
-            self.start_button.config(text="开始转换")
-            self.log_text.see(tk.END)
+            self.channel.call(lambda: self.start_button.config(text="开始转换"))
             
         except ValueError as e:
-            self.log_text.insert(tk.END, "请输入有效的数值\n")
+            self.channel.log("请输入有效的数值\n")
             self.is_converting = False
-            self.start_button.config(text="开始转换")
+            self.channel.call(lambda: self.start_button.config(text="开始转换"))
         except Exception as e:
-            self.log_text.insert(tk.END, f"处理失败: {str(e)}\n")
+            self.channel.log(f"处理失败: {str(e)}\n")
             self.is_converting = False
-            self.start_button.config(text="开始转换")
+            self.channel.call(lambda: self.start_button.config(text="开始转换"))
 
     def reset(self):
         self.video_file = ""
@@ -390,6 +1343,24 @@ class VideoToImageConverter:
                     
                     # 输出格式
                     self.format_var.set(config.get("format", "jpg"))
+                    self.workers_input.delete(0, tk.END)
+                    self.workers_input.insert(0, config.get("workers", str(DEFAULT_WORKERS)))
+                    self.strategy_var.set(config.get("strategy", "auto"))
+                    self.selection_var.set(config.get("selection", "nearest"))
+                    self.resize_input.delete(0, tk.END)
+                    self.resize_input.insert(0, config.get("resize", ""))
+                    self.crop_input.delete(0, tk.END)
+                    self.crop_input.insert(0, config.get("crop", ""))
+                    self.interp_var.set(config.get("interpolation", "area"))
+                    self.color_var.set(config.get("color", "color"))
+                    self.scene_threshold_input.delete(0, tk.END)
+                    self.scene_threshold_input.insert(0, config.get("scene_threshold", f"{DEFAULT_SCENE_THRESHOLD:g}"))
+                    self.min_interval_input.delete(0, tk.END)
+                    self.min_interval_input.insert(0, config.get("min_interval", f"{DEFAULT_MIN_INTERVAL:g}"))
+                    self.max_interval_input.delete(0, tk.END)
+                    self.max_interval_input.insert(0, config.get("max_interval", f"{DEFAULT_MAX_INTERVAL:g}"))
+                    self.processes_input.delete(0, tk.END)
+                    self.processes_input.insert(0, config.get("processes", "1"))
                     
                     # 时间设置
                     self.start_time_input.delete(0, tk.END)
@@ -419,6 +1390,17 @@ class VideoToImageConverter:
             
             # 输出格式
             "format": self.format_var.get(),
+            "workers": self.workers_input.get(),
+            "strategy": self.strategy_var.get(),
+            "selection": self.selection_var.get(),
+            "resize": self.resize_input.get(),
+            "crop": self.crop_input.get(),
+            "interpolation": self.interp_var.get(),
+            "color": self.color_var.get(),
+            "scene_threshold": self.scene_threshold_input.get(),
+            "min_interval": self.min_interval_input.get(),
+            "max_interval": self.max_interval_input.get(),
+            "processes": self.processes_input.get(),
             
             # 时间设置
             "start_time": self.start_time_input.get(),
@@ -449,60 +1431,168 @@ class VideoToImageConverter:
             self.fps_entry.insert(0, str(args.fps))
         if args.type:
             self.format_var.set(args.type.lower())
+        if args.workers:
+            self.workers_input.delete(0, tk.END)
+            self.workers_input.insert(0, str(args.workers))
+        if args.strategy:
+            self.strategy_var.set(args.strategy)
+        if args.select:
+            self.selection_var.set(args.select)
+        if args.interp:
+            self.interp_var.set(args.interp)
+        if args.color:
+            self.color_var.set(args.color)
+        for entry, value in [
+            (self.scene_threshold_input, args.scene_threshold),
+            (self.min_interval_input, args.min_interval),
+            (self.max_interval_input, args.max_interval)
+        ]:
+            if value is not None:
+                entry.delete(0, tk.END)
+                entry.insert(0, f"{value:g}")
+        if args.processes:
+            self.processes_input.delete(0, tk.END)
+            self.processes_input.insert(0, str(args.processes))
+        for entry, value in [
+            (self.start_time_input, args.start),
+            (self.end_time_input, args.end),
+            (self.prefix_input, args.prefix),
+            (self.start_num_input, args.start_num),
+            (self.num_digits_input, args.digits),
+            (self.resize_input, args.resize),
+            (self.crop_input, args.crop)
+        ]:
+            if value is not None:
+                entry.delete(0, tk.END)
+                entry.insert(0, value if isinstance(value, str) else f"{value:g}")
 
     def process_command_line(self, args):
-        """处理命令行模式的转换"""
+        """处理命令行模式的转换；输入为文件夹或通配符时批量处理"""
         if not all([args.input, args.output]):
             print("错误: 需要指定输入文件和输出目录")
             return
 
-        self.video_file = args.input
+        video_files = find_video_files(args.input)
+        if not video_files:
+            print(f"错误: 没有找到视频文件: {args.input}")
+            return
+        batch = not os.path.isfile(args.input)
+        try:
+            transform = make_transform(parse_size(args.resize), parse_crop(args.crop),
+                                       args.interp or 'area', args.color or 'color')
+            adaptive = make_adaptive(args.scene_threshold, args.min_interval, args.max_interval)
+        except ValueError as e:
+            print(f"错误: {str(e)}")
+            return
         output_path = args.output
-        fps = args.fps or 1
         output_format = args.type.lower() if args.type else 'jpg'
+        workers = max(1, args.workers or DEFAULT_WORKERS)
+        processes = max(1, args.processes or 1)
+        jobs = max(1, min(args.jobs or 1, len(video_files))) if batch else 1
+        if jobs > 1:
+            # 同时处理多个视频时平分编码线程，且不再对单个视频分段并行
+            workers = max(1, workers // jobs)
+            if processes > 1:
+                print("提示: 同时处理多个视频时忽略并行进程设置")
+                processes = 1
+        options = {
+            'fps': args.fps or 1,
+            'strategy': args.strategy or 'auto',
+            'selection': args.select or 'nearest',
+            'adaptive': adaptive,
+            'start_time': args.start or 0.0,
+            'end_time': args.end,
+            'workers': workers,
+            'processes': processes,
+            'transform': transform,
+            'naming': (
+                'frame_' if args.prefix is None else args.prefix,
+                0 if args.start_num is None else args.start_num,
+                4 if args.digits is None else args.digits,
+                output_format)
+        }
 
         # 确保输出目录存在
         os.makedirs(output_path, exist_ok=True)
 
         print(f"开始转换...")
-        print(f"输入文件: {self.video_file}")
+        print(f"输入{'文件' if not batch else f': {len(video_files)} 个视频'}: {args.input}")
         print(f"输出目录: {output_path}")
-        print(f"帧率: {fps}")
+        print(f"帧率: {options['fps']:g}")
+        print(f"时间段: {options['start_time']:g}s - {'结束' if args.end is None else f'{args.end:g}s'}")
+        print(f"选帧方式: {options['selection']}")
         print(f"输出格式: {output_format}")
-
-        cap = cv2.VideoCapture(self.video_file)
-        if not cap.isOpened():
-            print(f"错误: 无法打开视频文件: {self.video_file}")
-            return
-
-        video_fps = cap.get(cv2.CAP_PROP_FPS)
-        frame_interval = int(video_fps / fps)
+        if transform:
+            print(f"输出处理: 裁剪 {args.crop or '无'}, 尺寸 {args.resize or '原始'}, "
+                  f"插值 {transform['interpolation']}, 颜色 {transform['color']}")
+        print(f"编码线程: {workers}")
+        print(f"并行进程: {processes}")
+        if batch:
+            print(f"同时处理视频数: {jobs}")
         
-        frame_count = 0
-        saved_count = 0
         start_time = time.time()
         
-        while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            if frame_count % frame_interval == 0:
-                frame_filename = os.path.join(output_path, f"frame_{saved_count:04d}.{output_format}")
-                # 命令行模式也需要修改保存方式
-                success, encoded_img = cv2.imencode(f'.{output_format}', frame)
-                if success:
-                    with open(frame_filename, 'wb') as f:
-                        encoded_img.tofile(f)
-                saved_count += 1
-            
-            frame_count += 1
-            if frame_count % 100 == 0:
-                print(f"已处理: {frame_count} 帧")
+        if not batch:
+            self.video_file = args.input
+            try:
+                saved_count, errors, read_stats = extract_video(self.video_file, output_path, options)
+            except Exception as e:
+                print(f"错误: {str(e)}")
+                return
+            for error in errors:
+                print(f"保存帧时出错: {str(error)}")
+            elapsed_time = time.time() - start_time
+            print(read_stats.summary())
+            print(f"处理完成: {saved_count} 帧, 耗时 {elapsed_time:.2f} 秒")
+            return
+        
+        # 批量模式：每个视频输出到自己的子目录，最多 jobs 个视频同时在独立进程中处理
+        output_dirs = batch_output_dirs(video_files, output_path)
+        total_saved = 0
+        failed = []
+        
+        def report(video_file, result):
+            nonlocal total_saved
+            label = f"[{os.path.basename(video_file)}] "
+            if isinstance(result, Exception):
+                failed.append(video_file)
+                print(f"{label}处理失败: {str(result)}")
+                return
+            saved_count, errors, read_stats = result
+            total_saved += saved_count
+            for error in errors:
+                print(f"{label}保存帧时出错: {str(error)}")
+            if errors:
+                failed.append(video_file)
+            print(f"{label}{read_stats.summary()}")
+            print(f"{label}完成: {saved_count} 帧")
+        
+        if jobs > 1:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+                futures = {
+                    executor.submit(extract_video, video_file, output_dir, options,
+                                    f"[{os.path.basename(video_file)}] "): video_file
+                    for video_file, output_dir in zip(video_files, output_dirs)
+                }
+                for future in concurrent.futures.as_completed(futures):
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        result = e
+                    report(futures[future], result)
+        else:
+            for video_file, output_dir in zip(video_files, output_dirs):
+                try:
+                    result = extract_video(video_file, output_dir, options, f"[{os.path.basename(video_file)}] ")
+                except Exception as e:
+                    result = e
+                report(video_file, result)
         
-        cap.release()
         elapsed_time = time.time() - start_time
-        print(f"处理完成: {saved_count} 帧, 耗时 {elapsed_time:.2f} 秒")
+        print(f"批量处理完成: {len(video_files) - len(failed)}/{len(video_files)} 个视频成功, "
+              f"共 {total_saved} 帧, 耗时 {elapsed_time:.2f} 秒")
+        for video_file in failed:
+            print(f"  失败: {video_file}")
 
     def open_output_directory(self):
         output_dir = self.output_dir.get()
@@ -516,11 +1606,33 @@ class VideoToImageConverter:
             messagebox.showwarning("警告", "输出目录不存在")
 
 def main():
+    # 打包为可执行文件时支持进程池
+    multiprocessing.freeze_support()
+    
     parser = argparse.ArgumentParser(description='视频转图像序列帧工具', add_help=False)
-    parser.add_argument('-i', '--input', help='输入视频文件路径')
+    parser.add_argument('-i', '--input', help='输入视频文件、文件夹或通配符 (批量模式)')
     parser.add_argument('-o', '--output', help='输出目录路径')
-    parser.add_argument('-f', '--fps', type=int, help='帧率 (每秒输出几帧)')
-    parser.add_argument('-t', '--type', choices=['jpg', 'png'], help='输出格式 (jpg/png)')
+    parser.add_argument('-f', '--fps', type=float, help='帧率 (每秒输出几帧, 可为小数)')
+    parser.add_argument('-t', '--type', choices=['jpg', 'png', 'npy'], help='输出格式 (jpg/png/npy 帧堆栈)')
+    parser.add_argument('-w', '--workers', type=int, help=f'编码/写入线程数 (默认{DEFAULT_WORKERS})')
+    parser.add_argument('-s', '--strategy', choices=READ_STRATEGIES, help='帧读取策略 (默认auto)')
+    parser.add_argument('-p', '--processes', type=int, help='并行提取的进程数 (默认1)')
+    parser.add_argument('-m', '--select', choices=SELECTION_MODES,
+                        help='选帧方式 (nearest: 最接近目标时间的帧, sharpest: 每个区间内最清晰的帧, '
+                             'adaptive: 只保存画面变化足够大的帧, 默认nearest)')
+    parser.add_argument('--scene-threshold', type=float, help=f'adaptive 模式的差异阈值 (默认{DEFAULT_SCENE_THRESHOLD:g})')
+    parser.add_argument('--min-interval', type=float, help=f'adaptive 模式的最小保存间隔, 秒 (默认{DEFAULT_MIN_INTERVAL:g})')
+    parser.add_argument('--max-interval', type=float, help=f'adaptive 模式的最大保存间隔, 秒, 必须大于0 (默认{DEFAULT_MAX_INTERVAL:g})')
+    parser.add_argument('--start', type=float, help='开始时间 (秒, 默认0)')
+    parser.add_argument('--end', type=float, help='结束时间 (秒, 默认到视频结束)')
+    parser.add_argument('--prefix', help='文件名前缀 (默认frame_)')
+    parser.add_argument('--start-num', type=int, help='起始序号 (默认0)')
+    parser.add_argument('--digits', type=int, help='序号位数 (默认4)')
+    parser.add_argument('-j', '--jobs', type=int, help='批量模式同时处理的视频数 (默认1)')
+    parser.add_argument('--resize', help='输出尺寸 宽x高 (其中一项为0时按比例计算)')
+    parser.add_argument('--interp', choices=list(INTERPOLATIONS), help='缩放插值方式 (默认area)')
+    parser.add_argument('--crop', help='裁剪区域 x,y,宽,高 (先裁剪再缩放)')
+    parser.add_argument('--color', choices=COLOR_MODES, help='输出颜色 (默认color)')
     parser.add_argument('-?', '--help', action='store_true', help='显示帮助信息')
 
     args = parser.parse_args()